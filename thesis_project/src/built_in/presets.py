@@ -1,4 +1,5 @@
 from typing import Dict
+from thesis_project.src.effects.ir_catalog import IR_CATALOG
 from thesis_project.src.functions.utility.data_conversion import get_validated_input
 from pathlib import Path
 
@@ -107,22 +108,83 @@ def get_ping_pong_params() -> Dict[str, float]:
     return {"delay_time_l": delay_time_l, "delay_time_r": delay_time_r, "feedback": feedback, "mix": mix}
 
 
+def get_modulated_delay_params() -> Dict[str, str | float]:
+    """
+        Costruisce un preset custom per il ritardo modulato (chorus, flanger, vibrato).
+
+        Parametri in output:
+        - {"delay_time": ..., "depth": ..., "rate": ..., "feedback": ..., "mix": ..., "interpolation": ...,
+           "stereo_phase": ...} : dizionario che rappresenta il preset
+    """
+    print("\nInserisci i parametri per il Ritardo Modulato personalizzato:")
+
+    delay_time = get_validated_input(
+        "Inserisci il ritardo medio (s): ",
+        lambda x: x >= 0,
+        "Il ritardo deve essere un valore positivo."
+    )
+
+    depth = get_validated_input(
+        "Inserisci la profondità della modulazione (s): ",
+        lambda x: x >= 0,
+        "La profondità deve essere un valore positivo."
+    )
+
+    rate = get_validated_input(
+        "Inserisci la frequenza dell'LFO (Hz): ",
+        lambda x: x >= 0,
+        "La frequenza deve essere un valore positivo."
+    )
+
+    feedback = get_validated_input(
+        "Inserisci il feedback (valore tra 0.0 e 0.95): ",
+        lambda x: 0.0 <= x <= 0.95,
+        "Valore non valido. Il feedback deve essere tra 0.0 e 0.95."
+    )
+
+    mix = get_validated_input(
+        "Inserisci il mix (valore tra 0.0 e 1.0): ",
+        lambda x: 0.0 <= x <= 1.0,
+        "Valore non valido. Il mix deve essere tra 0.0 e 1.0."
+    )
+
+    interpolation = get_validated_input(
+        "Interpolazione (1 = lineare, 2 = all-pass): ",
+        lambda x: x in (1, 2),
+        "Selezione non valida. Inserisci 1 o 2.",
+        expected_type=int
+    )
+
+    stereo_phase = get_validated_input(
+        "Inserisci lo sfasamento dell'LFO tra i canali (gradi): ",
+        lambda x: 0.0 <= x <= 360.0,
+        "Valore non valido. Lo sfasamento deve essere tra 0 e 360 gradi."
+    )
+
+    return {"delay_time": delay_time, "depth": depth, "rate": rate, "feedback": feedback, "mix": mix,
+            "interpolation": "linear" if interpolation == 1 else "allpass", "stereo_phase": stereo_phase}
+
+
 def get_cabinet_params() -> Dict[str, str | float]:
     """
         Costruisce un preset custom per il cabinet, a partire dai dati inseriti dall'utente.
+        I file IR disponibili (con durata e frequenza di campionamento) vengono letti dall'indice della libreria,
+        aggiornato solo per i file nuovi o modificati (vedi IRCatalog).
 
         Parametri in output:
         - {"ir_path": ir_path, "mix": mix} : dizionario che rappresenta il preset
     """
-    ir_files = [p.name for p in IR_CABINET_PATH.glob('*.wav') if p.is_file()]
+    ir_entries = IR_CATALOG.refresh(IR_CABINET_PATH)
+    ir_files = [entry["name"] for entry in ir_entries]
     if not ir_files:
         print(f"ERRORE: Nessun file IR trovato nella cartella: {IR_CABINET_PATH}")
         raise FileNotFoundError("Nessun file IR disponibile per il cabinet custom.")
 
     print("\nInserisci i parametri per la simulazione Cabinet personalizzata:")
     print("\nFile IR disponibili nella cartella 'ir_cabinet':")
-    for i, name in enumerate(ir_files):
-        print(f"{i + 1}. {name}")
+    for i, entry in enumerate(ir_entries):
+        print(f"{i + 1}. {entry['name']} ({entry['samplerate']} Hz, {1000 * entry['length'] / entry['samplerate']:.0f} ms, "
+              f"efficace {1000 * entry['effective_length'] / entry['samplerate']:.0f} ms)")
 
     selected_index = get_validated_input(
         f"Seleziona il numero del file IR: ",
@@ -174,6 +236,18 @@ EFFECT_REGISTRY = {
         },
         "name": "Cabinet Speaker Simulator",
         "get_custom_parameters_func": get_cabinet_params
+    },
+    "modulated_delay": {
+        "presets": {
+            "chorus": {"delay_time": 0.02, "depth": 0.003, "rate": 0.8, "feedback": 0.0, "mix": 0.5,
+                       "interpolation": "linear", "stereo_phase": 90.0},
+            "flanger": {"delay_time": 0.003, "depth": 0.002, "rate": 0.25, "feedback": 0.6, "mix": 0.5,
+                        "interpolation": "linear", "stereo_phase": 90.0},
+            "vibrato": {"delay_time": 0.005, "depth": 0.002, "rate": 5.0, "feedback": 0.0, "mix": 1.0,
+                        "interpolation": "allpass", "stereo_phase": 0.0},
+        },
+        "name": "Chorus / Flanger / Vibrato",
+        "get_custom_parameters_func": get_modulated_delay_params
     }
 }
 
@@ -1,4 +1,7 @@
 from .audio_effect import AudioEffect
 from .reverb import ReverbEffect
 from .delay import DelayEffect, PingPongDelayEffect
+from .modulated_delay import ModulatedDelayEffect
 from .cabinet import CabinetEffect
+from .fused_convolution import FusedConvolutionEffect
+from .limiter import LookAheadLimiter
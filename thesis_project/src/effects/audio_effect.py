@@ -7,16 +7,144 @@ class AudioEffect(ABC):
     """
 
     @abstractmethod
-    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both',
+                     out: np.ndarray | None = None) -> np.ndarray:
         """
         Applica l'effetto audio al segnale fornito.
+        Il segnale viene elaborato nella precisione impostata per la catena (vedi precision.set_precision).
+        Gli effetti non normalizzano il risultato: il guadagno viene applicato una sola volta a fine catena
+        (vedi signal_processing.apply_output_stage).
 
         Parametri di input:
         - audio_signal: array segnale di input
         - samplerate: La frequenza di campionamento
         - channel_mode: Specifica quali canali devono essere elaborati ('both', 'right', 'left')
+        - out: (opzionale) buffer preallocato, della stessa forma e dello stesso tipo del segnale, in cui scrivere
+               il risultato (non deve sovrapporsi al segnale di input). Se None viene allocato un nuovo array.
 
         Returns:
             np.ndarray: Il segnale audio con l'effetto applicato.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def lti_response(self, samplerate: int, channel_mode: str = 'both', num_channels: int = 2) -> np.ndarray | None:
+        """
+        Risposta all'impulso dell'effetto, se è lineare e tempo-invariante (LTI) e rappresentabile come
+        convoluzione finita: permette di fondere effetti consecutivi in un'unica convoluzione (vedi chain_compiler).
+        È una matrice di IR di forma (M, C, C) indicizzata (uscita, ingresso) che comprende la miscela dry/wet
+        e i canali non elaborati.
+
+        Parametri di input:
+        - samplerate: La frequenza di campionamento
+        - channel_mode: Specifica quali canali devono essere elaborati ('both', 'right', 'left')
+        - num_channels: numero di canali del segnale (1 per un segnale mono 1D)
+
+        Returns:
+            np.ndarray | None: la matrice di IR, oppure None se l'effetto non può essere fuso (default).
+        """
+        return None
+
+    def latency_samples(self, samplerate: int) -> int:
+        """
+        Latenza algoritmica di process_block in campioni: ritardo tra un campione di input e il primo campione
+        di output che ne dipende, oltre a quella del blocco. Gli effetti della catena sono tutti a latenza nulla
+        (il segnale dry e la testa della convoluzione partizionata escono nello stesso blocco).
+
+        Parametri di input:
+        - samplerate: La frequenza di campionamento
+
+        Returns:
+            int: la latenza in campioni (default 0).
+        """
+        return 0
+
+    def memory_samples(self, samplerate: int, tolerance: float) -> int | None:
+        """
+        Memoria dell'effetto in campioni: quanti campioni di input precedenti influenzano ogni campione di output
+        (la lunghezza dell'IR meno uno per una convoluzione). Per gli effetti con feedback, la cui risposta
+        non termina, è il punto oltre il quale le ripetizioni scendono sotto `tolerance`.
+        Permette di elaborare un segmento del segnale in modo indipendente, partendo da un pre-roll di questa
+        lunghezza (vedi segment_processing).
+
+        Parametri di input:
+        - samplerate: La frequenza di campionamento
+        - tolerance: ampiezza relativa sotto la quale le ripetizioni del feedback vengono trascurate
+
+        Returns:
+            int | None: la memoria in campioni, oppure None se non è limitata (default).
+        """
+        return None
+
+    def reset(self):
+        """
+        Azzera lo stato interno (code di convoluzione, linee di ritardo) usato da process_block.
+        Va chiamato prima di elaborare un nuovo flusso audio.
+        """
+        pass
+
+    def process_block(self, audio_block: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+        """
+        Applica l'effetto a un blocco di un flusso audio, conservando lo stato tra un blocco e il successivo.
+        La concatenazione dei blocchi elaborati coincide con apply_effect sull'intero segnale.
+
+        Parametri di input:
+        - audio_block: blocco di campioni (ndim=2, canali sulle colonne)
+        - samplerate: La frequenza di campionamento
+        - channel_mode: Specifica quali canali devono essere elaborati ('both', 'right', 'left')
+
+        Returns:
+            np.ndarray: Il blocco con l'effetto applicato, della stessa lunghezza del blocco di input.
+        """
+        raise NotImplementedError(f"{type(self).__name__} non supporta l'elaborazione a blocchi.")
+
+    @staticmethod
+    def _selected_channels(channel_mode: str) -> list[int]:
+        """
+        Restituisce gli indici delle colonne da elaborare per il channel_mode indicato.
+        """
+        if channel_mode == 'both':
+            return [0, 1]
+        elif channel_mode == 'left':
+            return [0]
+        elif channel_mode == 'right':
+            return [1]
+        else:
+            raise ValueError("Modalità canale non valida. Scegli tra 'both', 'left', o 'right'.")
+
+    @staticmethod
+    def _channel_view(audio_signal: np.ndarray, channels: list[int]) -> np.ndarray:
+        """
+        Restituisce una vista (senza copia) delle colonne selezionate, che sono sempre contigue.
+        """
+        return audio_signal[:, channels[0]:channels[-1] + 1]
+
+    @staticmethod
+    def _output_buffer(audio_signal: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+        """
+        Restituisce il buffer in cui scrivere il risultato: `out` se fornito (dopo averne verificato forma e tipo),
+        altrimenti un nuovo array non inizializzato.
+        """
+        if out is None:
+            return np.empty_like(audio_signal)
+        if out.shape != audio_signal.shape or out.dtype != audio_signal.dtype:
+            raise ValueError("Il buffer di output deve avere la stessa forma e lo stesso tipo del segnale di input.")
+        return out
+
+    @staticmethod
+    def _copy_unselected(audio_signal: np.ndarray, out: np.ndarray, channels: list[int]):
+        """
+        Copia in `out` i canali del segnale non elaborati dall'effetto.
+        """
+        for channel in range(audio_signal.shape[1]):
+            if channel not in channels:
+                out[:, channel] = audio_signal[:, channel]
+
+    @staticmethod
+    def _mix_into(out: np.ndarray, dry: np.ndarray, wet: np.ndarray, mix: float):
+        """
+        Scrive in `out` la miscela (1 - mix) * dry + mix * wet senza array temporanei.
+        Il segnale `wet` viene sovrascritto e non deve sovrapporsi a `out`.
+        """
+        wet *= mix
+        np.multiply(dry, 1 - mix, out=out)
+        out += wet
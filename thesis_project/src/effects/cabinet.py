@@ -1,7 +1,9 @@
 import numpy as np
-from scipy.signal import fftconvolve, resample_poly
-import soundfile as sf
 from thesis_project.src.effects.audio_effect import AudioEffect
+from thesis_project.src.effects.convolution import (PartitionedConvolver, convolve_channels, fft_size_for,
+                                                    head_partition_size, identity_response)
+from thesis_project.src.effects.ir_cache import get_ir_spectrum, get_resampled_ir, load_ir
+from thesis_project.src.effects.precision import to_processing_dtype
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -17,96 +19,142 @@ class CabinetEffect(AudioEffect):
         - mix: Miscela dry/wet. Valore tra 0.0 (solo segnale originale) e 1.0 (solo segnale processato).
         """
         self.ir_path = IR_CABINET_PATH / ir_name # COSTRUISCE IL PERCORSO COMPLETO
-        self.mix = np.clip(mix, 0.0, 1.0)  # Assicura che mix sia tra 0 e 1
+        self.mix = float(np.clip(mix, 0.0, 1.0))  # Assicura che mix sia tra 0 e 1
         self._ir = None  # Variabile per memorizzare l'IR caricata
         self._ir_samplerate = None  # Variabile per memorizzare la frequenza di campionamento dell'IR
-        self._load_ir()
+        self._convolver = None  # Convolutore partizionato usato da process_block
+        self._convolver_key = None  # (samplerate, channel_mode, dtype) per cui è stato costruito il convolutore
+        self._convolver_inputs = None  # Canali di ingresso del convolutore
 
     def _load_ir(self):
         """
         Carica la Risposta all'Impulso dal percorso specificato.
+        Viene chiamata al primo utilizzo dell'IR, non alla costruzione: creare la catena non legge alcun file.
+        Il file viene letto dal disco una sola volta: le istanze successive usano la cache condivisa delle IR.
         """
-        try:
-            ir_data, sr = sf.read(self.ir_path)
+        self._ir, self._ir_samplerate = load_ir(self.ir_path)
 
-            # Converti in mono se l'IR è stereo (un cabinet ha un'unica IR)
-            if ir_data.ndim == 2:
-                ir_data = ir_data.mean(axis=1)
-
-            if np.max(np.abs(ir_data)) > 0:
-                ir_data /= np.max(np.abs(ir_data))
-
-            self._ir = ir_data
-            self._ir_samplerate = sr
-            print(f"IR del cabinet caricata con successo da {self.ir_path}.")
-
-        except FileNotFoundError:
-            raise FileNotFoundError(f"File IR non trovato al percorso: {self.ir_path}")
-        except Exception as e:
-            raise IOError(f"Errore nel caricamento del file IR: {e}")
-
-    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both',
+                     out: np.ndarray | None = None) -> np.ndarray:
         """
         Applica l'effetto di cabinet tramite convoluzione.
+        Tutti i canali selezionati vengono convoluti insieme, in un'unica FFT, con lo spettro dell'IR in cache.
 
         Parametri in input:
         - audio_signal: Il segnale audio da processare.
         - samplerate: La frequenza di campionamento del segnale audio.
         - channel_mode: Specifica quali canali devono essere elaborati ('both', 'right', 'left').
+        - out: (opzionale) buffer preallocato in cui scrivere il risultato (vedi AudioEffect.apply_effect).
 
         Parametri in output:
         - processed_signal: Il segnale audio con l'effetto di cabinet applicato.
         """
-        if self._ir is None:
-            raise RuntimeError("Risposta all'Impulso (IR) non caricata. Chiamare _load_ir() o controllare il percorso.")
-
-        ir_to_use = self._ir.copy()
-
-        if samplerate != self._ir_samplerate:
-            print(
-                f"Attenzione: Frequenza di campionamento del segnale ({samplerate} Hz) diversa dall'IR ({self._ir_samplerate} Hz). "
-                "Attuo il resampling...")
-            num = samplerate
-            den = self._ir_samplerate
-            ir_to_use = resample_poly(ir_to_use, num, den)
-
-        original_signal = audio_signal.copy()
-        processed_signal = original_signal.copy()
+        ir_to_use = self._get_ir(samplerate)
+        n_fft = fft_size_for(len(ir_to_use))
+        audio_signal = to_processing_dtype(audio_signal)
+        ir_spectrum = get_ir_spectrum(self.ir_path, samplerate, n_fft, audio_signal.dtype)
 
         if audio_signal.ndim == 1:
-            processed_effect = self._process_mono(audio_signal, ir_to_use)
-            # Taglia il segnale processato alla lunghezza originale (la convoluzione lo allunga)
-            processed_effect = processed_effect[:len(audio_signal)]
+            processed_signal = self._output_buffer(audio_signal, out)
+            processed_effect = convolve_channels(audio_signal[:, np.newaxis], self._mono_ir(ir_spectrum),
+                                                 n_fft, len(ir_to_use))[:, 0]
 
-            processed_signal = (1 - self.mix) * original_signal + self.mix * processed_effect
+            self._mix_into(processed_signal, audio_signal, processed_effect, self.mix)
 
         elif audio_signal.ndim == 2:
+            channels = self._selected_channels(channel_mode)
+            processed_signal = self._output_buffer(audio_signal, out)
+            self._copy_unselected(audio_signal, processed_signal, channels)
 
-            if channel_mode == 'both' or channel_mode == 'left':
-                processed_left = self._process_mono(audio_signal[:, 0], ir_to_use)
-                processed_left = processed_left[:len(audio_signal)]
-                processed_signal[:, 0] = (1 - self.mix) * original_signal[:, 0] + self.mix * processed_left
-
-            if channel_mode == 'both' or channel_mode == 'right':
-                processed_right = self._process_mono(audio_signal[:, 1], ir_to_use)
-                processed_right = processed_right[:len(audio_signal)]
-                processed_signal[:, 1] = (1 - self.mix) * original_signal[:, 1] + self.mix * processed_right
-
-            elif channel_mode not in ['both', 'left', 'right']:
-                raise ValueError("Modalità canale non valida. Scegli tra 'both', 'left', o 'right'.")
+            channel_spectrum, input_channels = self._route_ir(ir_spectrum, channels)
+            processed_effect = convolve_channels(self._channel_view(audio_signal, input_channels), channel_spectrum,
+                                                 n_fft, len(ir_to_use))
+            for i, channel in enumerate(channels):
+                self._mix_into(processed_signal[:, channel], audio_signal[:, channel], processed_effect[:, i], self.mix)
 
         else:
             raise ValueError("Formato audio non supportato. Il segnale deve essere 1D (mono) o 2D (stereo).")
 
-        max_val = np.max(np.abs(processed_signal))
-        if max_val > 0:
-            processed_signal /= max_val
-
         return processed_signal
 
+    def lti_response(self, samplerate: int, channel_mode: str = 'both', num_channels: int = 2) -> np.ndarray:
+        """
+        Il cabinet è LTI: la risposta è (1 - mix) * impulso + mix * IR sui canali selezionati, l'impulso sugli altri.
+        """
+        ir = self._get_ir(samplerate)
+        response = identity_response(len(ir), num_channels)
+
+        if num_channels == 1:
+            response[:, 0, 0] *= 1 - self.mix
+            response[:, 0, 0] += self.mix * self._mono_ir(ir)
+            return response
+
+        for channel in self._selected_channels(channel_mode):
+            response[0, channel, channel] -= self.mix
+            if ir.ndim == 3:
+                response[:, channel, :2] += self.mix * ir[:, channel, :]
+            elif ir.ndim == 2:
+                response[:, channel, channel] += self.mix * ir[:, channel]
+            else:
+                response[:, channel, channel] += self.mix * ir
+        return response
+
+    def memory_samples(self, samplerate: int, tolerance: float) -> int:
+        """ La convoluzione con l'IR dipende dagli ultimi len(IR) - 1 campioni di input. """
+        return len(self._get_ir(samplerate)) - 1
+
+    def reset(self):
+        """ Azzera la coda della convoluzione a blocchi, mantenendo gli spettri dell'IR. """
+        if self._convolver is not None:
+            self._convolver.reset()
+
+    def process_block(self, audio_block: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+        """
+            Applica il cabinet a un blocco di un flusso stereo tramite convoluzione partizionata,
+            conservando la coda della convoluzione tra i blocchi.
+        """
+        channels = self._selected_channels(channel_mode)
+        audio_block = to_processing_dtype(audio_block)
+
+        if self._convolver is None or self._convolver_key != (samplerate, channel_mode, audio_block.dtype):
+            # Gli spettri dell'IR vengono calcolati una sola volta e riutilizzati per tutti i blocchi
+            channel_ir, self._convolver_inputs = self._route_ir(self._get_ir(samplerate), channels)
+            self._convolver = PartitionedConvolver(channel_ir, head_partition_size(audio_block.shape[0]),
+                                                   dtype=audio_block.dtype.type)
+            self._convolver_key = (samplerate, channel_mode, audio_block.dtype)
+
+        processed_block = audio_block.copy()
+        processed_effect = self._convolver.process_block(audio_block[:, self._convolver_inputs])
+        processed_block[:, channels] = (1 - self.mix) * audio_block[:, channels] + self.mix * processed_effect
+        return processed_block
+
+    def _get_ir(self, samplerate: int) -> np.ndarray:
+        """
+        Restituisce l'IR (in sola lettura) alla frequenza di campionamento richiesta.
+        Il resampling viene eseguito una sola volta per file e frequenza, grazie alla cache condivisa.
+        """
+        if self._ir is None:
+            self._load_ir()
+
+        return get_resampled_ir(self.ir_path, samplerate)
+
     @staticmethod
-    def _process_mono(signal: np.ndarray, ir: np.ndarray) -> np.ndarray:
+    def _route_ir(ir: np.ndarray, channels: list[int]) -> tuple[np.ndarray, list[int]]:
         """
-        Metodo helper statico per l'elaborazione mono tramite convoluzione.
+        Restituisce l'IR (o il suo spettro) ridotta ai canali di uscita selezionati e i canali di ingresso da convolvere:
+        con un'IR true stereo ogni uscita selezionata riceve entrambi i canali di ingresso.
         """
-        return fftconvolve(signal, ir, mode='full')
\ No newline at end of file
+        if ir.ndim == 3:
+            return ir[:, channels, :], [0, 1]
+        if ir.ndim == 2:
+            return ir[:, channels], channels
+        return ir, channels
+
+    @staticmethod
+    def _mono_ir(ir: np.ndarray) -> np.ndarray:
+        """ Riduce un'IR (o il suo spettro) multicanale a mono per un segnale mono, mediando i canali di uscita. """
+        if ir.ndim == 3:
+            return ir.sum(axis=2).mean(axis=1)
+        if ir.ndim == 2:
+            return ir.mean(axis=1)
+        return ir
@@ -0,0 +1,346 @@
+import numpy as np
+
+from thesis_project.src.effects.parallel import get_num_threads, parallel_map
+
+# Dimensione massima della partizione iniziale scelta automaticamente in base ai blocchi del flusso
+MAX_HEAD_PARTITION_SIZE = 4096
+# Numero massimo di punti trasformati insieme da convolve_channels (limita la memoria degli spettri a ~16 MB)
+MAX_BATCH_FFT_POINTS = 1 << 20
+
+
+def head_partition_size(block_length: int) -> int:
+    """
+    Sceglie la dimensione della partizione iniziale per blocchi di `block_length` campioni:
+    la potenza di due più grande non superiore al blocco (al massimo MAX_HEAD_PARTITION_SIZE).
+    """
+    size = 1
+    while size * 2 <= min(block_length, MAX_HEAD_PARTITION_SIZE):
+        size *= 2
+    return size
+
+
+def fft_size_for(ir_length: int) -> int:
+    """
+    Dimensione della FFT usata da convolve_channels per un'IR di `ir_length` campioni:
+    la potenza di due non inferiore a 4 volte l'IR (almeno 4096), così che ogni blocco di input sia lungo almeno quanto l'IR.
+    Dipende solo dall'IR: lo spettro può essere calcolato una volta e riutilizzato per segnali di qualsiasi durata.
+    """
+    size = 4096
+    while size < 4 * ir_length:
+        size *= 2
+    return size
+
+
+def output_channels(ir: np.ndarray, input_channels: int) -> int:
+    """
+    Numero di canali prodotti dalla convoluzione con un'IR (o il suo spettro) nei formati supportati:
+    - (M,): IR mono, applicata a ogni canale;
+    - (M, C): un'IR per canale (C canali in ingresso e in uscita);
+    - (M, C_out, C_in): matrice di IR (true stereo: L->L, L->R, R->L, R->R), ogni uscita somma tutti gli ingressi.
+    """
+    if ir.ndim == 3:
+        return ir.shape[1]
+    return input_channels
+
+
+def convolve_channels(signal: np.ndarray, ir_spectrum: np.ndarray, n_fft: int, ir_length: int) -> np.ndarray:
+    """
+    Convoluzione overlap-add multicanale con lo spettro di un'IR già calcolato, troncata alla lunghezza del segnale.
+    I canali vengono copiati, un gruppo di blocchi alla volta, in un buffer contiguo (canale, campioni) e tutti i blocchi
+    del gruppo, di tutti i canali, vengono trasformati in un'unica FFT lungo l'asse dei campioni.
+    I gruppi vengono trasformati in parallelo sul pool condiviso (vedi parallel_map).
+
+    Parametri in input:
+    - signal: segnale di input (2D, con i canali sulle colonne).
+    - ir_spectrum: spettro dell'IR (rfft su n_fft punti lungo il primo asse), di forma (F,), (F, C) o (F, C_out, C_in)
+                   (vedi output_channels).
+    - n_fft: numero di punti della FFT (vedi fft_size_for).
+    - ir_length: lunghezza dell'IR in campioni.
+
+    Parametri in output:
+    - processed_signal: il segnale convoluto (2D, canali sulle colonne), della stessa lunghezza del segnale di input.
+    """
+    # scipy.fft viene importato al primo uso di una convoluzione, non all'avvio del programma
+    from scipy.fft import irfft, rfft
+
+    num_samples, channels = signal.shape
+    hop = n_fft - ir_length + 1
+    num_blocks = max(1, -(-num_samples // hop))
+
+    processed_signal = np.zeros((output_channels(ir_spectrum, channels), (num_blocks + 1) * hop), dtype=signal.dtype)
+    # I blocchi vengono trasformati a gruppi, per limitare la memoria occupata dai blocchi e dai loro spettri,
+    # e almeno un gruppo per thread, così che i gruppi vengano elaborati in parallelo sul pool condiviso
+    group = max(1, min(MAX_BATCH_FFT_POINTS // (n_fft * channels), -(-num_blocks // get_num_threads())))
+
+    def convolve_group(first: int) -> np.ndarray:
+        count = min(group, num_blocks - first)
+        start = first * hop
+        segment = signal[start:start + count * hop]
+        blocks = np.zeros((channels, count * hop), dtype=signal.dtype)
+        blocks[:, :segment.shape[0]] = segment.T
+        spectrum = rfft(blocks.reshape(channels, count, hop), n=n_fft, axis=-1)
+
+        if ir_spectrum.ndim == 3:
+            spectrum = np.einsum('ibf,foi->obf', spectrum, ir_spectrum)
+        elif ir_spectrum.ndim == 2:
+            spectrum *= ir_spectrum.T[:, np.newaxis, :]
+        else:
+            spectrum *= ir_spectrum
+        return irfft(spectrum, n=n_fft, axis=-1)
+
+    # La somma overlap-add resta nel thread chiamante, nell'ordine dei gruppi
+    firsts = range(0, num_blocks, group)
+    for first, convolved in zip(firsts, parallel_map(convolve_group, firsts)):
+        count = convolved.shape[1]
+        start = first * hop
+        # La coda di ogni blocco (ir_length - 1 <= hop campioni) si somma all'inizio del blocco successivo
+        heads = processed_signal[:, start:start + count * hop].reshape(-1, count, hop)
+        heads += convolved[:, :, :hop]
+        tails = processed_signal[:, start + hop:start + (count + 1) * hop].reshape(-1, count, hop)
+        tails[:, :, :ir_length - 1] += convolved[:, :, hop:hop + ir_length - 1]
+
+    return processed_signal[:, :num_samples].T
+
+
+def identity_response(length: int, channels: int) -> np.ndarray:
+    """
+    Matrice di IR (length, channels, channels) dell'identità: un impulso unitario in t = 0 sulla diagonale.
+    Usata come punto di partenza per le risposte degli effetti LTI (vedi AudioEffect.lti_response).
+    """
+    response = np.zeros((max(length, 1), channels, channels))
+    response[0, np.arange(channels), np.arange(channels)] = 1.0
+    return response
+
+
+def compose_responses(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Risposta di due sistemi LTI in cascata (prima `first`, poi `second`), entrambi matrici di IR (M, C, C)
+    indicizzate (uscita, ingresso): h[:, o, i] = sum_k second[:, o, k] * first[:, k, i] (convoluzioni).
+    La lunghezza della risposta risultante è M1 + M2 - 1.
+    """
+    from scipy.fft import irfft, next_fast_len, rfft
+
+    length = first.shape[0] + second.shape[0] - 1
+    n_fft = next_fast_len(length, real=True)
+    spectrum = np.einsum('fok,fki->foi', rfft(second, n=n_fft, axis=0), rfft(first, n=n_fft, axis=0))
+    return irfft(spectrum, n=n_fft, axis=0)[:length]
+
+
+def simplify_response(response: np.ndarray) -> np.ndarray:
+    """
+    Riduce una matrice di IR (M, C, C) alla forma più economica da convolvere (vedi output_channels):
+    (M,) se tutti i canali hanno la stessa IR e non si mescolano, (M, C) se la matrice è diagonale,
+    altrimenti la matrice stessa.
+    """
+    channels = response.shape[1]
+    diagonal = response[:, np.arange(channels), np.arange(channels)]
+    if np.any(response - diagonal[:, :, np.newaxis] * np.eye(channels)):
+        return response
+    if np.all(diagonal == diagonal[:, :1]):
+        return diagonal[:, 0].copy()
+    return diagonal.copy()
+
+
+class _UniformPartitions:
+    """
+    Sezione dell'IR divisa in partizioni di uguale dimensione (overlap-save con linea di ritardo in frequenza).
+    Gli spettri delle partizioni sono calcolati una sola volta alla costruzione.
+    """
+
+    def __init__(self, ir_section: np.ndarray, size: int, dtype: type = np.float64):
+        from scipy.fft import rfft
+
+        self.size = size
+        self.dtype = dtype
+        self.count = -(-len(ir_section) // size)
+        self.matrix = ir_section.ndim == 3
+
+        padded = np.zeros((self.count * size,) + ir_section.shape[1:], dtype=dtype)
+        padded[:len(ir_section)] = ir_section
+        # Spettri delle partizioni, forma (partizioni, size + 1, ...): per un'IR mono l'ultimo asse si estende sui canali
+        self.spectra = rfft(padded.reshape((self.count, size) + ir_section.shape[1:]), n=2 * size, axis=1)
+        if ir_section.ndim == 1:
+            self.spectra = self.spectra[:, :, np.newaxis]
+
+        self.input_buffer = None
+        self.fill = 0
+        self.delay_line = None
+        self.pointer = 0
+
+    def reset(self, channels: int):
+        """ Azzera il buffer di input e la linea di ritardo degli spettri per `channels` canali. """
+        self.input_buffer = np.zeros((2 * self.size, channels), dtype=self.dtype)
+        self.fill = 0
+        self.delay_line = np.zeros((self.count, self.size + 1, channels), dtype=self.spectra.dtype)
+        self.pointer = 0
+
+    def push(self, samples: np.ndarray):
+        """ Accoda nuovi campioni di input alla partizione corrente. """
+        start = self.size + self.fill
+        self.input_buffer[start:start + samples.shape[0]] = samples
+        self.fill += samples.shape[0]
+
+    def step(self, commit: bool = True) -> np.ndarray:
+        """
+        Calcola i `size` campioni di output della partizione corrente.
+        Con commit=False la partizione (eventualmente incompleta, completata con zeri) non viene consumata:
+        lo stato resta invariato e i campioni già presenti potranno essere completati in seguito.
+        """
+        from scipy.fft import irfft, rfft
+
+        spectrum = rfft(self.input_buffer, axis=0)
+        if self.matrix:
+            accumulated = np.einsum('fi,foi->fo', spectrum, self.spectra[0])
+        else:
+            accumulated = spectrum * self.spectra[0]
+
+        if self.count > 1:
+            # Spettri dei blocchi precedenti, dal più recente al più vecchio
+            order = (self.pointer - np.arange(self.count - 1)) % self.count
+            if self.matrix:
+                accumulated += np.einsum('kfi,kfoi->fo', self.delay_line[order], self.spectra[1:])
+            else:
+                accumulated += (self.delay_line[order] * self.spectra[1:]).sum(axis=0)
+
+        if commit:
+            self.pointer = (self.pointer + 1) % self.count
+            self.delay_line[self.pointer] = spectrum
+            self.input_buffer[:self.size] = self.input_buffer[self.size:]
+            self.input_buffer[self.size:] = 0.0
+            self.fill = 0
+
+        return irfft(accumulated, n=2 * self.size, axis=0)[self.size:]
+
+
+class PartitionedConvolver:
+    """
+    Convoluzione a blocchi a bassa latenza con partizionamento non uniforme dell'IR.
+
+    L'inizio dell'IR è diviso in partizioni piccole (block_size), che producono l'output senza latenza
+    algoritmica; la coda usa partizioni che raddoppiano di dimensione, calcolate solo quando il relativo
+    blocco di input è completo. Ogni sezione inizia a un offset non inferiore alla dimensione delle proprie
+    partizioni, quindi il suo contributo cade sempre su campioni futuri e viene accumulato in un buffer circolare.
+    Gli spettri dell'IR sono calcolati una sola volta alla costruzione.
+    """
+
+    def __init__(self, ir: np.ndarray, block_size: int = 128, max_partition_size: int = 8192,
+                 partitions_per_size: int = 2, dtype: type = np.float64):
+        """
+        Parametri in input:
+        - ir: La risposta all'impulso, di forma (M,), (M, C) o (M, C_out, C_in) (vedi output_channels).
+        - block_size: dimensione della partizione iniziale (in campioni): determina la latenza e il costo per blocco.
+        - max_partition_size: dimensione massima delle partizioni della coda.
+        - partitions_per_size: numero di partizioni per ogni dimensione prima di raddoppiarla (almeno 2).
+        - dtype: tipo dei campioni elaborati (np.float32 o np.float64); gli spettri dell'IR sono calcolati nella stessa precisione.
+        """
+        if partitions_per_size < 2:
+            raise ValueError("Servono almeno 2 partizioni per dimensione per non introdurre latenza.")
+
+        self.block_size = block_size
+        self.dtype = dtype
+        self._ir = ir
+        self._sections = []  # Lista di (offset nell'IR, sezione partizionata)
+
+        offset = 0
+        size = block_size
+        while offset < len(ir) or not self._sections:
+            remaining = -(-(len(ir) - offset) // size)
+            can_grow = 2 * size <= max_partition_size
+            # Raggiunta la dimensione massima, tutto il resto dell'IR va in un'unica sezione uniforme
+            count = max(1, min(partitions_per_size, remaining) if can_grow else remaining)
+            self._sections.append((offset, _UniformPartitions(ir[offset:offset + count * size], size, dtype)))
+            offset += count * size
+            if can_grow and offset >= 2 * size:
+                size *= 2
+
+        # Buffer circolare dei contributi futuri delle sezioni della coda
+        last_offset, last_section = self._sections[-1]
+        self._accumulator_length = block_size + last_offset + last_section.size
+        self._accumulator = None
+        self._pending = None
+        self._pending_fill = 0
+        self._emitted = 0
+        self._time = 0
+
+    @property
+    def latency_samples(self) -> int:
+        """ Latenza algoritmica in campioni (oltre a quella del blocco di I/O): sempre nulla. """
+        return 0
+
+    def reset(self):
+        """ Azzera lo stato della convoluzione, mantenendo gli spettri dell'IR. """
+        self._accumulator = None
+
+    def _initialize(self, channels: int):
+        for _, section in self._sections:
+            section.reset(channels)
+        self._accumulator = np.zeros((self._accumulator_length, output_channels(self._ir, channels)), dtype=self.dtype)
+        self._pending = np.zeros((self.block_size, channels), dtype=self.dtype)
+        self._pending_fill = 0
+        self._emitted = 0
+        self._time = 0
+
+    def process_block(self, audio_block: np.ndarray) -> np.ndarray:
+        """
+        Convolve un blocco (ndim=2, canali sulle colonne) con l'IR; con una matrice di IR l'output ha C_out canali.
+        Il blocco può avere qualsiasi lunghezza: i campioni che non completano una partizione iniziale
+        vengono elaborati subito (completati con zeri) e ricalcolati quando la partizione si completa.
+
+        Parametri in input:
+        - audio_block: il blocco da convolvere.
+
+        Parametri in output:
+        - processed_block: il blocco convoluto, della stessa lunghezza del blocco di input.
+        """
+        if self._accumulator is None or self._pending.shape[1] != audio_block.shape[1]:
+            self._initialize(audio_block.shape[1])
+
+        processed_block = np.empty((audio_block.shape[0], self._accumulator.shape[1]), dtype=self.dtype)
+        position = 0
+        while position < audio_block.shape[0]:
+            take = min(self.block_size - self._pending_fill, audio_block.shape[0] - position)
+            self._pending[self._pending_fill:self._pending_fill + take] = audio_block[position:position + take]
+            self._sections[0][1].push(audio_block[position:position + take])
+            self._pending_fill += take
+
+            if self._pending_fill == self.block_size:
+                output = self._commit()
+            else:
+                output = self._sections[0][1].step(commit=False)[:self._pending_fill]
+                output = output + self._read_accumulator(self._pending_fill)
+
+            processed_block[position:position + take] = output[self._emitted:]
+            position += take
+
+            if self._pending_fill == self.block_size:
+                self._pending_fill = 0
+                self._emitted = 0
+            else:
+                self._emitted = self._pending_fill
+
+        return processed_block
+
+    def _commit(self) -> np.ndarray:
+        """ Elabora una partizione iniziale completa e aggiorna le sezioni della coda. """
+        output = self._sections[0][1].step() + self._read_accumulator(self.block_size)
+
+        start = self._time % self._accumulator_length
+        indices = (start + np.arange(self.block_size)) % self._accumulator_length
+        self._accumulator[indices] = 0.0
+        self._time += self.block_size
+
+        for offset, section in self._sections[1:]:
+            section.push(self._pending)
+            if section.fill == section.size:
+                # Contributo ai campioni [time - size + offset, time + offset), tutti futuri perché offset >= size
+                contribution = section.step()
+                start = (self._time - section.size + offset) % self._accumulator_length
+                indices = (start + np.arange(section.size)) % self._accumulator_length
+                self._accumulator[indices] += contribution
+
+        return output
+
+    def _read_accumulator(self, num_samples: int) -> np.ndarray:
+        start = self._time % self._accumulator_length
+        indices = (start + np.arange(num_samples)) % self._accumulator_length
+        return self._accumulator[indices]
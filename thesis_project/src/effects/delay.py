@@ -1,9 +1,12 @@
 import numpy as np
 from thesis_project.src.effects.audio_effect import AudioEffect
+from thesis_project.src.effects.delay_lines import delay_line, feedback_comb, num_repeats
+from thesis_project.src.effects.parallel import parallel_map
+from thesis_project.src.effects.precision import to_processing_dtype
 
 
 class DelayEffect(AudioEffect):
-    def __init__(self, delay_time: float, feedback: float, mix: float):
+    def __init__(self, delay_time: float, feedback: float, mix: float, feedback_threshold: float | None = None):
         """
             Inizializza l'effetto di delay.
 
@@ -11,13 +14,20 @@ class DelayEffect(AudioEffect):
             - delay_time: Tempo di ritardo in secondi.
             - feedback: Percentuale del segnale ritardato da riaggiungere all'input per le ripetizioni successive. Valore tra 0.0 e 1.0.
             - mix: Miscela dry/wet. Valore tra 0.0 e 1.0.
+            - feedback_threshold: (opzionale) soglia lineare sotto la quale le ripetizioni vengono scartate
+                                  (ad es. 0.001 = -60 dB). None mantiene la serie di feedback completa.
         """
         self.delay_time = delay_time
         self.feedback = feedback
         self.mix = mix
+        self.feedback_threshold = feedback_threshold
+        # Numero di ripetizioni da mantenere se è richiesto il troncamento della serie di feedback
+        self._repeats = None if feedback_threshold is None else num_repeats(feedback, feedback_threshold)
+        self._stream_state = None  # Stato delle linee di ritardo per process_block
 
 
-    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both',
+                     out: np.ndarray | None = None) -> np.ndarray:
         """
             Applica l'effetto di delay al segnale audio.
 
@@ -25,51 +35,87 @@ class DelayEffect(AudioEffect):
             - audio_signal: Il segnale audio originale
             - samplerate: La frequenza di campionamento
             - channel_mode: Specifica quali canali devono essere elaborati ('both', 'right', 'left')
+            - out: (opzionale) buffer preallocato in cui scrivere il risultato (vedi AudioEffect.apply_effect)
 
             Parametri in output:
             - processed_signal: Il segnale audio con l'effetto di delay applicato.
         """
+        audio_signal = to_processing_dtype(audio_signal)
+        processed_signal = self._output_buffer(audio_signal, out)
+
         if audio_signal.ndim == 1:
-            processed_signal = self._process_mono(audio_signal, samplerate)
+            self._process_mono(audio_signal, samplerate, processed_signal)
 
         elif audio_signal.ndim == 2:
-            processed_signal = audio_signal.copy()
-
-            if channel_mode == 'both':
-                processed_signal[:, 0] = self._process_mono(audio_signal[:, 0], samplerate)
-                processed_signal[:, 1] = self._process_mono(audio_signal[:, 1], samplerate)
-            elif channel_mode == 'left':
-                processed_signal[:, 0] = self._process_mono(audio_signal[:, 0], samplerate)
-            elif channel_mode == 'right':
-                processed_signal[:, 1] = self._process_mono(audio_signal[:, 1], samplerate)
-            else:
-                raise ValueError("Modalità canale non valida. Scegli tra 'both', 'left', o 'right'.")
+            channels = self._selected_channels(channel_mode)
+            self._copy_unselected(audio_signal, processed_signal, channels)
+            # I canali vengono elaborati in parallelo sul pool condiviso (ognuno scrive solo la propria colonna);
+            # i segnali ritardati in memoria sono al più uno per thread
+            for _ in parallel_map(lambda channel: self._process_mono(audio_signal[:, channel], samplerate,
+                                                                     processed_signal[:, channel]), channels):
+                pass
 
         else:
             raise ValueError("Formato audio non supportato.")
 
-        max_val = np.max(np.abs(processed_signal))
-        if max_val > 0:
-            processed_signal /= max_val
-
         return processed_signal
 
-    def _process_mono(self, signal: np.ndarray, samplerate: int) -> np.ndarray:
-        """ Metodo helper per la logica di elaborazione mono. """
+    def memory_samples(self, samplerate: int, tolerance: float) -> int | None:
+        """
+            Ritardo puro seguito dal comb: ogni ripetizione guarda indietro di D campioni, e vengono mantenute
+            le ripetizioni con guadagno feedback^k >= tolerance (o quelle della serie troncata, se richiesta).
+        """
         delay_samples = int(self.delay_time * samplerate)
-        num_samples = len(signal)
-        delayed_signal = np.zeros(num_samples, dtype=signal.dtype)
-        processed_signal = signal.copy()
+        if self._repeats is None and abs(self.feedback) >= 1.0:
+            return None
+        repeats = self._repeats if self._repeats is not None else num_repeats(abs(self.feedback), tolerance)
+        return repeats * delay_samples
 
-        for i in range(delay_samples, num_samples):
-            delayed_signal[i] = processed_signal[i - delay_samples] + self.feedback * delayed_signal[i - delay_samples]
+    def reset(self):
+        """ Azzera le linee di ritardo usate da process_block. """
+        self._stream_state = None
 
-        processed_signal = (1 - self.mix) * signal + self.mix * delayed_signal
-        return processed_signal
+    def process_block(self, audio_block: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+        """
+            Applica il delay a un blocco di un flusso stereo, conservando le linee di ritardo tra i blocchi.
+        """
+        channels = self._selected_channels(channel_mode)
+        audio_block = to_processing_dtype(audio_block)
+        processed_block = audio_block.copy()
+        delayed_block, self._stream_state = self._render(audio_block[:, channels], samplerate, self._stream_state)
+        processed_block[:, channels] = (1 - self.mix) * audio_block[:, channels] + self.mix * delayed_block
+        return processed_block
+
+    def _process_mono(self, signal: np.ndarray, samplerate: int, out: np.ndarray):
+        """ Metodo helper per la logica di elaborazione mono: scrive in `out` il segnale miscelato. """
+        delayed_signal, _ = self._render(signal, samplerate, None)
+        self._mix_into(out, signal, delayed_signal, self.mix)
+
+    def _render(self, signal: np.ndarray, samplerate: int, state: tuple | None) -> tuple[np.ndarray, tuple | None]:
+        """
+            Logica di elaborazione condivisa tra apply_effect e process_block: calcola il segnale ritardato (wet).
+            Elabora tutte le colonne di `signal` insieme; `state` contiene gli stati della linea di ritardo
+            e del comb lasciati dal blocco precedente (None = silenzio).
+        """
+        delay_samples = int(self.delay_time * samplerate)
+
+        if delay_samples == 0:
+            # Senza ritardo il segnale ritardato coincide con l'input (il feedback non ha effetto)
+            delayed_signal = signal.copy()
+        else:
+            # d[i] = x[i - D] + feedback * d[i - D]: ritardo puro seguito da un comb a feedback di periodo D
+            line_state, comb_state = state if state is not None else (None, None)
+            delayed_signal, line_state = delay_line(signal, delay_samples, line_state)
+            delayed_signal, comb_state = feedback_comb(delayed_signal, delay_samples, self.feedback, comb_state,
+                                                       repeats=self._repeats)
+            state = (line_state, comb_state)
+
+        return delayed_signal, state
 
 
 class PingPongDelayEffect(AudioEffect):  # Non ereditiamo più da DelayEffect
-    def __init__(self, delay_time_l: float, delay_time_r: float, feedback: float, mix: float):
+    def __init__(self, delay_time_l: float, delay_time_r: float, feedback: float, mix: float,
+                 feedback_threshold: float | None = None):
         """
             Inizializza l'effetto di Ping Pong Delay Asimmetrico.
 
@@ -78,67 +124,131 @@ class PingPongDelayEffect(AudioEffect):  # Non ereditiamo più da DelayEffect
             - delay_time_r: Tempo di ritardo in secondi per il canale Destro (R->L).
             - feedback: Percentuale del segnale ritardato da riaggiungere.
             - mix: Miscela dry/wet.
+            - feedback_threshold: (opzionale) soglia lineare sotto la quale le ripetizioni vengono scartate.
+                                  None mantiene la serie di feedback completa.
         """
         self.delay_time_l = delay_time_l
         self.delay_time_r = delay_time_r
         self.feedback = feedback
         self.mix = mix
+        self.feedback_threshold = feedback_threshold
+        # Un giro completo L -> R -> L attraversa due volte il feedback: la serie decade con feedback^2
+        self._repeats = None if feedback_threshold is None else num_repeats(feedback ** 2, feedback_threshold)
+        self._stream_state = None  # Stato delle linee di ritardo per process_block
 
-    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both',
+                     out: np.ndarray | None = None) -> np.ndarray:
         """
             Applica l'effetto di Ping Pong Delay Asimmetrico.
             Questo effetto richiede **sempre** un segnale stereo (ndim=2).
+            Con `out` il risultato viene scritto nel buffer preallocato (vedi AudioEffect.apply_effect).
         """
         if audio_signal.ndim != 2:
             raise ValueError("Il Ping Pong Delay richiede un segnale stereo (ndim=2) per funzionare.")
 
-        num_samples = audio_signal.shape[0]
+        audio_signal = to_processing_dtype(audio_signal)
 
         # Calcola il ritardo in campioni per ogni direzione
         delay_samples_l = int(self.delay_time_l * samplerate)
         delay_samples_r = int(self.delay_time_r * samplerate)
 
-        # Determina il buffer più grande necessario
-        max_delay_samples = max(delay_samples_l, delay_samples_r)
-
-        processed_signal = audio_signal.copy()
-
-        # Inizializza i buffer di delay (wet signal)
-        delay_buffer_l = np.zeros(num_samples, dtype=audio_signal.dtype)
-        delay_buffer_r = np.zeros(num_samples, dtype=audio_signal.dtype)
+        processed_signal = self._output_buffer(audio_signal, out)
+        self._copy_unselected(audio_signal, processed_signal, [0, 1])
 
         # Segnali di input (dry)
         signal_l = audio_signal[:, 0]
         signal_r = audio_signal[:, 1]
 
-        # L'elaborazione inizia dopo il punto del ritardo più lungo
-        for i in range(max_delay_samples, num_samples):
+        delay_buffer_l, delay_buffer_r, _ = self._process_stereo(signal_l, signal_r, delay_samples_l,
+                                                                 delay_samples_r, None)
+
+        self._mix_into(processed_signal[:, 0], signal_l, delay_buffer_l, self.mix)
+        self._mix_into(processed_signal[:, 1], signal_r, delay_buffer_r, self.mix)
 
-            # Calcolo del ritardo per il canale Sinistro (L)
-            # Input Ritardato (Wet) L: Input secco di L MA il feedback (wet) arriva da R
-            if i >= delay_samples_r:
-                delay_in_l = signal_l[i - delay_samples_l] + self.feedback * delay_buffer_r[i - delay_samples_r]
-            else:
-                # Per i primi campioni (fino al ritardo L) il delay è solo il segnale secco ritardato
-                delay_in_l = signal_l[i - delay_samples_l]
+        return processed_signal
+
+    def memory_samples(self, samplerate: int, tolerance: float) -> int | None:
+        """
+            Il canale sinistro è un comb di periodo D_l + D_r e guadagno feedback^2 sugli input ritardati
+            (al più max(D_l, 2 * D_r) campioni), il destro lo legge con un ulteriore ritardo D_l.
+        """
+        delay_samples_l = int(self.delay_time_l * samplerate)
+        delay_samples_r = int(self.delay_time_r * samplerate)
+        if self._repeats is None and abs(self.feedback) >= 1.0:
+            return None
+        repeats = self._repeats if self._repeats is not None else num_repeats(self.feedback ** 2, tolerance)
+        return (delay_samples_l + max(delay_samples_l, 2 * delay_samples_r)
+                + (repeats - 1) * (delay_samples_l + delay_samples_r))
+
+    def reset(self):
+        """ Azzera le linee di ritardo usate da process_block. """
+        self._stream_state = None
+
+    def process_block(self, audio_block: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+        """
+            Applica il Ping Pong Delay a un blocco di un flusso stereo, conservando le linee di ritardo tra i blocchi.
+        """
+        if audio_block.ndim != 2:
+            raise ValueError("Il Ping Pong Delay richiede un segnale stereo (ndim=2) per funzionare.")
 
-            delay_buffer_l[i] = delay_in_l
+        audio_block = to_processing_dtype(audio_block)
+        delay_samples_l = int(self.delay_time_l * samplerate)
+        delay_samples_r = int(self.delay_time_r * samplerate)
 
-            # Calcolo del ritardo per il canale Destro (R)
-            # Input Ritardato (Wet) R: Input secco di R MA il feedback (wet) arriva da L
-            if i >= delay_samples_l:
-                delay_in_r = signal_r[i - delay_samples_r] + self.feedback * delay_buffer_l[i - delay_samples_l]
-            else:
-                # Per i primi campioni (fino al ritardo R) il delay è solo il segnale secco ritardato
-                delay_in_r = signal_r[i - delay_samples_r]
+        signal_l = audio_block[:, 0]
+        signal_r = audio_block[:, 1]
+        delay_buffer_l, delay_buffer_r, self._stream_state = self._process_stereo(
+            signal_l, signal_r, delay_samples_l, delay_samples_r, self._stream_state)
 
-            delay_buffer_r[i] = delay_in_r
+        processed_block = np.empty_like(audio_block)
+        processed_block[:, 0] = (1 - self.mix) * signal_l + self.mix * delay_buffer_l
+        processed_block[:, 1] = (1 - self.mix) * signal_r + self.mix * delay_buffer_r
+        return processed_block
 
-        processed_signal[:, 0] = (1 - self.mix) * signal_l + self.mix * delay_buffer_l
-        processed_signal[:, 1] = (1 - self.mix) * signal_r + self.mix * delay_buffer_r
+    def _process_stereo(self, signal_l: np.ndarray, signal_r: np.ndarray, delay_samples_l: int,
+                        delay_samples_r: int, state: dict | None) -> tuple[np.ndarray, np.ndarray, dict]:
+        """
+            Calcola i due segnali ritardati (wet) incrociati:
+                wet_l[i] = signal_l[i - D_l] + feedback * wet_r[i - D_r]
+                wet_r[i] = signal_r[i - D_r] + feedback * wet_l[i - D_l]
+            a partire dal campione max(D_l, D_r) (prima di quel punto i buffer restano a zero).
 
-        max_val = np.max(np.abs(processed_signal))
-        if max_val > 0:
-            processed_signal /= max_val
+            Sostituendo la seconda equazione nella prima, il canale sinistro diventa un comb a feedback
+            di periodo D_l + D_r e guadagno feedback^2, e il destro si ottiene dal sinistro con un ritardo puro:
+            nessun ciclo per campione.
 
-        return processed_signal
\ No newline at end of file
+            `state` contiene la posizione nel flusso e gli stati delle linee di ritardo lasciati dal blocco
+            precedente (None = inizio del flusso).
+        """
+        if state is None:
+            state = {"position": 0, "input_l": None, "input_r": None, "cross_r": None, "comb": None, "cross_l": None}
+
+        num_samples = signal_l.shape[0]
+        # L'elaborazione inizia dopo il punto del ritardo più lungo (posizione assoluta nel flusso)
+        start = min(max(max(delay_samples_l, delay_samples_r) - state["position"], 0), num_samples)
+
+        # Input secchi ritardati, nulli prima dell'inizio dell'elaborazione
+        input_l, state["input_l"] = delay_line(signal_l, delay_samples_l, state["input_l"])
+        input_r, state["input_r"] = delay_line(signal_r, delay_samples_r, state["input_r"])
+        input_l[:start] = 0.0
+        input_r[:start] = 0.0
+
+        if delay_samples_r == 0:
+            # Il feedback R -> L legge un campione di R non ancora calcolato (zero): nessun anello di retroazione
+            delay_buffer_l = input_l
+        else:
+            cross_r, state["cross_r"] = delay_line(input_r, delay_samples_r, state["cross_r"])
+            # input_l + feedback * cross_r, calcolato in place per non allocare altri segnali temporanei
+            cross_r *= self.feedback
+            input_l += cross_r
+            del cross_r
+            delay_buffer_l, state["comb"] = feedback_comb(input_l, delay_samples_l + delay_samples_r,
+                                                          self.feedback ** 2, state["comb"], repeats=self._repeats)
+
+        cross_l, state["cross_l"] = delay_line(delay_buffer_l, delay_samples_l, state["cross_l"])
+        cross_l *= self.feedback
+        delay_buffer_r = input_r
+        delay_buffer_r += cross_l
+
+        state["position"] += num_samples
+        return delay_buffer_l, delay_buffer_r, state
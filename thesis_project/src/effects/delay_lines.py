@@ -0,0 +1,144 @@
+import math
+
+import numpy as np
+
+# Sopra questo periodo conviene iterare sulle righe (poche righe lunghe), sotto conviene lfilter
+# lungo le colonne (molte righe corte)
+_ROW_LOOP_MIN_PERIOD = 512
+
+
+def num_repeats(gain: float, threshold: float) -> int:
+    """
+        Calcola quanti termini della serie di feedback (gain^0, gain^1, ...) restano sopra la soglia.
+
+        Parametri in input:
+        - gain: guadagno di feedback, valore tra 0.0 e 1.0 (escluso).
+        - threshold: soglia (lineare) sotto la quale le ripetizioni vengono scartate.
+
+        Parametri in output:
+        - repeats: numero di termini K tali che gain^k >= threshold per k = 0 .. K-1.
+    """
+    if not 0.0 < threshold < 1.0:
+        raise ValueError("La soglia di troncamento deve essere compresa tra 0.0 e 1.0 (esclusi).")
+    if gain >= 1.0:
+        raise ValueError("Con feedback >= 1.0 la serie non decade: il troncamento non è possibile.")
+    if gain <= 0.0:
+        return 1
+
+    return int(math.floor(math.log(threshold) / math.log(gain))) + 1
+
+
+def delay_line(signal: np.ndarray, delay: int, history: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Ritardo puro di `delay` campioni lungo il primo asse: y[n] = x[n - delay].
+
+        Parametri in input:
+        - signal: segnale di input (1D, oppure 2D con i canali sulle colonne).
+        - delay: ritardo in campioni.
+        - history: gli ultimi `delay` campioni di input precedenti (None = silenzio).
+
+        Parametri in output:
+        - delayed, history: il segnale ritardato e lo stato da passare alla chiamata successiva.
+    """
+    num_samples = signal.shape[0]
+    if history is None:
+        history = np.zeros((delay,) + signal.shape[1:], dtype=signal.dtype)
+
+    if delay == 0:
+        return signal.copy(), history
+
+    delayed = np.empty_like(signal)
+    if num_samples >= delay:
+        delayed[:delay] = history
+        delayed[delay:] = signal[:num_samples - delay]
+        new_history = signal[num_samples - delay:].copy()
+    else:
+        delayed[:] = history[:num_samples]
+        new_history = np.concatenate((history[num_samples:], signal))
+
+    return delayed, new_history
+
+
+def feedback_comb(signal: np.ndarray, period: int, gain: float, history: np.ndarray | None = None,
+                  repeats: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Filtro comb a feedback lungo il primo asse: y[n] = x[n] + gain * y[n - period].
+
+        La ricorsione guarda indietro di `period` campioni, quindi il segnale viene rimodellato in righe
+        di `period` campioni e ogni colonna diventa un filtro IIR del primo ordine: ogni riga si calcola
+        in blocco dalla precedente, senza alcun ciclo Python per campione.
+        Con `repeats` la serie viene troncata ai primi K termini (FIR): y[n] = sum_{k<K} gain^k * x[n - k*period].
+
+        Parametri in input:
+        - signal: segnale di input (1D, oppure 2D con i canali sulle colonne).
+        - period: periodo della ricorsione in campioni (> 0).
+        - gain: guadagno di feedback.
+        - history: stato della chiamata precedente (None = silenzio).
+        - repeats: numero di termini della serie da mantenere (None = serie completa).
+
+        Parametri in output:
+        - processed, history: il segnale filtrato e lo stato da passare alla chiamata successiva.
+    """
+    if period <= 0:
+        raise ValueError("Il periodo del filtro comb deve essere positivo.")
+
+    if repeats is not None:
+        return _truncated_comb(signal, period, gain, history, repeats)
+
+    num_samples = signal.shape[0]
+    tail_shape = signal.shape[1:]
+    if history is None:
+        history = np.zeros((period,) + tail_shape, dtype=signal.dtype)
+
+    if num_samples == 0:
+        return signal.copy(), history
+
+    rows = -(-num_samples // period)
+    blocks = np.zeros((rows * period,) + tail_shape, dtype=np.result_type(signal, history))
+    blocks[:num_samples] = signal
+    blocks = blocks.reshape((rows, period) + tail_shape)
+
+    # y_r = x_r + gain * y_(r-1), con y_(-1) = history
+    if period >= _ROW_LOOP_MIN_PERIOD:
+        blocks[0] += gain * history
+        for r in range(1, rows):
+            blocks[r] += gain * blocks[r - 1]
+        processed = blocks
+    else:
+        # Importato qui: scipy.signal da solo raddoppia il tempo di avvio del programma
+        from scipy.signal import lfilter
+
+        # lfilter lavora sull'ultimo asse: le colonne diventano righe contigue
+        columns = np.ascontiguousarray(np.moveaxis(blocks, 0, -1))
+        initial_state = np.moveaxis(gain * history[np.newaxis], 0, -1)
+        # Coefficienti nel tipo del segnale, per non promuovere a float64 un segnale in float32
+        processed, _ = lfilter(np.array([1.0], dtype=columns.dtype), np.array([1.0, -gain], dtype=columns.dtype),
+                               columns, axis=-1, zi=initial_state)
+        processed = np.moveaxis(processed, -1, 0)
+
+    processed = processed.reshape((rows * period,) + tail_shape)[:num_samples]
+
+    if num_samples >= period:
+        new_history = processed[num_samples - period:].copy()
+    else:
+        new_history = np.concatenate((history[num_samples:], processed))
+
+    return processed, new_history
+
+
+def _truncated_comb(signal: np.ndarray, period: int, gain: float, history: np.ndarray | None,
+                    repeats: int) -> tuple[np.ndarray, np.ndarray]:
+    """ Versione FIR (serie troncata) di feedback_comb: lo stato sono gli ultimi (repeats - 1) * period input. """
+    num_samples = signal.shape[0]
+    history_len = (repeats - 1) * period
+    if history is None:
+        history = np.zeros((history_len,) + signal.shape[1:], dtype=signal.dtype)
+
+    extended = np.concatenate((history, signal))
+    processed = signal.copy()
+    for k in range(1, repeats):
+        start = history_len - k * period
+        processed += gain ** k * extended[start:start + num_samples]
+
+    new_history = extended[extended.shape[0] - history_len:].copy()
+    return processed, new_history
@@ -0,0 +1,105 @@
+import numpy as np
+from thesis_project.src.effects.audio_effect import AudioEffect
+from thesis_project.src.effects.convolution import (PartitionedConvolver, convolve_channels, fft_size_for,
+                                                    head_partition_size, simplify_response)
+from thesis_project.src.effects.ir_cache import IRCache
+from thesis_project.src.effects.precision import to_processing_dtype
+
+# Cache condivisa delle risposte complessive e dei loro spettri,
+# indicizzata da (descrizioni degli effetti fusi, samplerate, canali[, n_fft, dtype])
+FUSED_RESPONSE_CACHE = IRCache()
+
+
+class FusedConvolutionEffect(AudioEffect):
+    """
+    Sequenza di effetti LTI consecutivi fusi in un'unica convoluzione con la loro risposta complessiva.
+    Viene costruito dal compilatore della catena (vedi chain_compiler.compile_chain) e lavora sempre su tutti
+    i canali: le modalità canale e le miscele dry/wet dei singoli effetti sono già contenute nella risposta.
+    """
+
+    def __init__(self, response: np.ndarray, samplerate: int, effect_names: list[str],
+                 cache_key: tuple | None = None):
+        """
+        Parametri in input:
+        - response: matrice di IR (M, C, C) degli effetti in cascata (vedi AudioEffect.lti_response).
+        - samplerate: la frequenza di campionamento per cui è stata calcolata la risposta.
+        - effect_names: i nomi degli effetti fusi, per la visualizzazione.
+        - cache_key: (opzionale) la chiave della risposta in FUSED_RESPONSE_CACHE: gli spettri vengono
+                     memorizzati nella stessa cache e condivisi da tutte le catene che fondono gli stessi effetti.
+        """
+        self.ir = simplify_response(response)
+        self.num_channels = response.shape[1]
+        self.samplerate = samplerate
+        self.effect_names = effect_names
+        self._cache_key = cache_key
+        self._spectra = {}  # Spettri dell'IR per (n_fft, dtype), se la risposta non è in FUSED_RESPONSE_CACHE
+        self._convolver = None  # Convolutore partizionato usato da process_block
+        self._convolver_dtype = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({' + '.join(self.effect_names)})"
+
+    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both',
+                     out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Applica la convoluzione con la risposta complessiva degli effetti fusi.
+
+        Parametri in input:
+        - audio_signal: Il segnale audio da processare (con il numero di canali per cui è stata compilata la risposta).
+        - samplerate: La frequenza di campionamento (deve coincidere con quella della risposta).
+        - channel_mode: ignorato, le modalità canale degli effetti fusi sono già contenute nella risposta.
+        - out: (opzionale) buffer preallocato in cui scrivere il risultato (vedi AudioEffect.apply_effect).
+
+        Parametri in output:
+        - processed_signal: Il segnale audio con gli effetti fusi applicati.
+        """
+        self._check_signal(audio_signal, samplerate)
+        audio_signal = to_processing_dtype(audio_signal)
+        processed_signal = self._output_buffer(audio_signal, out)
+
+        signal_2d = audio_signal if audio_signal.ndim == 2 else audio_signal[:, np.newaxis]
+        n_fft = fft_size_for(len(self.ir))
+        processed_effect = convolve_channels(signal_2d, self._get_spectrum(n_fft, audio_signal.dtype), n_fft, len(self.ir))
+        processed_signal[:] = processed_effect if audio_signal.ndim == 2 else processed_effect[:, 0]
+        return processed_signal
+
+    def memory_samples(self, samplerate: int, tolerance: float) -> int:
+        """ La convoluzione con la risposta complessiva dipende dagli ultimi len(IR) - 1 campioni di input. """
+        return len(self.ir) - 1
+
+    def reset(self):
+        """ Azzera la coda della convoluzione a blocchi, mantenendo gli spettri della risposta. """
+        if self._convolver is not None:
+            self._convolver.reset()
+
+    def process_block(self, audio_block: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+        """
+            Applica la risposta complessiva a un blocco di un flusso tramite convoluzione partizionata.
+        """
+        self._check_signal(audio_block, samplerate)
+        audio_block = to_processing_dtype(audio_block)
+
+        if self._convolver is None or self._convolver_dtype != audio_block.dtype:
+            self._convolver = PartitionedConvolver(self.ir, head_partition_size(audio_block.shape[0]),
+                                                   dtype=audio_block.dtype.type)
+            self._convolver_dtype = audio_block.dtype
+
+        return self._convolver.process_block(audio_block)
+
+    def _get_spectrum(self, n_fft: int, dtype: np.dtype) -> np.ndarray:
+        """ Spettro dell'IR (rfft su n_fft punti) nella precisione richiesta, calcolato una sola volta. """
+        from scipy.fft import rfft
+
+        key = (n_fft, np.dtype(dtype).name)
+        if self._cache_key is not None:
+            return FUSED_RESPONSE_CACHE.get((*self._cache_key, *key), lambda: rfft(self.ir.astype(dtype), n=n_fft, axis=0))
+        if key not in self._spectra:
+            self._spectra[key] = rfft(self.ir.astype(dtype), n=n_fft, axis=0)
+        return self._spectra[key]
+
+    def _check_signal(self, audio_signal: np.ndarray, samplerate: int):
+        num_channels = 1 if audio_signal.ndim == 1 else audio_signal.shape[1]
+        if samplerate != self.samplerate:
+            raise ValueError(f"La catena è stata compilata per {self.samplerate} Hz, non per {samplerate} Hz.")
+        if num_channels != self.num_channels:
+            raise ValueError(f"La catena è stata compilata per segnali a {self.num_channels} canali.")
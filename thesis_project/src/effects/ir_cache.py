@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+import numpy as np
+
+from thesis_project.src.effects.ir_catalog import IR_CATALOG
+
+
+class IRCache:
+    """
+    Cache LRU condivisa dal processo, con un limite sulla memoria occupata dagli array memorizzati.
+    Gli array restituiti sono in sola lettura, perché condivisi tra tutte le istanze che li richiedono.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Parametri in input:
+        - max_bytes: memoria massima (in byte) occupata dagli array in cache.
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Restituisce il valore associato alla chiave, calcolandolo con `factory` (e memorizzandolo) se assente.
+
+        Parametri in input:
+        - key: chiave della voce.
+        - factory: funzione senza argomenti che produce il valore (un array o una tupla contenente array).
+
+        Parametri in output:
+        - il valore in cache.
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+            self.misses += 1
+            value = factory()
+            size = _freeze(value)
+            self._entries[key] = (value, size)
+            self._current_bytes += size
+            self._evict()
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Inserisce (o sostituisce) una voce già calcolata, ad esempio un array pubblicato in memoria condivisa
+        da un altro processo (vedi SharedIRStore).
+        """
+        with self._lock:
+            if key in self._entries:
+                self._current_bytes -= self._entries.pop(key)[1]
+            size = _freeze(value)
+            self._entries[key] = (value, size)
+            self._current_bytes += size
+            self._evict()
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        """ Restituisce le voci presenti in cache, dalla meno alla più recente. """
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self):
+        """ Svuota la cache e azzera i contatori. """
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """ Restituisce hit, miss, numero di voci e memoria occupata. """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": self._current_bytes}
+
+    def _evict(self):
+        """ Rimuove le voci usate meno di recente oltre max_bytes, mantenendo almeno quella appena inserita. """
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._current_bytes -= evicted_size
+
+
+def _freeze(value: Any) -> int:
+    """ Rende in sola lettura gli array contenuti nel valore e ne restituisce la dimensione in byte. """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(_freeze(item) for item in value)
+    return 0
+
+
+# Cache condivisa delle IR dei cabinet: IR decodificate, ricampionate e relativi spettri
+CABINET_IR_CACHE = IRCache()
+
+
+def _file_key(ir_path: Path) -> tuple[str, int]:
+    try:
+        return str(ir_path), ir_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File IR non trovato al percorso: {ir_path}")
+
+
+def load_ir(ir_path: Path) -> tuple[np.ndarray, int]:
+    """
+    Carica (una sola volta per file e data di modifica) un'IR normalizzata, mantenendone i canali:
+    - file mono: IR di forma (M,), applicata a ogni canale;
+    - file a 2 canali: un'IR per canale, forma (M, 2) (L->L, R->R);
+    - file a 4 canali (true stereo, ordine L->L, L->R, R->L, R->R): matrice di forma (M, 2, 2) indicizzata (uscita, ingresso).
+    L'IR viene letta dall'indice della libreria (vedi IRCatalog), che decodifica il file solo se nuovo o modificato.
+
+    Parametri in input:
+    - ir_path: percorso del file IR.
+
+    Parametri in output:
+    - ir, samplerate: l'IR (in sola lettura) e la sua frequenza di campionamento.
+    """
+    def read():
+        ir_data, sr = IR_CATALOG.load(ir_path)
+        print(f"IR del cabinet caricata con successo da {ir_path}.")
+        return ir_data, sr
+
+    path_key, mtime = _file_key(ir_path)
+    return CABINET_IR_CACHE.get((path_key, mtime, None, None), read)
+
+
+def get_resampled_ir(ir_path: Path, samplerate: int) -> np.ndarray:
+    """
+    Restituisce l'IR alla frequenza di campionamento richiesta. Le versioni a 44.1, 48 e 96 kHz sono già
+    nell'indice della libreria; le altre vengono ricampionate una sola volta e aggiunte all'indice.
+
+    Parametri in input:
+    - ir_path: percorso del file IR.
+    - samplerate: frequenza di campionamento di destinazione.
+
+    Parametri in output:
+    - ir: l'IR ricampionata (in sola lettura).
+    """
+    ir_data, ir_samplerate = load_ir(ir_path)
+    if samplerate == ir_samplerate:
+        return ir_data
+
+    path_key, mtime = _file_key(ir_path)
+    return CABINET_IR_CACHE.get((path_key, mtime, samplerate, None), lambda: IR_CATALOG.resampled(ir_path, samplerate))
+
+
+def get_ir_spectrum(ir_path: Path, samplerate: int, n_fft: int, dtype: type = np.float64) -> np.ndarray:
+    """
+    Restituisce lo spettro (rfft su n_fft punti lungo l'asse dei campioni) dell'IR alla frequenza di campionamento richiesta.
+    Gli spettri in float64 delle versioni standard sono già nell'indice della libreria; gli altri vengono
+    calcolati una sola volta e aggiunti all'indice.
+
+    Parametri in input:
+    - ir_path: percorso del file IR.
+    - samplerate: frequenza di campionamento di destinazione.
+    - n_fft: numero di punti della FFT.
+    - dtype: precisione dei campioni da convolvere (lo spettro è complex64 per float32, complex128 per float64).
+
+    Parametri in output:
+    - spectrum: lo spettro dell'IR (in sola lettura).
+    """
+    path_key, mtime = _file_key(ir_path)
+    return CABINET_IR_CACHE.get((path_key, mtime, samplerate, n_fft, np.dtype(dtype).name),
+                                lambda: IR_CATALOG.spectrum(ir_path, samplerate, n_fft, dtype))
@@ -0,0 +1,302 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from thesis_project.src.effects.convolution import fft_size_for
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+IR_INDEX_DIR = BASE_DIR / "cache" / "ir_index"
+
+# Frequenze di campionamento per cui ogni IR viene ricampionata (e il suo spettro calcolato) durante l'indicizzazione
+STANDARD_SAMPLERATES = (44100, 48000, 96000)
+# Ampiezza relativa al picco sotto la quale la coda dell'IR non conta nella lunghezza efficace (-60 dB)
+EFFECTIVE_LENGTH_THRESHOLD = 1e-3
+
+_INDEX_FILE = "index.json"
+
+
+def decode_ir(ir_path: Path) -> tuple[np.ndarray, int, float]:
+    """
+    Decodifica un file IR e lo normalizza, mantenendone i canali:
+    - file mono: IR di forma (M,), applicata a ogni canale;
+    - file a 2 canali: un'IR per canale, forma (M, 2) (L->L, R->R);
+    - file a 4 canali (true stereo, ordine L->L, L->R, R->L, R->R): matrice di forma (M, 2, 2) indicizzata (uscita, ingresso).
+
+    Parametri in input:
+    - ir_path: percorso del file IR.
+
+    Parametri in output:
+    - ir, samplerate, peak: l'IR normalizzata, la sua frequenza di campionamento e il picco prima della normalizzazione.
+    """
+    # soundfile viene importato solo quando un'IR deve essere letta dal disco
+    import soundfile as sf
+
+    try:
+        ir_data, sr = sf.read(ir_path)
+    except Exception as e:
+        raise IOError(f"Errore nel caricamento del file IR: {e}")
+
+    if ir_data.ndim == 2:
+        if ir_data.shape[1] == 1:
+            ir_data = ir_data[:, 0]
+        elif ir_data.shape[1] == 4:
+            # Colonne (ingresso, uscita) -> matrice (uscita, ingresso)
+            ir_data = np.ascontiguousarray(ir_data.reshape(-1, 2, 2).transpose(0, 2, 1))
+        elif ir_data.shape[1] != 2:
+            raise IOError(f"Errore nel caricamento del file IR: {ir_data.shape[1]} canali non supportati "
+                          f"(sono ammesse IR mono, stereo o true stereo a 4 canali).")
+
+    peak = float(np.max(np.abs(ir_data))) if ir_data.size else 0.0
+    if peak > 0:
+        ir_data /= peak
+    return ir_data, sr, peak
+
+
+def effective_length(ir: np.ndarray, threshold: float = EFFECTIVE_LENGTH_THRESHOLD) -> int:
+    """ Numero di campioni dell'IR fino all'ultimo con ampiezza (su tutti i canali) sopra threshold rispetto al picco. """
+    envelope = np.abs(ir.reshape(len(ir), -1)).max(axis=1)
+    if not envelope.size or envelope.max() == 0:
+        return 0
+    return int(np.flatnonzero(envelope > threshold * envelope.max())[-1]) + 1
+
+
+class IRCatalog:
+    """
+    Indice su disco della libreria di IR dei cabinet. Per ogni file registra frequenza di campionamento, canali,
+    lunghezza, lunghezza efficace e picco, e conserva in formato .npy (letto tramite memory map) l'IR normalizzata,
+    le sue versioni ricampionate a STANDARD_SAMPLERATES e i loro spettri alla dimensione di FFT usata
+    dalla convoluzione (vedi fft_size_for). Le versioni per altre frequenze e precisioni vengono calcolate
+    e salvate al primo utilizzo.
+    L'indice viene aggiornato in modo incrementale: un file viene rianalizzato solo se ne cambiano dimensione
+    o data di modifica, e i dati dei file rimossi vengono eliminati. Il file dell'indice viene riletto prima di ogni
+    scrittura, così che processi concorrenti (ad esempio quelli di run_render_farm) non ne perdano le voci.
+    Se la cartella dell'indice non è scrivibile (installazione in sola lettura, disco pieno) le IR e i dati derivati
+    vengono calcolati in memoria, come senza indice.
+    """
+
+    def __init__(self, index_dir: Path = IR_INDEX_DIR):
+        """
+        Parametri in input:
+        - index_dir: la cartella dell'indice e dei dati derivati delle IR.
+        """
+        self.index_dir = Path(index_dir)
+        self._entries = None  # Voci dell'indice per percorso del file, lette da disco al primo utilizzo
+        self._lock = threading.RLock()
+        self._storage_error = False  # True dopo la prima scrittura non riuscita (segnalata una sola volta)
+
+    def refresh(self, ir_dir: Path, pattern: str = "*.wav") -> list[dict]:
+        """
+            Aggiorna l'indice per i file IR di una cartella: indicizza i file nuovi o modificati e rimuove quelli
+            cancellati. I file non leggibili vengono segnalati e saltati.
+
+            Parametri in input:
+            - ir_dir: la cartella delle IR.
+            - pattern: pattern glob dei file IR nella cartella.
+
+            Parametri in output:
+            - entries: le voci dell'indice dei file presenti, ordinate per nome.
+        """
+        ir_dir = Path(ir_dir)
+        paths = sorted((path for path in ir_dir.glob(pattern) if path.is_file()), key=lambda path: path.name)
+        with self._lock:
+            index = self._load_index()
+            removed = [key for key in index if Path(key).parent == ir_dir and not Path(key).is_file()]
+            for key in removed:
+                self._remove_data(index.pop(key))
+            if removed:
+                self._save_index(dict.fromkeys(removed))
+
+            entries = []
+            for path in paths:
+                try:
+                    entries.append(self.entry(path))
+                except IOError as e:
+                    print(f"IR '{path.name}' ignorata: {e}")
+            return entries
+
+    def entry(self, ir_path: Path) -> dict:
+        """
+            Restituisce la voce dell'indice di un file IR, indicizzandolo se nuovo o modificato.
+
+            Parametri in input:
+            - ir_path: percorso del file IR.
+
+            Parametri in output:
+            - entry: name, samplerate, channels, length, effective_length e peak dell'IR (più i dati di identificazione).
+        """
+        ir_path = Path(ir_path)
+        try:
+            stat = ir_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File IR non trovato al percorso: {ir_path}")
+
+        def current(entry):
+            return entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+        key = str(ir_path)
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if not current(entry):
+                # Un altro processo potrebbe aver già indicizzato il file
+                entry = self._read_index().get(key, entry)
+            if not current(entry):
+                if entry is not None:
+                    self._remove_data(entry)
+                entry = self._index_file(ir_path, stat)
+                self._save_index({key: entry})
+            index[key] = entry
+            return entry
+
+    def load(self, ir_path: Path) -> tuple[np.ndarray, int]:
+        """ Restituisce l'IR normalizzata (memory map in sola lettura) e la sua frequenza di campionamento. """
+        entry = self.entry(ir_path)
+        return self._array(entry, str(entry["samplerate"]), lambda: decode_ir(ir_path)[0]), entry["samplerate"]
+
+    def resampled(self, ir_path: Path, samplerate: int) -> np.ndarray:
+        """ Restituisce l'IR alla frequenza di campionamento richiesta (memory map in sola lettura). """
+        entry = self.entry(ir_path)
+        if samplerate == entry["samplerate"]:
+            return self.load(ir_path)[0]
+
+        def resample():
+            from scipy.signal import resample_poly
+
+            print(f"Attenzione: Frequenza di campionamento del segnale ({samplerate} Hz) diversa dall'IR "
+                  f"({entry['samplerate']} Hz). Attuo il resampling...")
+            return resample_poly(self.load(ir_path)[0], samplerate, entry["samplerate"], axis=0)
+
+        return self._array(entry, str(samplerate), resample)
+
+    def spectrum(self, ir_path: Path, samplerate: int, n_fft: int, dtype: type = np.float64) -> np.ndarray:
+        """
+            Restituisce lo spettro (rfft su n_fft punti lungo l'asse dei campioni) dell'IR alla frequenza
+            di campionamento richiesta, nella precisione dei campioni da convolvere (memory map in sola lettura).
+        """
+        from scipy.fft import rfft
+
+        entry = self.entry(ir_path)
+        dtype = np.dtype(dtype)
+        return self._array(entry, f"{samplerate}_{n_fft}_{dtype.name}",
+                           lambda: rfft(self.resampled(ir_path, samplerate).astype(dtype), n=n_fft, axis=0))
+
+    def _index_file(self, ir_path: Path, stat: os.stat_result) -> dict:
+        """ Analizza un file IR e ne salva IR normalizzata, versioni ricampionate standard e relativi spettri. """
+        from scipy.fft import rfft
+        from scipy.signal import resample_poly
+
+        print(f"Indicizzo l'IR '{ir_path.name}'...")
+        ir, samplerate, peak = decode_ir(ir_path)
+        identity = f"{ir_path}|{stat.st_size}|{stat.st_mtime_ns}"
+        entry = {"name": ir_path.name, "data": hashlib.sha1(identity.encode()).hexdigest()[:16],
+                 "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "samplerate": samplerate,
+                 "channels": 1 if ir.ndim == 1 else int(np.prod(ir.shape[1:])), "length": len(ir),
+                 "effective_length": effective_length(ir), "peak": peak}
+
+        try:
+            self._write(self._data_path(entry, str(samplerate)), ir)
+            for rate in STANDARD_SAMPLERATES:
+                variant = ir if rate == samplerate else resample_poly(ir, rate, samplerate, axis=0)
+                if rate != samplerate:
+                    self._write(self._data_path(entry, str(rate)), variant)
+                n_fft = fft_size_for(len(variant))
+                self._write(self._data_path(entry, f"{rate}_{n_fft}_float64"), rfft(variant, n=n_fft, axis=0))
+        except OSError as e:
+            # I dati non salvati vengono calcolati in memoria quando richiesti (vedi _array)
+            self._report_storage_error(e)
+        return entry
+
+    def _array(self, entry: dict, suffix: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Legge un dato derivato dell'IR, calcolandolo e salvandolo se non presente.
+        Se il dato non può essere salvato viene restituito l'array calcolato in memoria.
+        """
+        path = self._data_path(entry, suffix)
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            array = compute()
+        try:
+            self._write(path, array)
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            self._report_storage_error(e)
+            return array
+
+    def _data_path(self, entry: dict, suffix: str) -> Path:
+        return self.index_dir / f"{entry['data']}_{suffix}.npy"
+
+    def _write(self, path: Path, array: np.ndarray):
+        """ Scrittura atomica: un processo concorrente non legge mai un file incompleto. """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temporary_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(temporary_path, path)
+        except OSError:
+            # Disco pieno o cartella non scrivibile: nessun file incompleto resta nell'indice
+            with contextlib.suppress(OSError):
+                temporary_path.unlink(missing_ok=True)
+            raise
+
+    def _remove_data(self, entry: dict):
+        try:
+            for path in self.index_dir.glob(f"{entry['data']}_*.npy"):
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            self._report_storage_error(e)
+
+    def _load_index(self) -> dict:
+        if self._entries is None:
+            self._entries = self._read_index()
+        return self._entries
+
+    def _read_index(self) -> dict:
+        """ Legge il file dell'indice da disco (vuoto se assente o non leggibile). """
+        try:
+            with open(self.index_dir / _INDEX_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, changes: dict[str, dict | None]):
+        """
+        Applica le voci aggiunte, aggiornate o rimosse (None) all'indice su disco, riletto subito prima della scrittura:
+        le voci scritte nel frattempo da altri processi vengono mantenute (e acquisite dall'indice in memoria).
+        """
+        index = self._read_index()
+        for key, entry in changes.items():
+            if entry is None:
+                index.pop(key, None)
+            else:
+                index[key] = entry
+        self._load_index().update({key: entry for key, entry in index.items() if key not in changes})
+
+        temporary_path = self.index_dir / f"{_INDEX_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with open(temporary_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+            os.replace(temporary_path, self.index_dir / _INDEX_FILE)
+        except OSError as e:
+            with contextlib.suppress(OSError):
+                temporary_path.unlink(missing_ok=True)
+            self._report_storage_error(e)
+
+    def _report_storage_error(self, error: OSError):
+        """ Segnala (una sola volta) che l'indice non è scrivibile: le IR vengono comunque elaborate in memoria. """
+        if not self._storage_error:
+            self._storage_error = True
+            print(f"Attenzione: impossibile aggiornare l'indice delle IR in '{self.index_dir}' ({error}). "
+                  f"Le IR vengono elaborate in memoria.")
+
+
+# Indice condiviso dal processo, usato dal menu dei cabinet e da CabinetEffect (tramite ir_cache)
+IR_CATALOG = IRCatalog()
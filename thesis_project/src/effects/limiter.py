@@ -0,0 +1,101 @@
+import numpy as np
+
+from thesis_project.src.effects.precision import to_processing_dtype
+
+
+class LookAheadLimiter:
+    """
+    Limitatore con look-ahead per lo stadio di uscita dell'elaborazione a blocchi (streaming e live), dove il picco
+    globale del segnale non è noto e la normalizzazione non è possibile.
+    Il guadagno richiesto da ogni campione (ceiling / picco tra i canali, al più 1) viene esteso con un minimo
+    mobile sulla finestra di look-ahead più quella di rilascio e poi smussato con una media mobile sulla finestra
+    di look-ahead: ogni campione in uscita resta sotto il ceiling, e il guadagno scende gradualmente prima del picco
+    (per questo l'uscita è ritardata di lookahead campioni). Il calcolo è vettoriale su ogni blocco.
+    """
+
+    def __init__(self, samplerate: int, ceiling_db: float = -1.0, lookahead: float = 0.005, release: float = 0.05):
+        """
+        Parametri in input:
+        - samplerate: la frequenza di campionamento del flusso.
+        - ceiling_db: il livello massimo dell'uscita in dBFS.
+        - lookahead: il tempo di look-ahead (s), che è anche la latenza del limitatore e il tempo di attacco.
+        - release: il tempo (s) per cui il guadagno resta ridotto dopo un picco prima di risalire.
+        """
+        self.samplerate = samplerate
+        self.ceiling = 10 ** (ceiling_db / 20)
+        self.lookahead_samples = max(int(round(lookahead * samplerate)), 1)
+        self.release_samples = max(int(round(release * samplerate)), 0)
+        self._state = None
+
+    def latency_samples(self) -> int:
+        """ Ritardo introdotto dal limitatore in campioni (il look-ahead). """
+        return self.lookahead_samples
+
+    def reset(self):
+        """ Azzera lo stato del limitatore prima di un nuovo flusso. """
+        self._state = None
+
+    def process_block(self, audio_block: np.ndarray, channel_gains: np.ndarray | None = None) -> np.ndarray:
+        """
+            Limita un blocco del flusso: restituisce un blocco della stessa lunghezza, ritardato di lookahead campioni.
+
+            Parametri in input:
+            - audio_block: il blocco di campioni (num_samples, canali).
+            - channel_gains: (opzionale) guadagni fissi per canale (ad es. quelli del pan), applicati nella stessa
+                             moltiplicazione del guadagno del limitatore, dopo la limitazione.
+
+            Parametri in output:
+            - limited_block: il blocco limitato.
+        """
+        from scipy.ndimage import minimum_filter1d, uniform_filter1d
+
+        audio_block = to_processing_dtype(audio_block)
+        if self._state is None or self._state["delay"].shape[1] != audio_block.shape[1]:
+            self._initialize(audio_block.shape[1], audio_block.dtype)
+        state = self._state
+        num_samples = audio_block.shape[0]
+
+        # Guadagno richiesto da ogni campione di input (canali collegati: lo stesso guadagno per tutti)
+        peak = np.abs(audio_block).max(axis=1)
+        required_gain = np.minimum(1.0, self.ceiling / np.maximum(peak, np.finfo(peak.dtype).tiny))
+
+        # Minimo mobile: ogni campione in uscita usa il guadagno più basso richiesto dai lookahead campioni
+        # successivi (attacco anticipato) e dai release campioni precedenti (mantenimento dopo il picco)
+        held_gain = self._sliding(minimum_filter1d, state["required"], required_gain,
+                                  self.lookahead_samples + self.release_samples + 1)
+        state["required"] = np.concatenate((state["required"], required_gain))[num_samples:]
+
+        # Media mobile sulla finestra di look-ahead: il guadagno varia senza scalini e resta sotto quello richiesto
+        gain = self._sliding(uniform_filter1d, state["held"], held_gain, self.lookahead_samples)
+        state["held"] = np.concatenate((state["held"], held_gain))[num_samples:]
+
+        delayed = np.concatenate((state["delay"], audio_block))
+        state["delay"] = delayed[num_samples:]
+        gain = gain[:, np.newaxis] if channel_gains is None else np.multiply.outer(gain, channel_gains)
+        return delayed[:num_samples] * gain
+
+    def flush(self, channel_gains: np.ndarray | None = None) -> np.ndarray:
+        """ Restituisce gli ultimi lookahead campioni, ancora nella linea di ritardo, a fine flusso. """
+        if self._state is None:
+            return np.empty((0, 0))
+        tail = np.zeros((self.lookahead_samples, self._state["delay"].shape[1]), dtype=self._state["delay"].dtype)
+        return self.process_block(tail, channel_gains)
+
+    def _initialize(self, channels: int, dtype: np.dtype):
+        self._state = {
+            "delay": np.zeros((self.lookahead_samples, channels), dtype=dtype),
+            "required": np.ones(self.lookahead_samples + self.release_samples, dtype=dtype),
+            "held": np.ones(self.lookahead_samples - 1, dtype=dtype),
+        }
+
+    @staticmethod
+    def _sliding(window_filter, history: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+        """
+        Applica il filtro (minimo o media) sulle finestre di `size` valori che terminano in ciascun nuovo valore,
+        usando la storia dei size - 1 valori precedenti.
+        """
+        extended = np.concatenate((history, values))
+        filtered = window_filter(extended, size=size, mode='nearest')
+        # Il filtro è centrato: la finestra che termina all'indice i ha centro i - (size - 1) + size // 2
+        start = size // 2
+        return filtered[start:start + len(values)]
@@ -0,0 +1,193 @@
+import numpy as np
+from thesis_project.src.effects.audio_effect import AudioEffect
+from thesis_project.src.effects.precision import to_processing_dtype
+
+# Interpolazioni disponibili per la lettura del ritardo frazionario
+INTERPOLATIONS = ("linear", "allpass")
+# Campioni elaborati insieme da una sola operazione vettoriale (senza feedback il ritardo non ne limita la lunghezza)
+MAX_BLOCK_SIZE = 1 << 16
+
+
+def first_order_scan(coefficients: np.ndarray, inputs: np.ndarray, initial: np.ndarray) -> np.ndarray:
+    """
+        Calcola la ricorrenza y[n] = coefficients[n] * y[n - 1] + inputs[n] (con y[-1] = initial) come scan associativo:
+        a ogni passo ogni campione accumula il contributo dei campioni a distanza doppia rispetto al passo precedente,
+        con il prodotto dei coefficienti attraversati. Lo scan si ferma quando tutti i prodotti residui sono sotto
+        la precisione del tipo: con |coefficients| <= 1/3 (interpolazione all-pass) bastano 5-6 passi vettoriali.
+
+        Parametri in input:
+        - coefficients: i coefficienti della ricorrenza, forma (N, canali).
+        - inputs: i termini noti, forma (N, canali).
+        - initial: l'uscita precedente al primo campione, forma (canali,).
+
+        Parametri in output:
+        - outputs: l'uscita della ricorrenza, forma (N, canali).
+    """
+    products = coefficients.copy()
+    outputs = inputs.copy()
+    outputs[0] += products[0] * initial
+    products[0] = 0.0  # Il primo campione è già completo: i prodotti che lo attraversano si annullano
+
+    tolerance = np.finfo(outputs.dtype).eps
+    shift = 1
+    while shift < len(outputs) and np.abs(products).max() > tolerance:
+        outputs[shift:] += products[shift:] * outputs[:-shift]
+        products[shift:] *= products[:-shift]
+        shift *= 2
+    return outputs
+
+
+class ModulatedDelayEffect(AudioEffect):
+    def __init__(self, delay_time: float, depth: float, rate: float, feedback: float = 0.0, mix: float = 0.5,
+                 interpolation: str = "linear", stereo_phase: float = 90.0):
+        """
+            Inizializza l'effetto di ritardo modulato (chorus, flanger, vibrato): una linea di ritardo frazionario
+            il cui ritardo oscilla attorno a delay_time con un LFO sinusoidale.
+
+            Parametri in input:
+            - delay_time: ritardo medio in secondi.
+            - depth: ampiezza della modulazione del ritardo in secondi.
+            - rate: frequenza dell'LFO in Hz.
+            - feedback: quota del segnale ritardato riaggiunta alla linea di ritardo. Valore tra -1.0 e 1.0 (escluso).
+            - mix: miscela dry/wet. Valore tra 0.0 e 1.0.
+            - interpolation: 'linear' (interpolazione lineare) oppure 'allpass' (all-pass del primo ordine:
+                             risposta in ampiezza piatta, senza l'attenuazione delle alte frequenze della lineare).
+            - stereo_phase: sfasamento in gradi dell'LFO del canale destro rispetto al sinistro.
+        """
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Interpolazione '{interpolation}' non valida. Scegli tra {', '.join(INTERPOLATIONS)}.")
+        if not -1.0 < feedback < 1.0:
+            raise ValueError("Il feedback del ritardo modulato deve essere compreso tra -1.0 e 1.0 (escluso).")
+
+        self.delay_time = delay_time
+        self.depth = depth
+        self.rate = rate
+        self.feedback = feedback
+        self.mix = mix
+        self.interpolation = interpolation
+        self.stereo_phase = stereo_phase
+        self._stream_state = None  # Linea di ritardo, uscita dell'all-pass e posizione dell'LFO per process_block
+
+    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both',
+                     out: np.ndarray | None = None) -> np.ndarray:
+        """
+            Applica il ritardo modulato al segnale audio.
+
+            Parametri in input:
+            - audio_signal: Il segnale audio originale
+            - samplerate: La frequenza di campionamento
+            - channel_mode: Specifica quali canali devono essere elaborati ('both', 'right', 'left')
+            - out: (opzionale) buffer preallocato in cui scrivere il risultato (vedi AudioEffect.apply_effect)
+
+            Parametri in output:
+            - processed_signal: Il segnale audio con il ritardo modulato applicato.
+        """
+        audio_signal = to_processing_dtype(audio_signal)
+        processed_signal = self._output_buffer(audio_signal, out)
+
+        if audio_signal.ndim == 1:
+            wet_signal, _ = self._render(audio_signal[:, np.newaxis], samplerate, [0], None)
+            self._mix_into(processed_signal, audio_signal, wet_signal[:, 0], self.mix)
+
+        elif audio_signal.ndim == 2:
+            channels = self._selected_channels(channel_mode)
+            self._copy_unselected(audio_signal, processed_signal, channels)
+            dry_signal = self._channel_view(audio_signal, channels)
+            wet_signal, _ = self._render(dry_signal, samplerate, channels, None)
+            self._mix_into(self._channel_view(processed_signal, channels), dry_signal, wet_signal, self.mix)
+
+        else:
+            raise ValueError("Formato audio non supportato.")
+
+        return processed_signal
+
+    def memory_samples(self, samplerate: int, tolerance: float) -> None:
+        """
+            L'effetto non è tempo-invariante: la fase dell'LFO dipende dalla posizione assoluta nel segnale,
+            che un segmento elaborato da solo non conosce. La memoria è quindi considerata illimitata
+            (render_chain_segmented elabora la catena per intero).
+        """
+        return None
+
+    def reset(self):
+        """ Azzera la linea di ritardo e la fase dell'LFO usate da process_block. """
+        self._stream_state = None
+
+    def process_block(self, audio_block: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+        """
+            Applica il ritardo modulato a un blocco di un flusso stereo, conservando linea di ritardo e fase dell'LFO
+            tra i blocchi.
+        """
+        channels = self._selected_channels(channel_mode)
+        audio_block = to_processing_dtype(audio_block)
+        processed_block = audio_block.copy()
+        wet_block, self._stream_state = self._render(audio_block[:, channels], samplerate, channels,
+                                                     self._stream_state)
+        processed_block[:, channels] = (1 - self.mix) * audio_block[:, channels] + self.mix * wet_block
+        return processed_block
+
+    def _render(self, signal: np.ndarray, samplerate: int, channels: list[int],
+                state: tuple | None) -> tuple[np.ndarray, tuple]:
+        """
+            Logica di elaborazione condivisa tra apply_effect e process_block: calcola il segnale ritardato (wet)
+            di tutte le colonne di `signal` insieme. `state` contiene la coda della linea di ritardo, l'ultima uscita
+            dell'all-pass e la posizione dell'LFO lasciate dal blocco precedente (None = silenzio, fase iniziale).
+
+            La linea di ritardo contiene v[n] = x[n] + feedback * w[n], e l'uscita w[n] legge v al ritardo
+            frazionario d[n] = delay_time + depth * sin(2 pi rate n / samplerate + fase del canale), in campioni.
+            I campioni vengono calcolati a blocchi con operazioni vettoriali: con il feedback ogni blocco non supera
+            il ritardo minimo, così che tutti i campioni letti dalla linea siano già stati scritti.
+            Il ritardo non scende sotto 1 campione con il feedback (1.5 con l'interpolazione all-pass, che legge
+            due campioni a partire dal ritardo meno mezzo campione).
+        """
+        num_samples, num_channels = signal.shape
+        allpass = self.interpolation == "allpass"
+        # Con l'all-pass la parte frazionaria è in [0.5, 1.5): il coefficiente resta in (-1/5, 1/3]
+        offset = 0.5 if allpass else 0.0
+        min_delay = offset + (1.0 if self.feedback != 0 else 0.0)
+        base_delay = self.delay_time * samplerate
+        depth = abs(self.depth) * samplerate
+        history_length = int(np.ceil(max(base_delay + depth, min_delay))) + 2
+
+        if state is None:
+            history = np.zeros((history_length, num_channels), dtype=signal.dtype)
+            allpass_output = np.zeros(num_channels, dtype=signal.dtype)
+            position = 0
+        else:
+            history, allpass_output, position = state
+
+        delay_line = np.concatenate((history, signal))
+        wet_signal = np.empty_like(signal)
+        columns = np.arange(num_channels)
+        phases = np.deg2rad(self.stereo_phase) * np.asarray(channels, dtype=np.float64)
+
+        block_size = MAX_BLOCK_SIZE
+        if self.feedback != 0:
+            block_size = min(block_size, int(np.floor(max(base_delay - depth, min_delay) - offset)))
+
+        for start in range(0, num_samples, block_size):
+            stop = min(start + block_size, num_samples)
+            time = np.arange(position + start, position + stop, dtype=np.float64)
+            delay = base_delay + depth * np.sin((2 * np.pi * self.rate / samplerate) * time[:, np.newaxis] + phases)
+            np.maximum(delay, min_delay, out=delay)
+
+            integer_delay = np.floor(delay - offset)
+            fraction = (delay - integer_delay).astype(signal.dtype)
+            read_index = np.arange(history_length + start, history_length + stop)[:, np.newaxis] - integer_delay.astype(np.intp)
+            near = delay_line[read_index, columns]
+            far = delay_line[read_index - 1, columns]
+
+            if allpass:
+                # y[n] = eta * v[n - k] + v[n - k - 1] - eta * y[n - 1], eta = (1 - f) / (1 + f)
+                eta = (1 - fraction) / (1 + fraction)
+                wet_block = first_order_scan(-eta, eta * near + far, allpass_output)
+                allpass_output = wet_block[-1].copy()
+            else:
+                wet_block = near + fraction * (far - near)
+
+            wet_signal[start:stop] = wet_block
+            if self.feedback != 0:
+                delay_line[history_length + start:history_length + stop] += self.feedback * wet_block
+
+        state = (delay_line[-history_length:].copy(), allpass_output, position + num_samples)
+        return wet_signal, state
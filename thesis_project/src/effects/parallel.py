@@ -0,0 +1,89 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Di default un thread per core disponibile al processo: FFT (scipy.fft) e kernel NumPy/SciPy rilasciano il GIL
+DEFAULT_NUM_THREADS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+_num_threads = DEFAULT_NUM_THREADS
+_pool = None
+_pool_lock = threading.Lock()
+_worker = threading.local()
+
+
+def set_num_threads(num_threads: int | None):
+    """
+    Imposta il numero di thread del pool condiviso usato dagli effetti per elaborare in parallelo canali
+    e gruppi di blocchi della convoluzione. Con 1 thread tutta l'elaborazione resta nel thread chiamante.
+
+    Parametri in input:
+    - num_threads: il numero di thread (None per il default, un thread per core).
+    """
+    global _num_threads, _pool
+    num_threads = DEFAULT_NUM_THREADS if num_threads is None else num_threads
+    if num_threads < 1:
+        raise ValueError("Il numero di thread deve essere almeno 1.")
+
+    with _pool_lock:
+        if num_threads != _num_threads and _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+        _num_threads = num_threads
+
+
+def get_num_threads() -> int:
+    """ Restituisce il numero di thread del pool condiviso. """
+    return _num_threads
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """ Restituisce il pool condiviso, creato alla prima richiesta. """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_num_threads, thread_name_prefix="effects",
+                                       initializer=_mark_worker)
+        return _pool
+
+
+def _mark_worker():
+    _worker.active = True
+
+
+def parallel_map(function: Callable[[T], R], items: Iterable[T], max_pending: int | None = None) -> Iterable[R]:
+    """
+    Applica `function` a ogni elemento sul pool condiviso e restituisce i risultati nell'ordine degli elementi,
+    man mano che sono pronti. Al più `max_pending` elementi (di default il numero di thread) sono in elaborazione
+    o in attesa di essere consumati: la memoria occupata dai risultati resta limitata.
+    Con un solo thread, o se chiamata da un thread del pool (elaborazione annidata), l'elaborazione è sequenziale.
+
+    Parametri in input:
+    - function: la funzione da applicare (deve essere thread-safe: elementi diversi non condividono scritture).
+    - items: gli elementi da elaborare.
+    - max_pending: (opzionale) il numero massimo di elementi in volo.
+
+    Parametri in output:
+    - results: iteratore sui risultati, nell'ordine degli elementi.
+    """
+    if _num_threads == 1 or getattr(_worker, "active", False):
+        for item in items:
+            yield function(item)
+        return
+
+    pool = _get_pool()
+    max_pending = max_pending or _num_threads
+    pending = []
+    try:
+        for item in items:
+            pending.append(pool.submit(function, item))
+            if len(pending) >= max_pending:
+                yield pending.pop(0).result()
+        while pending:
+            yield pending.pop(0).result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,51 @@
+import numpy as np
+
+# Precisioni di elaborazione supportate dalla catena di effetti
+PRECISIONS = {'float32': np.float32, 'float64': np.float64}
+DEFAULT_PRECISION = 'float64'
+# Formato dei file scritti a blocchi (non normalizzati) per ciascuna precisione
+OUTPUT_SUBTYPES = {'float32': 'FLOAT', 'float64': 'DOUBLE'}
+
+# Errore massimo atteso (rispetto al fondo scala) dell'output in float32 rispetto a quello in float64:
+# -100 dB, sotto il rumore di quantizzazione di un file a 16 bit (circa 3e-5)
+FLOAT32_ERROR_BOUND = 1e-5
+
+_precision = DEFAULT_PRECISION
+
+
+def set_precision(precision: str):
+    """
+    Imposta la precisione di elaborazione dell'intera catena: caricamento del file, effetti, convoluzioni e scrittura.
+    In float32 la memoria occupata e il traffico di memoria si dimezzano; l'output differisce da quello in float64
+    di al più FLOAT32_ERROR_BOUND (rispetto al fondo scala).
+
+    Parametri in input:
+    - precision: 'float32' oppure 'float64'.
+    """
+    global _precision
+    if precision not in PRECISIONS:
+        raise ValueError(f"Precisione '{precision}' non supportata. Scegli tra {', '.join(PRECISIONS)}.")
+    _precision = precision
+
+
+def get_precision() -> str:
+    """ Restituisce il nome della precisione di elaborazione corrente ('float32' o 'float64'). """
+    return _precision
+
+
+def get_dtype() -> type:
+    """ Restituisce il tipo NumPy della precisione di elaborazione corrente. """
+    return PRECISIONS[_precision]
+
+
+def to_processing_dtype(audio_signal: np.ndarray) -> np.ndarray:
+    """
+    Converte il segnale nella precisione di elaborazione corrente (senza copia se è già nel tipo corretto).
+
+    Parametri in input:
+    - audio_signal: il segnale da convertire.
+
+    Parametri in output:
+    - il segnale nel tipo di elaborazione corrente.
+    """
+    return np.asarray(audio_signal, dtype=get_dtype())
@@ -1,10 +1,19 @@
+import zlib
+
 import numpy as np
-from scipy.signal import fftconvolve
 from thesis_project.src.effects.audio_effect import AudioEffect
+from thesis_project.src.effects.convolution import (PartitionedConvolver, convolve_channels, fft_size_for,
+                                                    head_partition_size, identity_response)
+from thesis_project.src.effects.ir_cache import IRCache
+from thesis_project.src.effects.precision import to_processing_dtype
+
+# Cache condivisa delle IR sintetiche e dei loro spettri,
+# indicizzata da (t60, num_reflections, decay_rate, seed, samplerate[, n_fft, dtype])
+REVERB_IR_CACHE = IRCache()
 
 
 class ReverbEffect(AudioEffect):
-    def __init__(self, t60: float, num_reflections: int, decay_rate: float, mix: float):
+    def __init__(self, t60: float, num_reflections: int, decay_rate: float, mix: float, seed: int | None = None):
         """
             Inizializza l'effetto di riverbero.
 
@@ -13,35 +22,70 @@ class ReverbEffect(AudioEffect):
             - num_reflections: densità delle prime riflessioni
             - decay_rate: decadimento exp
             - mix: Miscela dry/wet.
+            - seed: (opzionale) seme del generatore casuale delle riflessioni.
+                    Se None viene derivato da t60, num_reflections e decay_rate (vedi default_seed): gli stessi
+                    parametri producono sempre la stessa IR, in ogni esecuzione e in ogni processo.
         """
 
         self.t60 = t60
         self.num_reflections = num_reflections
         self.decay_rate = decay_rate
-        self.mix = np.clip(mix, 0.0, 1.0)
+        self.mix = float(np.clip(mix, 0.0, 1.0))
+        self.seed = seed if seed is not None else self.default_seed(t60, num_reflections, decay_rate)
+        self._convolver = None  # Convolutore partizionato usato da process_block
+        self._convolver_key = None  # (samplerate, dtype) per cui è stato costruito il convolutore
 
+    @staticmethod
+    def default_seed(t60: float, num_reflections: int, decay_rate: float) -> int:
+        """
+            Seme di default derivato dai parametri che determinano l'IR (il mix non la modifica).
+            È stabile tra esecuzioni e processi (a differenza di hash()): le cache indicizzate dai parametri
+            degli effetti (risposte fuse, RenderCache) restano valide quando si riesegue la stessa catena.
+        """
+        return zlib.crc32(repr((float(t60), int(num_reflections), float(decay_rate))).encode())
 
     def create_reverb_ir(self, samplerate: int) -> np.ndarray:
         """
-            Genera una risposta all'impulso (IR) sintetica per il riverbero.
+            Restituisce la risposta all'impulso (IR) sintetica per il riverbero.
+            L'IR dipende solo dai parametri, dal seed e dalla frequenza di campionamento, quindi viene
+            generata una sola volta e riutilizzata dalla cache condivisa.
 
             Parametri in input:
             - samplerate: La frequenza di campionamento del segnale audio.
 
             Parametri in output:
-            - ir: L'array Numpy che rappresenta l'IR.
+            - ir: L'array Numpy (in sola lettura) che rappresenta l'IR.
         """
+        key = (self.t60, self.num_reflections, self.decay_rate, self.seed, samplerate)
+        return REVERB_IR_CACHE.get(key, lambda: self._generate_reverb_ir(samplerate))
 
-        ir_length = int(self.t60 * samplerate)
+    def _get_ir_spectrum(self, samplerate: int, n_fft: int, dtype: type = np.float64) -> np.ndarray:
+        """
+            Restituisce lo spettro (rfft su n_fft punti, nella precisione `dtype`) dell'IR,
+            calcolato una sola volta grazie alla cache condivisa.
+        """
+        from scipy.fft import rfft
+
+        ir = self.create_reverb_ir(samplerate)
+        key = (self.t60, self.num_reflections, self.decay_rate, self.seed, samplerate, n_fft, np.dtype(dtype).name)
+        return REVERB_IR_CACHE.get(key, lambda: rfft(ir.astype(dtype), n=n_fft))
+
+    def _generate_reverb_ir(self, samplerate: int) -> np.ndarray:
+        """ Genera l'IR con un generatore dedicato all'istanza, estraendo tutte le riflessioni in un'unica chiamata. """
+        rng = np.random.default_rng(self.seed)
+
+        ir_length = max(int(self.t60 * samplerate), 1)
         ir = np.zeros(ir_length)
 
         ir[0] = 1.0
 
         #Genera riflessioni casuali (impulsi), con posizioni e ampiezze casuali
-        for _ in range(self.num_reflections):
-            delay = np.random.randint(1, ir_length)
-            attenuation = np.exp(-delay / (samplerate * self.t60) * self.decay_rate)
-            ir[delay] += attenuation * (np.random.rand() * 2 - 1)
+        if ir_length > 1 and self.num_reflections > 0:
+            delays = rng.integers(1, ir_length, size=self.num_reflections)
+            attenuations = np.exp(-delays / (samplerate * self.t60) * self.decay_rate)
+            amplitudes = attenuations * (rng.random(self.num_reflections) * 2 - 1)
+            # Riflessioni con lo stesso ritardo si sommano, come nell'accumulo campione per campione
+            ir += np.bincount(delays, weights=amplitudes, minlength=ir_length)
 
         if np.max(np.abs(ir)) > 0:
             ir /= np.max(np.abs(ir))
@@ -49,7 +93,8 @@ class ReverbEffect(AudioEffect):
         return ir
 
 
-    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+    def apply_effect(self, audio_signal: np.ndarray, samplerate: int, channel_mode: str = 'both',
+                     out: np.ndarray | None = None) -> np.ndarray:
         """
             Applica l'effetto di riverbero tramite convoluzione.
 
@@ -57,30 +102,78 @@ class ReverbEffect(AudioEffect):
             - audio_signal: Il segnale audio da processare
             - samplerate: La frequenza di campionamento
             - channel_mode: Specifica quali canali devono essere elaborati ('both', 'right', 'left')
+            - out: (opzionale) buffer preallocato in cui scrivere il risultato (vedi AudioEffect.apply_effect)
 
             Parametri in output:
             - processed_signal: Il segnale audio con il riverbero applicato.
         """
+        audio_signal = to_processing_dtype(audio_signal)
         ir = self.create_reverb_ir(samplerate)
-        original_signal = audio_signal.copy()
+        n_fft = fft_size_for(len(ir))
+        ir_spectrum = self._get_ir_spectrum(samplerate, n_fft, audio_signal.dtype)
 
         if audio_signal.ndim == 1:
-            processed_signal = fftconvolve(audio_signal, ir, mode='full')[:len(audio_signal)]
-            processed_signal = (1 - self.mix) * original_signal + self.mix * processed_signal
+            processed_signal = self._output_buffer(audio_signal, out)
+            processed_effect = convolve_channels(audio_signal[:, np.newaxis], ir_spectrum, n_fft, len(ir))[:, 0]
+            self._mix_into(processed_signal, audio_signal, processed_effect, self.mix)
 
         elif audio_signal.ndim == 2:
-            processed_signal = original_signal.copy()
-
-            if channel_mode == 'both' or channel_mode == 'left':
-                processed_signal[:, 0] = fftconvolve(audio_signal[:, 0], ir, mode='full')[:len(audio_signal)]
+            channels = self._selected_channels(channel_mode)
+            processed_signal = self._output_buffer(audio_signal, out)
+            self._copy_unselected(audio_signal, processed_signal, channels)
 
-            if channel_mode == 'both' or channel_mode == 'right':
-                processed_signal[:, 1] = fftconvolve(audio_signal[:, 1], ir, mode='full')[:len(audio_signal)]
+            # Tutti i canali selezionati vengono convoluti insieme, in un'unica FFT
+            processed_effect = convolve_channels(self._channel_view(audio_signal, channels), ir_spectrum, n_fft, len(ir))
+            for i, channel in enumerate(channels):
+                processed_signal[:, channel] = processed_effect[:, i]
 
         else:
             raise ValueError("Formato audio non supportato.")
 
-        if np.max(np.abs(processed_signal)) > 0:
-            processed_signal /= np.max(np.abs(processed_signal))
+        return processed_signal
 
-        return processed_signal
\ No newline at end of file
+
+    def lti_response(self, samplerate: int, channel_mode: str = 'both', num_channels: int = 2) -> np.ndarray:
+        """
+            Il riverbero è LTI: su un segnale stereo i canali selezionati vengono sostituiti dalla convoluzione con l'IR
+            (come in apply_effect, senza miscela dry/wet), su un segnale mono la risposta è (1 - mix) * impulso + mix * IR.
+        """
+        ir = self.create_reverb_ir(samplerate)
+        response = identity_response(len(ir), num_channels)
+
+        if num_channels == 1:
+            response[:, 0, 0] *= 1 - self.mix
+            response[:, 0, 0] += self.mix * ir
+            return response
+
+        for channel in self._selected_channels(channel_mode):
+            response[:, channel, channel] = ir
+        return response
+
+    def memory_samples(self, samplerate: int, tolerance: float) -> int:
+        """ La convoluzione con l'IR dipende dagli ultimi len(IR) - 1 campioni di input. """
+        return len(self.create_reverb_ir(samplerate)) - 1
+
+    def reset(self):
+        """ Azzera lo stato della convoluzione a blocchi, mantenendo l'IR e i suoi spettri. """
+        if self._convolver is not None:
+            self._convolver.reset()
+
+    def process_block(self, audio_block: np.ndarray, samplerate: int, channel_mode: str = 'both') -> np.ndarray:
+        """
+            Applica il riverbero a un blocco di un flusso stereo tramite convoluzione partizionata,
+            conservando la coda della convoluzione tra i blocchi.
+            L'IR viene generata una sola volta, al primo blocco.
+        """
+        channels = self._selected_channels(channel_mode)
+        audio_block = to_processing_dtype(audio_block)
+
+        if self._convolver is None or self._convolver_key != (samplerate, audio_block.dtype):
+            # Gli spettri dell'IR vengono calcolati una sola volta e riutilizzati per tutti i blocchi
+            self._convolver = PartitionedConvolver(self.create_reverb_ir(samplerate), head_partition_size(audio_block.shape[0]),
+                                                   dtype=audio_block.dtype.type)
+            self._convolver_key = (samplerate, audio_block.dtype)
+
+        processed_block = audio_block.copy()
+        processed_block[:, channels] = self._convolver.process_block(audio_block[:, channels])
+        return processed_block
@@ -0,0 +1,149 @@
+import glob
+import time
+from pathlib import Path
+
+from thesis_project.src.effects.precision import get_precision, set_precision
+from thesis_project.src.functions.principal.segment_processing import render_chain_segmented
+from thesis_project.src.functions.principal.signal_processing import (apply_output_stage,
+                                                                     process_audio_chain_streaming, render_chain)
+from thesis_project.src.functions.utility.audio_loader import as_stereo, load_audio
+from thesis_project.src.functions.utility.chain_loader import build_chain_from_description, load_chain_description
+from thesis_project.src.functions.utility.file_handler import get_output_path, script_dir
+from thesis_project.src.functions.utility.instrumentation import ChainObserver
+from thesis_project.src.functions.utility.render_cache import RenderCache, render_chain_cached
+
+
+def resolve_input_files(input_patterns: list[str]) -> list[Path]:
+    """
+        Espande i pattern glob dei file di input (relativi alla cartella del progetto se non assoluti).
+
+        Parametri in input:
+        - input_patterns: lista di pattern (es. 'data/*.wav').
+
+        Parametri in output:
+        - input_files: lista ordinata e senza duplicati dei file trovati.
+    """
+    input_files = set()
+    for pattern in input_patterns:
+        if not Path(pattern).is_absolute():
+            pattern = str(script_dir / pattern)
+        input_files.update(Path(p) for p in glob.glob(pattern, recursive=True) if Path(p).is_file())
+
+    return sorted(input_files)
+
+
+def process_file(input_file_path: Path, effect_chain: list[dict], pan: float, output_dir: Path,
+                 streaming: bool = False, observers: list[ChainObserver] | None = None,
+                 limiter: bool = False, split: int | None = None,
+                 render_cache: RenderCache | None = None) -> tuple[Path, float, float]:
+    """
+        Elabora un singolo file senza interazione con l'utente, senza riproduzione né grafici.
+
+        Parametri in input:
+        - input_file_path: il file da elaborare.
+        - effect_chain: la catena di effetti (già costruita).
+        - pan: valore di panning tra -1.0 e 1.0.
+        - output_dir: la cartella di output.
+        - streaming: se True il file viene elaborato a blocchi (process_audio_chain_streaming).
+        - observers: (opzionale) strumenti di misura chiamati attorno a ogni effetto (vedi ChainObserver).
+        - limiter: se True, nell'elaborazione a blocchi l'uscita passa per il limitatore con look-ahead.
+        - split: (opzionale) nell'elaborazione in memoria divide il file in segmenti elaborati su `split` processi
+                 (vedi render_chain_segmented).
+        - render_cache: (opzionale) nell'elaborazione in memoria (senza split) riusa i risultati della catena
+                        già calcolati per lo stesso file (vedi render_chain_cached).
+
+        Parametri in output:
+        - output_path, duration, elapsed: il file prodotto, la durata dell'audio e il tempo di elaborazione (s).
+    """
+    import soundfile as sf
+
+    start = time.perf_counter()
+    duration = sf.info(str(input_file_path)).duration
+
+    if streaming:
+        output_path = process_audio_chain_streaming(input_file_path, effect_chain, pan=pan, output_dir=output_dir,
+                                                    observers=observers, limiter=limiter)
+        if output_path is None:
+            raise RuntimeError("Elaborazione a blocchi non riuscita.")
+    else:
+        audio_input, samplerate = load_audio(input_file_path)
+        # I file mono vengono elaborati come stereo replicando il canale (vista, senza copia)
+        audio_input = as_stereo(audio_input)
+
+        if split is not None and split > 1:
+            processed_signal = render_chain_segmented(audio_input, samplerate, effect_chain, workers=split)
+        elif render_cache is not None:
+            processed_signal = render_chain_cached(audio_input, samplerate, effect_chain, render_cache, verbose=False,
+                                                   observers=observers)
+        else:
+            processed_signal = render_chain(audio_input, samplerate, effect_chain, verbose=False, observers=observers)
+        processed_signal = apply_output_stage(processed_signal, pan, out=processed_signal)
+
+        output_path = get_output_path(input_file_path, output_dir)
+        sf.write(output_path, processed_signal, samplerate)
+
+    return output_path, duration, time.perf_counter() - start
+
+
+def run_batch(chain_file_path: Path, input_patterns: list[str] | None = None, output_dir: Path | None = None,
+              streaming: bool = False, precision: str | None = None,
+              observers: list[ChainObserver] | None = None, limiter: bool | None = None,
+              split: int | None = None, render_cache: RenderCache | None = None) -> list[dict]:
+    """
+        Punto di ingresso non interattivo: costruisce la catena descritta nel file una sola volta
+        ed elabora tutti i file di input, riportando per ciascuno il tempo di elaborazione e il fattore real-time
+        (tempo di elaborazione / durata dell'audio: valori minori di 1 sono più veloci del tempo reale).
+
+        Parametri in input:
+        - chain_file_path: il file JSON/TOML con la descrizione della catena.
+        - input_patterns: (opzionale) pattern glob dei file di input; sovrascrivono quelli del file di catena.
+        - output_dir: (opzionale) la cartella di output; sovrascrive quella del file di catena.
+        - streaming: se True i file vengono elaborati a blocchi.
+        - precision: (opzionale) precisione di elaborazione ('float32' o 'float64'); sovrascrive quella del file di catena.
+        - observers: (opzionale) strumenti di misura chiamati attorno a ogni effetto di ogni file (vedi ChainObserver).
+        - limiter: (opzionale) se True l'elaborazione a blocchi usa il limitatore con look-ahead;
+                   sovrascrive la chiave "limiter" del file di catena.
+        - split: (opzionale) divide ogni file in segmenti elaborati su `split` processi (solo in memoria).
+        - render_cache: (opzionale) cache dei risultati intermedi della catena (solo in memoria, senza split).
+
+        Parametri in output:
+        - report: una voce per file con input, output, durata, tempo, fattore real-time ed eventuale errore.
+    """
+    description = load_chain_description(chain_file_path)
+    effect_chain, effect_display_names = build_chain_from_description(description)
+    pan = float(description.get("pan", 0.0))
+    limiter = description.get("limiter", False) if limiter is None else limiter
+    set_precision(precision or description.get("precision", get_precision()))
+
+    input_files = resolve_input_files(input_patterns or description.get("inputs", ["data/*.wav"]))
+    if not input_files:
+        print("Nessun file di input corrisponde ai pattern indicati.")
+        return []
+
+    output_dir = output_dir or description.get("output_dir")
+    if output_dir is not None and not Path(output_dir).is_absolute():
+        output_dir = script_dir / output_dir
+
+    print(f"Catena: {' -> '.join(effect_display_names)}")
+    print(f"File da elaborare: {len(input_files)} (precisione {get_precision()})")
+
+    report = []
+    for input_file_path in input_files:
+        try:
+            output_path, duration, elapsed = process_file(input_file_path, effect_chain, pan, output_dir, streaming,
+                                                          observers, limiter, split, render_cache)
+            rtf = elapsed / duration if duration > 0 else float('nan')
+            report.append({"input": str(input_file_path), "output": str(output_path), "duration": duration,
+                           "elapsed": elapsed, "rtf": rtf, "error": None})
+            print(f"{input_file_path.name}: {elapsed:.3f} s per {duration:.1f} s di audio (RTF {rtf:.4f})")
+        except Exception as e:
+            report.append({"input": str(input_file_path), "output": None, "duration": None, "elapsed": None,
+                           "rtf": None, "error": str(e)})
+            print(f"{input_file_path.name}: ERRORE - {e}")
+
+    total_audio = sum(r["duration"] for r in report if r["error"] is None)
+    total_elapsed = sum(r["elapsed"] for r in report if r["error"] is None)
+    if total_audio > 0:
+        print(f"Totale: {total_elapsed:.3f} s per {total_audio:.1f} s di audio (RTF {total_elapsed / total_audio:.4f})")
+
+    return report
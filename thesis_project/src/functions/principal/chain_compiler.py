@@ -0,0 +1,111 @@
+import json
+from functools import reduce
+from pathlib import Path
+
+import numpy as np
+
+from thesis_project.src.effects import FusedConvolutionEffect
+from thesis_project.src.effects.convolution import compose_responses
+from thesis_project.src.effects.fused_convolution import FUSED_RESPONSE_CACHE
+
+
+def effect_signature(item: dict) -> dict:
+    """
+        Descrizione canonica di una voce della catena, usata per le chiavi delle cache (risposte degli effetti fusi,
+        risultati della catena in RenderCache): classe dell'effetto, modalità canale e parametri pubblici
+        dell'istanza (compreso il seed del riverbero). Per i cabinet comprende dimensione e data di modifica
+        del file IR, così che un'IR modificata invalidi la cache.
+
+        Parametri in input:
+        - item: la voce della catena ({'effect': ..., 'channel_mode': ..., 'preset': ...}).
+
+        Parametri in output:
+        - signature: dizionario serializzabile in JSON.
+    """
+    effect = item['effect']
+    params = {name: value for name, value in vars(effect).items() if not name.startswith('_')}
+    signature = {"class": type(effect).__name__, "channel_mode": item['channel_mode'], "params": params}
+    ir_path = params.get("ir_path")
+    if ir_path is not None and Path(ir_path).exists():
+        stat = Path(ir_path).stat()
+        signature["ir_file"] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def compile_chain(effect_chain: list[dict], samplerate: int, num_channels: int = 2) -> list[dict]:
+    """
+        Pianifica l'esecuzione della catena fondendo gli effetti LTI consecutivi (cabinet, riverbero)
+        in un'unica convoluzione con la loro risposta complessiva (vedi AudioEffect.lti_response).
+        Le miscele dry/wet e le modalità canale degli effetti fusi sono incluse nella risposta.
+        La risposta complessiva e i suoi spettri vengono memorizzati in FUSED_RESPONSE_CACHE, indicizzati dalle
+        descrizioni degli effetti fusi (vedi effect_signature): compilare di nuovo la stessa sequenza, per il file
+        successivo di un batch o in un processo che ha ricevuto la cache (vedi SharedIRStore), non li ricalcola.
+        Gli effetti non rappresentabili come convoluzione finita (delay con feedback, ping pong) interrompono la fusione.
+
+        Parametri in input:
+        - effect_chain: la catena di effetti costruita da build_chain_effect.
+        - samplerate: la frequenza di campionamento del segnale da elaborare.
+        - num_channels: numero di canali del segnale (1 per un segnale mono 1D).
+
+        Parametri in output:
+        - compiled_chain: la catena da eseguire, con le sequenze di effetti LTI sostituite da FusedConvolutionEffect.
+    """
+    compiled_chain = []
+    pending = []  # Sequenza corrente di effetti LTI consecutivi, come coppie (voce della catena, risposta)
+
+    def flush():
+        if len(pending) > 1:
+            cache_key = (tuple(json.dumps(effect_signature(item), sort_keys=True, default=str) for item, _ in pending),
+                         samplerate, num_channels)
+            response = FUSED_RESPONSE_CACHE.get(cache_key,
+                                                lambda: reduce(compose_responses, [response for _, response in pending]))
+            effect_names = [f"{type(item['effect']).__name__}({item.get('preset', 'custom')})" for item, _ in pending]
+            compiled_chain.append({
+                'effect': FusedConvolutionEffect(response, samplerate, effect_names, cache_key),
+                'preset': ' + '.join(effect_names),
+                'channel_mode': 'both'
+            })
+        else:
+            # Un effetto isolato viene eseguito così com'è: la fusione non porterebbe alcun vantaggio
+            compiled_chain.extend(item for item, _ in pending)
+        pending.clear()
+
+    for item in effect_chain:
+        response = item['effect'].lti_response(samplerate, item['channel_mode'], num_channels)
+        if response is None:
+            flush()
+            compiled_chain.append(item)
+        else:
+            pending.append((item, response))
+    flush()
+
+    return compiled_chain
+
+
+def verify_compiled_chain(audio_signal: np.ndarray, samplerate: int, effect_chain: list[dict],
+                          tolerance: float = 1e-6) -> float:
+    """
+        Verifica che la catena compilata produca lo stesso risultato della catena originale, effetto per effetto.
+
+        Parametri in input:
+        - audio_signal: il segnale di prova.
+        - samplerate: la frequenza di campionamento.
+        - effect_chain: la catena di effetti da verificare.
+        - tolerance: differenza massima ammessa (rispetto al picco del risultato della catena originale).
+
+        Parametri in output:
+        - max_error: la differenza massima tra i due risultati, rispetto al picco.
+    """
+    from thesis_project.src.functions.principal.signal_processing import render_chain
+
+    num_channels = 1 if audio_signal.ndim == 1 else audio_signal.shape[1]
+    unfused_signal = render_chain(audio_signal, samplerate, effect_chain, verbose=False, fuse=False)
+    fused_signal = render_chain(audio_signal, samplerate, compile_chain(effect_chain, samplerate, num_channels),
+                                verbose=False, fuse=False)
+
+    peak = float(np.max(np.abs(unfused_signal))) if audio_signal.size else 0.0
+    max_error = float(np.max(np.abs(fused_signal - unfused_signal))) / peak if peak > 0 else 0.0
+    if max_error > tolerance:
+        raise ValueError(f"La catena compilata differisce da quella originale (errore massimo {max_error:.3e}).")
+
+    return max_error
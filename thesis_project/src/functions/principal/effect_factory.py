@@ -30,6 +30,8 @@ def make_effect(selected_effect: str, selected_params: dict) -> AudioEffect | No
         return PingPongDelayEffect(**selected_params)
     elif selected_effect == "cabinet":
         return CabinetEffect(**selected_params)
+    elif selected_effect == "modulated_delay":
+        return ModulatedDelayEffect(**selected_params)
     else:
         raise ValueError(f"Effetto '{selected_effect}' non riconosciuto.")
 
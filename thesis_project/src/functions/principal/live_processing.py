@@ -0,0 +1,196 @@
+import time
+
+import numpy as np
+
+from thesis_project.src.effects.audio_effect import AudioEffect
+from thesis_project.src.effects.limiter import LookAheadLimiter
+from thesis_project.src.effects.precision import to_processing_dtype
+from thesis_project.src.functions.principal.chain_compiler import compile_chain
+from thesis_project.src.functions.principal.signal_processing import get_equal_power_gains
+from thesis_project.src.functions.utility.audio_backends import AudioBackend
+from thesis_project.src.functions.utility.instrumentation import ChainObserver
+
+# Dimensione (in campioni) dei blocchi del flusso live: 256 campioni sono circa 5 ms a 48 kHz
+LIVE_BLOCK_SIZE = 256
+# Blocchi iniziali esclusi da carico e xrun: la prima callback paga allocazioni e cache ancora fredde
+LIVE_WARMUP_BLOCKS = 1
+
+
+class LiveProcessor:
+    """
+    Esegue la catena di effetti blocco per blocco dentro la callback di un flusso duplex (vedi AudioBackend),
+    misurando per ogni blocco il tempo di elaborazione rispetto alla durata del blocco stesso:
+    un blocco elaborato in un tempo maggiore della sua durata è un xrun (il dispositivo resterebbe senza campioni).
+    I primi warmup_blocks blocchi vengono elaborati normalmente ma esclusi dalle statistiche di carico e xrun.
+    """
+
+    def __init__(self, effect_chain: list[dict], samplerate: int, block_size: int = LIVE_BLOCK_SIZE,
+                 pan: float = 0.0, channels: int = 2, fuse: bool = True,
+                 observers: list[ChainObserver] | None = None, limiter: bool = False,
+                 warmup_blocks: int = LIVE_WARMUP_BLOCKS):
+        """
+        Parametri in input:
+        - effect_chain: la catena di effetti costruita da build_chain_effect (tutti gli effetti devono supportare
+                        process_block).
+        - samplerate: la frequenza di campionamento del flusso.
+        - block_size: il numero di campioni per blocco.
+        - pan: valore di panning tra -1.0 e 1.0, applicato all'uscita stereo.
+        - channels: il numero di canali del flusso.
+        - fuse: se True gli effetti LTI consecutivi vengono fusi in un'unica convoluzione (vedi compile_chain).
+        - observers: (opzionale) strumenti di misura chiamati attorno a ogni process_block (vedi ChainObserver).
+        - limiter: se True l'uscita passa per il limitatore con look-ahead (che aggiunge la sua latenza).
+        - warmup_blocks: numero di blocchi iniziali esclusi dalle statistiche di carico e xrun.
+        """
+        unsupported = [type(item['effect']).__name__ for item in effect_chain
+                       if type(item['effect']).process_block is AudioEffect.process_block]
+        if unsupported:
+            raise ValueError(f"Effetti senza elaborazione a blocchi: {', '.join(unsupported)}.")
+
+        self.effect_chain = compile_chain(effect_chain, samplerate, channels) if fuse else effect_chain
+        self.samplerate = samplerate
+        self.block_size = block_size
+        self.channels = channels
+        self.channel_gains = to_processing_dtype(get_equal_power_gains(pan) if channels == 2 else np.ones(channels))
+        self.limiter = LookAheadLimiter(samplerate) if limiter else None
+        self.observers = observers or []
+        self.warmup_blocks = warmup_blocks
+
+        self.blocks = 0
+        self.warmup_time = 0.0  # Tempo massimo di elaborazione dei blocchi di riscaldamento
+        self.xruns = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._prime()
+
+    def _prime(self):
+        """
+        Elabora un blocco di silenzio e azzera lo stato degli effetti e del limitatore: spettri delle IR,
+        convolutori e moduli importati al primo uso vengono preparati prima dell'avvio del flusso, non nella prima callback.
+        """
+        silence = to_processing_dtype(np.zeros((self.block_size, self.channels)))
+        for item in self.effect_chain:
+            item['effect'].reset()
+            item['effect'].process_block(silence, self.samplerate, item['channel_mode'])
+            item['effect'].reset()
+        if self.limiter is not None:
+            self.limiter.process_block(silence, self.channel_gains)
+            self.limiter.reset()
+
+    @property
+    def block_duration(self) -> float:
+        """ Durata di un blocco in secondi: la scadenza entro cui la callback deve restituire l'output. """
+        return self.block_size / self.samplerate
+
+    def latency_samples(self, device_latency: int = 0) -> dict:
+        """
+            Latenza complessiva ingresso-uscita della modalità live, in campioni.
+
+            Parametri in input:
+            - device_latency: la latenza del dispositivo riportata dal backend (vedi AudioBackend.device_latency_samples).
+
+            Parametri in output:
+            - latency: dizionario con il buffering dei blocchi (un blocco in ingresso e uno in uscita),
+                       la latenza algoritmica della catena (compreso l'eventuale limitatore), quella del dispositivo
+                       e il totale.
+        """
+        buffering = 2 * self.block_size
+        algorithmic = sum(item['effect'].latency_samples(self.samplerate) for item in self.effect_chain)
+        if self.limiter is not None:
+            algorithmic += self.limiter.latency_samples()
+        return {"buffering": buffering, "algorithmic": algorithmic, "device": device_latency,
+                "total": buffering + algorithmic + device_latency}
+
+    def process(self, input_block: np.ndarray, output_block: np.ndarray):
+        """
+            Callback del flusso: applica la catena al blocco di input e scrive il risultato nel buffer di output.
+
+            Parametri in input:
+            - input_block: il blocco di input (block_size, channels).
+            - output_block: il buffer di output del backend, della stessa forma, da riempire.
+        """
+        start = time.perf_counter()
+
+        block = to_processing_dtype(input_block)
+        for i, item in enumerate(self.effect_chain):
+            for observer in self.observers:
+                observer.on_effect_start(i, item, block, self.samplerate)
+            block = item['effect'].process_block(block, self.samplerate, item['channel_mode'])
+            for observer in self.observers:
+                observer.on_effect_end(i, item, block, self.samplerate)
+
+        if self.limiter is not None:
+            output_block[:] = self.limiter.process_block(block, self.channel_gains)
+        else:
+            np.multiply(block, self.channel_gains, out=output_block)
+
+        elapsed = time.perf_counter() - start
+        self.blocks += 1
+        if self.blocks <= self.warmup_blocks:
+            self.warmup_time = max(self.warmup_time, elapsed)
+            return
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if elapsed > self.block_duration:
+            self.xruns += 1
+
+    def report(self, backend: AudioBackend) -> dict:
+        """
+            Riassume l'esecuzione: blocchi elaborati, xrun, carico medio e massimo (tempo di elaborazione
+            rispetto alla durata del blocco, esclusi i blocchi di riscaldamento) e latenza.
+
+            Parametri in input:
+            - backend: il backend usato per il flusso.
+
+            Parametri in output:
+            - report: dizionario con le statistiche dell'esecuzione.
+        """
+        measured_blocks = max(self.blocks - self.warmup_blocks, 0)
+        mean_time = self.total_time / measured_blocks if measured_blocks else 0.0
+        return {"blocks": self.blocks, "block_size": self.block_size, "samplerate": self.samplerate,
+                "xruns": self.xruns, "device_xruns": backend.device_xruns,
+                "mean_load": mean_time / self.block_duration, "max_load": self.max_time / self.block_duration,
+                "warmup_blocks": min(self.blocks, self.warmup_blocks),
+                "warmup_load": self.warmup_time / self.block_duration,
+                "latency": self.latency_samples(backend.device_latency_samples())}
+
+
+def run_live(effect_chain: list[dict], backend: AudioBackend, block_size: int = LIVE_BLOCK_SIZE, pan: float = 0.0,
+             fuse: bool = True, observers: list[ChainObserver] | None = None, limiter: bool = False) -> dict:
+    """
+        Modalità live: esegue la catena di effetti sul flusso duplex del backend (scheda audio, file o null)
+        e riporta latenza, carico e xrun.
+
+        Parametri in input:
+        - effect_chain: la catena di effetti costruita da build_chain_effect.
+        - backend: il backend di I/O (SoundDeviceBackend, FileBackend, NullBackend).
+        - block_size: il numero di campioni per blocco.
+        - pan: valore di panning tra -1.0 e 1.0.
+        - fuse: se True gli effetti LTI consecutivi vengono fusi in un'unica convoluzione (vedi compile_chain).
+        - observers: (opzionale) strumenti di misura chiamati attorno a ogni process_block (vedi ChainObserver).
+        - limiter: se True l'uscita passa per il limitatore con look-ahead.
+
+        Parametri in output:
+        - report: le statistiche dell'esecuzione (vedi LiveProcessor.report).
+    """
+    processor = LiveProcessor(effect_chain, backend.samplerate, block_size, pan, backend.channels, fuse, observers,
+                              limiter)
+
+    for observer in processor.observers:
+        observer.on_chain_start(processor.effect_chain, backend.samplerate)
+    try:
+        backend.run(processor.process, block_size)
+    finally:
+        for observer in processor.observers:
+            observer.on_chain_end(processor.effect_chain, backend.samplerate)
+
+    report = processor.report(backend)
+    latency = report["latency"]
+    print(f"Blocchi elaborati: {report['blocks']} da {block_size} campioni "
+          f"({processor.block_duration * 1000:.2f} ms a {backend.samplerate} Hz)")
+    print(f"Latenza: {latency['total']} campioni ({latency['total'] / backend.samplerate * 1000:.2f} ms) = "
+          f"buffering {latency['buffering']} + catena {latency['algorithmic']} + dispositivo {latency['device']}")
+    print(f"Carico: medio {report['mean_load']:.1%}, massimo {report['max_load']:.1%} della durata del blocco "
+          f"(esclusi {report['warmup_blocks']} blocchi di riscaldamento, massimo {report['warmup_load']:.1%})")
+    print(f"Xrun: {report['xruns']} blocchi oltre la scadenza, {report['device_xruns']} segnalati dal dispositivo")
+
+    return report
@@ -1,6 +1,10 @@
-import matplotlib.pyplot as plt
 import numpy as np
 
+from thesis_project.src.functions.utility.waveform_pyramid import WaveformPyramid
+
+# Punti disegnati se la larghezza del grafico in pixel non è disponibile
+DEFAULT_PLOT_POINTS = 2000
+
 
 def build_plot_title(effect_display_names: list[str]) -> str:
     """
@@ -34,11 +38,43 @@ def build_plot_title(effect_display_names: list[str]) -> str:
     return f"Segnale Audio con {chain_name}"
 
 
+def plot_waveform(signal: np.ndarray, label: str | None = None):
+    """
+        Disegna un canale nel grafico corrente con un numero di punti pari a circa la larghezza del grafico in pixel,
+        usando la piramide di inviluppi min/max del segnale (vedi WaveformPyramid). A ogni zoom o spostamento
+        la linea viene ricalcolata dal livello della piramide adatto all'intervallo visibile.
+
+        Parametri in input:
+        - signal: il canale da disegnare (array 1D).
+        - label: (opzionale) l'etichetta della linea per la legenda.
+    """
+    import matplotlib.pyplot as plt
+
+    ax = plt.gca()
+    pyramid = WaveformPyramid(signal)
+
+    def visible_points() -> int:
+        width = ax.get_window_extent().width
+        return int(width) if width > 0 else DEFAULT_PLOT_POINTS
+
+    line, = ax.plot(*pyramid.query(0, len(signal), visible_points()), label=label)
+    ax.set_xlim(0, len(signal))
+
+    def on_xlim_changed(changed_ax):
+        start, stop = changed_ax.get_xlim()
+        line.set_data(*pyramid.query(start, stop, visible_points()))
+        changed_ax.figure.canvas.draw_idle()
+
+    ax.callbacks.connect('xlim_changed', on_xlim_changed)
+
+
 def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray, effect_name: list[str],
                        stereo_plot_style: str = 'separate'):
     """
         Visualizza il segnale originale e quello processato, gestendo sia audio mono che stereo
         e permettendo di scegliere lo stile di visualizzazione per i segnali stereo.
+        Ogni canale viene disegnato a livelli di dettaglio (vedi plot_waveform): anche per file di ore
+        il grafico contiene solo circa un punto per pixel, e lo zoom mostra via via il dettaglio fino ai singoli campioni.
 
         Parametri in input:
         - original_signal: il segnale originale
@@ -48,6 +84,9 @@ def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray
                              'overlay' per sovrapporre i canali sullo stesso grafico.
                              Ignorato per segnali mono.
     """
+    # matplotlib viene importato solo quando l'utente chiede un grafico: l'elaborazione non lo richiede
+    import matplotlib.pyplot as plt
+
     # Verifica se i segnali sono stereo
     is_stereo = original_signal.ndim == 2 and original_signal.shape[1] == 2
 
@@ -58,7 +97,7 @@ def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray
         # Canale sinistro originale
         plt.subplot(2, 2, 1)
         plt.title('Segnale Originale - Canale Sinistro')
-        plt.plot(original_signal[:, 0])
+        plot_waveform(original_signal[:, 0])
         plt.xlabel('Campioni')
         plt.ylabel('Ampiezza')
         plt.grid(True)
@@ -66,7 +105,7 @@ def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray
         # Canale destro originale
         plt.subplot(2, 2, 2)
         plt.title('Segnale Originale - Canale Destro')
-        plt.plot(original_signal[:, 1])
+        plot_waveform(original_signal[:, 1])
         plt.xlabel('Campioni')
         plt.ylabel('Ampiezza')
         plt.grid(True)
@@ -74,7 +113,7 @@ def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray
         # Canale sinistro processato
         plt.subplot(2, 2, 3)
         plt.title(f'Segnale {effect_name} - Canale Sinistro')
-        plt.plot(processed_signal[:, 0])
+        plot_waveform(processed_signal[:, 0])
         plt.xlabel('Campioni')
         plt.ylabel('Ampiezza')
         plt.grid(True)
@@ -82,7 +121,7 @@ def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray
         # Canale destro processato
         plt.subplot(2, 2, 4)
         plt.title(f'Segnale {effect_name} - Canale Destro')
-        plt.plot(processed_signal[:, 1])
+        plot_waveform(processed_signal[:, 1])
         plt.xlabel('Campioni')
         plt.ylabel('Ampiezza')
         plt.grid(True)
@@ -96,11 +135,11 @@ def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray
         plt.title('Segnale Audio Originale')
 
         if is_stereo:
-            plt.plot(original_signal[:, 0], label='Canale Sinistro')
-            plt.plot(original_signal[:, 1], label='Canale Destro')
+            plot_waveform(original_signal[:, 0], label='Canale Sinistro')
+            plot_waveform(original_signal[:, 1], label='Canale Destro')
             plt.legend()
         else:
-            plt.plot(original_signal)
+            plot_waveform(original_signal)
 
         plt.xlabel('Campioni')
         plt.ylabel('Ampiezza')
@@ -111,11 +150,11 @@ def plot_audio_signals(original_signal: np.ndarray, processed_signal: np.ndarray
         plt.title(f'Segnale Audio con {effect_name}')
 
         if is_stereo:
-            plt.plot(processed_signal[:, 0], label='Canale Sinistro')
-            plt.plot(processed_signal[:, 1], label='Canale Destro')
+            plot_waveform(processed_signal[:, 0], label='Canale Sinistro')
+            plot_waveform(processed_signal[:, 1], label='Canale Destro')
             plt.legend()
         else:
-            plt.plot(processed_signal)
+            plot_waveform(processed_signal)
 
         plt.xlabel('Campioni')
         plt.ylabel('Ampiezza')
@@ -0,0 +1,183 @@
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+
+from thesis_project.src.effects.parallel import set_num_threads
+from thesis_project.src.effects.precision import get_precision, set_precision, to_processing_dtype
+from thesis_project.src.functions.principal.batch_processing import process_file, resolve_input_files
+from thesis_project.src.functions.principal.signal_processing import render_chain
+from thesis_project.src.functions.utility.chain_loader import build_chain_from_description, load_chain_description
+from thesis_project.src.functions.utility.file_handler import script_dir
+from thesis_project.src.functions.utility.shared_ir_store import SharedIRStore, attach_shared_irs
+
+# Tentativi aggiuntivi per un file fallito, prima di segnalarlo come errore
+DEFAULT_RETRIES = 2
+
+# Stato di ogni processo di elaborazione, preparato da _init_worker
+_worker_state = {}
+
+
+def _init_worker(description: dict, shared_entries: list[tuple], precision: str):
+    """
+    Prepara un processo di elaborazione: collega le IR pubblicate in memoria condivisa, imposta la precisione
+    e costruisce la catena una sola volta. Ogni processo usa un solo thread (il parallelismo è tra i processi).
+    """
+    set_num_threads(1)
+    set_precision(precision)
+    _worker_state["blocks"] = attach_shared_irs(shared_entries)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_state["effect_chain"], _ = build_chain_from_description(description)
+
+
+def _render_file(input_file_path: Path, pan: float, output_dir: Path | None, streaming: bool,
+                 limiter: bool) -> tuple[str, float, float]:
+    """ Elabora un file nel processo di elaborazione (vedi process_file), senza messaggi a video. """
+    with contextlib.redirect_stdout(io.StringIO()):
+        output_path, duration, elapsed = process_file(input_file_path, _worker_state["effect_chain"], pan, output_dir,
+                                                      streaming, limiter=limiter)
+    return str(output_path), duration, elapsed
+
+
+def _read_info(input_file_path: Path):
+    """ Legge durata e frequenza di campionamento del file, oppure None se il file non è leggibile. """
+    import soundfile as sf
+
+    try:
+        return sf.info(str(input_file_path))
+    except Exception:
+        return None
+
+
+def publish_chain_irs(effect_chain: list[dict], samplerates: set[int]) -> SharedIRStore:
+    """
+        Calcola nel processo principale le IR della catena (caricate, ricampionate o generate), le risposte
+        degli effetti LTI fusi e i loro spettri per ogni frequenza di campionamento dei file da elaborare,
+        e li pubblica in memoria condivisa. La catena viene compilata come in process_file (con la fusione):
+        i processi di elaborazione trovano quindi in cache esattamente le risposte e gli spettri che usano.
+
+        Parametri in input:
+        - effect_chain: la catena di effetti.
+        - samplerates: le frequenze di campionamento dei file da elaborare.
+
+        Parametri in output:
+        - store: il SharedIRStore con le voci pubblicate (da chiudere a fine elaborazione).
+    """
+    for samplerate in sorted(samplerates):
+        # Un breve segnale di silenzio riempie le cache: IR e spettri non dipendono dalla durata del segnale
+        render_chain(to_processing_dtype(np.zeros((16, 2))), samplerate, effect_chain, verbose=False)
+
+    store = SharedIRStore()
+    store.publish()
+    return store
+
+
+def run_render_farm(chain_file_path: Path, input_patterns: list[str] | None = None, output_dir: Path | None = None,
+                    streaming: bool = False, precision: str | None = None, limiter: bool | None = None,
+                    workers: int | None = None, retries: int = DEFAULT_RETRIES) -> list[dict]:
+    """
+        Elabora un insieme di file con la stessa catena su un pool di processi.
+        I file vengono assegnati dal più lungo al più corto, così che i processi finiscano insieme; le IR della catena,
+        le risposte degli effetti fusi e i loro spettri vengono calcolati una volta e condivisi tramite memoria
+        condivisa (vedi SharedIRStore).
+        Un file fallito (anche per la terminazione del suo processo) viene ritentato fino a `retries` volte
+        senza interrompere gli altri. Al termine viene riportato il throughput in ore di audio per ora di elaborazione.
+
+        Parametri in input:
+        - chain_file_path: il file JSON/TOML con la descrizione della catena.
+        - input_patterns: (opzionale) pattern glob dei file di input; sovrascrivono quelli del file di catena.
+        - output_dir: (opzionale) la cartella di output; sovrascrive quella del file di catena.
+        - streaming: se True i file vengono elaborati a blocchi.
+        - precision: (opzionale) precisione di elaborazione; sovrascrive quella del file di catena.
+        - limiter: (opzionale) se True l'elaborazione a blocchi usa il limitatore; sovrascrive il file di catena.
+        - workers: (opzionale) il numero di processi; di default uno per core.
+        - retries: i tentativi aggiuntivi per ogni file fallito.
+
+        Parametri in output:
+        - report: una voce per file con input, output, durata, tempo, fattore real-time, tentativi ed eventuale errore.
+    """
+    description = load_chain_description(chain_file_path)
+    effect_chain, effect_display_names = build_chain_from_description(description)
+    pan = float(description.get("pan", 0.0))
+    limiter = description.get("limiter", False) if limiter is None else limiter
+    set_precision(precision or description.get("precision", get_precision()))
+
+    input_files = resolve_input_files(input_patterns or description.get("inputs", ["data/*.wav"]))
+    if not input_files:
+        print("Nessun file di input corrisponde ai pattern indicati.")
+        return []
+
+    output_dir = output_dir or description.get("output_dir")
+    if output_dir is not None and not Path(output_dir).is_absolute():
+        output_dir = script_dir / output_dir
+
+    # Dal file più lungo al più corto: i file lunghi non restano per ultimi su un solo processo.
+    # Un file illeggibile va in fondo e fallisce (con i suoi tentativi) nel processo che lo elabora
+    infos = {path: _read_info(path) for path in input_files}
+    input_files.sort(key=lambda path: infos[path].duration if infos[path] is not None else 0.0, reverse=True)
+    workers = min(workers or os.cpu_count() or 1, len(input_files))
+
+    print(f"Catena: {' -> '.join(effect_display_names)}")
+    print(f"File da elaborare: {len(input_files)} su {workers} processi (precisione {get_precision()})")
+
+    store = publish_chain_irs(effect_chain, {info.samplerate for info in infos.values() if info is not None})
+    print(f"IR condivise: {len(store.entries)} voci, {store.nbytes / 1024 ** 2:.1f} MB")
+    initargs = (description, store.entries, get_precision())
+
+    results = {}
+    attempts = {path: 0 for path in input_files}
+    queue = list(input_files)
+    start = time.perf_counter()
+    try:
+        while queue:
+            # Un nuovo pool per ogni giro: la terminazione di un processo rende inutilizzabile il pool corrente
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                # Al più un file in corso per processo: se un processo termina, i tentativi vengono addebitati
+                # solo ai file in elaborazione in quel momento
+                pending = {}
+                broken = False
+                while queue or pending:
+                    while queue and len(pending) < workers and not broken:
+                        path = queue.pop(0)
+                        pending[pool.submit(_render_file, path, pan, output_dir, streaming, limiter)] = path
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        attempts[path] += 1
+                        try:
+                            output_path, duration, elapsed = future.result()
+                            results[path] = {"output": output_path, "duration": duration, "elapsed": elapsed,
+                                             "error": None}
+                            print(f"{path.name}: {elapsed:.3f} s per {duration:.1f} s di audio")
+                        except Exception as e:
+                            broken = broken or isinstance(e, BrokenProcessPool)
+                            results[path] = {"output": None, "duration": None, "elapsed": None, "error": str(e)}
+                            if attempts[path] <= retries:
+                                print(f"{path.name}: errore ({e or type(e).__name__}), nuovo tentativo")
+                                queue.append(path)
+                            else:
+                                print(f"{path.name}: ERRORE - {e or type(e).__name__}")
+    finally:
+        store.close()
+    wall_time = time.perf_counter() - start
+
+    report = []
+    for path in input_files:
+        result = results[path]
+        rtf = result["elapsed"] / result["duration"] if result["error"] is None and result["duration"] > 0 else None
+        report.append({"input": str(path), **result, "rtf": rtf, "attempts": attempts[path]})
+
+    total_audio = sum(r["duration"] for r in report if r["error"] is None)
+    failed = sum(1 for r in report if r["error"] is not None)
+    print(f"Totale: {total_audio / 3600:.3f} ore di audio in {wall_time:.1f} s con {workers} processi "
+          f"({total_audio / wall_time if wall_time > 0 else 0.0:.1f} ore di audio per ora), {failed} file falliti")
+
+    return report
@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from thesis_project.src.effects.parallel import set_num_threads
+from thesis_project.src.effects.precision import get_precision, set_precision, to_processing_dtype
+from thesis_project.src.functions.principal.chain_compiler import compile_chain
+from thesis_project.src.functions.principal.signal_processing import render_chain
+
+# Ampiezza relativa sotto la quale le ripetizioni dei delay con feedback vengono trascurate nel pre-roll (-120 dB)
+DEFAULT_SEGMENT_TOLERANCE = 1e-6
+
+# Stato di ogni processo di elaborazione, preparato da _init_worker
+_worker_state = {}
+
+
+def chain_memory_samples(effect_chain: list[dict], samplerate: int,
+                         tolerance: float = DEFAULT_SEGMENT_TOLERANCE) -> int | None:
+    """
+        Memoria complessiva della catena in campioni: la somma delle memorie degli effetti (vedi
+        AudioEffect.memory_samples). Ogni campione di output dipende solo da questo numero di campioni di input
+        precedenti (a meno delle ripetizioni di feedback sotto `tolerance`).
+
+        Parametri in input:
+        - effect_chain: la catena di effetti.
+        - samplerate: la frequenza di campionamento.
+        - tolerance: ampiezza relativa sotto la quale le ripetizioni del feedback vengono trascurate.
+
+        Parametri in output:
+        - memory: la memoria in campioni, oppure None se un effetto ha memoria illimitata.
+    """
+    memory = 0
+    for item in effect_chain:
+        effect_memory = item['effect'].memory_samples(samplerate, tolerance)
+        if effect_memory is None:
+            return None
+        memory += effect_memory
+    return memory
+
+
+def _attach(name: str, shape: tuple, dtype: str) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _init_worker(effect_chain: list[dict], samplerate: int, precision: str, input_description: tuple,
+                 output_description: tuple):
+    """ Prepara un processo: collega segnale di input e buffer di output condivisi, un solo thread per processo. """
+    set_num_threads(1)
+    set_precision(precision)
+    _worker_state["effect_chain"] = effect_chain
+    _worker_state["samplerate"] = samplerate
+    _worker_state["input"] = _attach(*input_description)
+    _worker_state["output"] = _attach(*output_description)
+
+
+def _render_segment(start: int, stop: int, pre_roll: int):
+    """
+    Elabora il segmento [start, stop) partendo da pre_roll campioni prima (per ricostruire lo stato di convoluzioni
+    e linee di ritardo) e scrive nel buffer condiviso solo i campioni del segmento.
+    """
+    _, audio_signal = _worker_state["input"]
+    _, output = _worker_state["output"]
+    window_start = max(start - pre_roll, 0)
+    processed = render_chain(audio_signal[window_start:stop], _worker_state["samplerate"],
+                             _worker_state["effect_chain"], verbose=False, fuse=False)
+    output[start:stop] = processed[start - window_start:]
+
+
+def render_chain_segmented(audio_data: np.ndarray, samplerate: int, effect_chain: list[dict],
+                           workers: int | None = None, tolerance: float = DEFAULT_SEGMENT_TOLERANCE) -> np.ndarray:
+    """
+        Applica la catena a un segnale lungo dividendolo in segmenti temporali elaborati in parallelo su più processi.
+        Ogni segmento viene elaborato a partire da un pre-roll pari alla memoria della catena (vedi
+        chain_memory_samples): code delle convoluzioni e linee di ritardo del segmento precedente vengono ricostruite
+        dal pre-roll, che poi viene scartato. Il risultato coincide con render_chain a meno dell'arrotondamento
+        per convoluzioni e delay con serie troncata, e a meno di `tolerance` (rispetto al picco dell'input,
+        per ripetizione trascurata) per i delay con feedback completo.
+        Segnale di input e risultato stanno in memoria condivisa: i processi non si scambiano copie del segnale.
+
+        Parametri in input:
+        - audio_data: il segnale di input.
+        - samplerate: la frequenza di campionamento.
+        - effect_chain: la catena di effetti costruita da build_chain_effect.
+        - workers: (opzionale) il numero di processi (e di segmenti); di default uno per core.
+        - tolerance: ampiezza relativa sotto la quale le ripetizioni del feedback vengono trascurate.
+
+        Parametri in output:
+        - processed_signal: il segnale elaborato (non normalizzato: vedi apply_output_stage).
+    """
+    audio_data = to_processing_dtype(audio_data)
+    num_samples = audio_data.shape[0]
+    effect_chain = compile_chain(effect_chain, samplerate, 1 if audio_data.ndim == 1 else audio_data.shape[1])
+    pre_roll = chain_memory_samples(effect_chain, samplerate, tolerance)
+    workers = workers or os.cpu_count() or 1
+
+    if pre_roll is None or workers == 1 or num_samples < 2 * workers:
+        return render_chain(audio_data, samplerate, effect_chain, verbose=False, fuse=False)
+
+    segment_length = -(-num_samples // workers)
+    if pre_roll > segment_length:
+        print(f"Attenzione: il pre-roll della catena ({pre_roll} campioni) supera la lunghezza dei segmenti "
+              f"({segment_length} campioni): la suddivisione elabora più campioni di quanti ne risparmi.")
+
+    input_block = shared_memory.SharedMemory(create=True, size=max(audio_data.nbytes, 1))
+    output_block = shared_memory.SharedMemory(create=True, size=max(audio_data.nbytes, 1))
+    try:
+        shared_input = np.ndarray(audio_data.shape, dtype=audio_data.dtype, buffer=input_block.buf)
+        shared_input[...] = audio_data
+        description = (audio_data.shape, audio_data.dtype.str)
+        initargs = (effect_chain, samplerate, get_precision(), (input_block.name, *description),
+                    (output_block.name, *description))
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_render_segment, start, min(start + segment_length, num_samples), pre_roll)
+                       for start in range(0, num_samples, segment_length)]
+            for future in futures:
+                future.result()
+
+        del shared_input
+        return np.ndarray(audio_data.shape, dtype=audio_data.dtype, buffer=output_block.buf).copy()
+    finally:
+        for block in (input_block, output_block):
+            block.close()
+            block.unlink()
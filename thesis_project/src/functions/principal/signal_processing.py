@@ -1,25 +1,26 @@
+from thesis_project.src.effects.limiter import LookAheadLimiter
+from thesis_project.src.effects.precision import OUTPUT_SUBTYPES, get_precision, to_processing_dtype
+from thesis_project.src.functions.principal.chain_compiler import compile_chain
 from thesis_project.src.functions.principal.user_interaction import get_pan_choice
+from thesis_project.src.functions.utility.instrumentation import ChainObserver
+from thesis_project.src.functions.utility.pipeline import PIPELINE_QUEUE_SIZE, BlockPipeline, format_pipeline_report
+from thesis_project.src.functions.utility.render_cache import RenderCache, render_chain_cached
 from thesis_project.src.functions.utility.file_handler import *
 
-def apply_equal_power_pan(audio_signal: np.ndarray) -> np.ndarray:
-    """
-    Applica l'equal power panning (curva a radice quadrata) a un segnale stereo.
+# Dimensione (in campioni) dei blocchi letti dal file nella modalità streaming
+STREAMING_BLOCK_SIZE = 65536
 
-    Il Pan Law (regola del Pan) garantisce che la potenza percepita rimanga costante
-    spostando il segnale tra i canali sinistro e destro.
+
+def get_equal_power_gains(pan: float) -> tuple[float, float]:
+    """
+    Calcola i guadagni sinistro/destro della legge di pan a potenza costante (sin/cos).
 
     Parametri in input:
-    - audio_signal: Segnale audio stereo (ndarray 2D) con shape (num_samples, 2).
     - pan: Valore di panning tra -1.0 (hard left) e 1.0 (hard right).
 
     Parametri in output:
-    - processed_signal: Il segnale audio stereo con il panning applicato.
+    - gain_l, gain_r: i guadagni da applicare ai canali sinistro e destro.
     """
-    if audio_signal.ndim != 2 or audio_signal.shape[1] != 2:
-        raise ValueError("Il Panning richiede un segnale stereo (ndim=2, 2 canali).")
-
-    pan = get_pan_choice()
-
     # Normalizzazione del valore di pan: [-1.0, 1.0] -> [0.0, 1.0]
     # theta_norm = 0.0 per Hard Left, 0.5 per Center, 1.0 per Hard Right
     theta_norm = (pan + 1.0) / 2.0
@@ -34,44 +35,275 @@ def apply_equal_power_pan(audio_signal: np.ndarray) -> np.ndarray:
     # Guadagno Destro: min quando l'angolo è 0 (sin(0)=0), max quando l'angolo è pi/2 (sin(pi/2)=1)
     gain_r = np.sin(angle)
 
+    return gain_l, gain_r
+
+
+def apply_equal_power_pan(audio_signal: np.ndarray, pan: float | None = None, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Applica l'equal power panning (curva a radice quadrata) a un segnale stereo.
+
+    Il Pan Law (regola del Pan) garantisce che la potenza percepita rimanga costante
+    spostando il segnale tra i canali sinistro e destro.
+
+    Parametri in input:
+    - audio_signal: Segnale audio stereo (ndarray 2D) con shape (num_samples, 2).
+    - pan: Valore di panning tra -1.0 (hard left) e 1.0 (hard right). Se None viene chiesto all'utente.
+    - out: (opzionale) buffer in cui scrivere il risultato; può coincidere con audio_signal per applicare il pan in place.
+           Se None viene allocato un nuovo array.
+
+    Parametri in output:
+    - processed_signal: Il segnale audio stereo con il panning applicato.
+    """
+    if audio_signal.ndim != 2 or audio_signal.shape[1] != 2:
+        raise ValueError("Il Panning richiede un segnale stereo (ndim=2, 2 canali).")
+
+    if pan is None:
+        pan = get_pan_choice()
+
+    gain_l, gain_r = get_equal_power_gains(pan)
+
     # Applicazione del guadagno
-    processed_signal = audio_signal.copy()
+    processed_signal = np.empty_like(audio_signal) if out is None else out
 
-    processed_signal[:, 0] *= gain_l
-    processed_signal[:, 1] *= gain_r
+    np.multiply(audio_signal[:, 0], gain_l, out=processed_signal[:, 0])
+    np.multiply(audio_signal[:, 1], gain_r, out=processed_signal[:, 1])
 
     return processed_signal
 
 
-def process_audio_chain(input_file_path, audio_data, samplerate, effect_chain):
+def apply_output_stage(audio_signal: np.ndarray, pan: float | None = None, normalize: bool = True,
+                       dtype: type | None = None, out: np.ndarray | None = None) -> np.ndarray:
     """
-    Applica una sequenza di effetti all'audio di input.
+    Stadio di guadagno finale della catena: normalizzazione di picco, guadagni del pan e conversione nel tipo
+    di uscita in un'unica moltiplicazione sul segnale (più la lettura per trovarne il picco).
+    Gli effetti non normalizzano il proprio risultato: poiché sono lineari e la normalizzazione è un guadagno
+    positivo, normalizzare una sola volta a fine catena produce lo stesso segnale della normalizzazione
+    dopo ogni effetto.
+
+    Parametri in input:
+    - audio_signal: il segnale prodotto dalla catena (mono 1D o multicanale 2D).
+    - pan: (opzionale) valore di panning tra -1.0 e 1.0, solo per segnali stereo; se None il pan non viene applicato.
+    - normalize: se True il segnale viene normalizzato al suo picco.
+    - dtype: (opzionale) il tipo dell'array di uscita; di default quello del segnale.
+    - out: (opzionale) buffer di uscita; può coincidere con audio_signal per lavorare in place.
 
+    Parametri in output:
+    - processed_signal: il segnale pronto per la scrittura o la riproduzione.
     """
-    current_signal = audio_data.copy()
-    original_signal = audio_data
+    gains = np.ones(1 if audio_signal.ndim == 1 else audio_signal.shape[1])
+    if pan is not None:
+        if audio_signal.ndim != 2 or audio_signal.shape[1] != 2:
+            raise ValueError("Il Panning richiede un segnale stereo (ndim=2, 2 canali).")
+        gains[:] = get_equal_power_gains(pan)
+
+    if normalize and audio_signal.size:
+        # Picco senza allocare il valore assoluto del segnale
+        peak = max(audio_signal.max(), -audio_signal.min())
+        if peak > 0:
+            gains /= peak
+
+    processed_signal = np.empty(audio_signal.shape, dtype=dtype or audio_signal.dtype) if out is None else out
+    np.multiply(audio_signal, gains.astype(audio_signal.dtype), out=processed_signal)
+    return processed_signal
+
+
+def render_chain(audio_data: np.ndarray, samplerate: int, effect_chain: list[dict], verbose: bool = True,
+                 fuse: bool = True, observers: list[ChainObserver] | None = None) -> np.ndarray:
+    """
+    Applica in sequenza gli effetti della catena, senza alcuna interazione con l'utente.
+    Gli effetti scrivono alternativamente in due buffer preallocati della lunghezza del segnale:
+    la catena occupa un numero costante di array, indipendente dal numero di effetti, e il segnale di input non viene modificato.
+
+    Parametri in input:
+    - audio_data: il segnale di input.
+    - samplerate: la frequenza di campionamento.
+    - effect_chain: la catena di effetti costruita da build_chain_effect.
+    - verbose: se True stampa l'effetto in corso di applicazione.
+    - fuse: se True gli effetti LTI consecutivi vengono fusi in un'unica convoluzione (vedi compile_chain).
+    - observers: (opzionale) strumenti di misura chiamati attorno a ogni effetto (vedi ChainObserver, ChainProfiler);
+                 ricevono la catena già compilata.
+
+    Parametri in output:
+    - current_signal: il segnale con tutti gli effetti applicati (nella precisione di elaborazione della catena,
+                      non normalizzato: vedi apply_output_stage), contenuto in uno dei due buffer della catena.
+    """
+    current_signal = to_processing_dtype(audio_data)
+    if fuse:
+        effect_chain = compile_chain(effect_chain, samplerate, 1 if current_signal.ndim == 1 else current_signal.shape[1])
+    if not effect_chain:
+        return current_signal.copy()
+    observers = observers or []
+
+    # Con un solo effetto basta un buffer; l'input originale non viene mai sovrascritto
+    chain_buffers = [np.empty_like(current_signal) for _ in range(min(len(effect_chain), 2))]
+
+    for observer in observers:
+        observer.on_chain_start(effect_chain, samplerate)
 
     try:
         for i, item in enumerate(effect_chain):
             effect = item['effect']
             channel_mode = item['channel_mode']
 
-            print(f"Applicando l'effetto #{i + 1}: {type(effect).__name__}...")
-            processed_block = effect.apply_effect(current_signal, samplerate, channel_mode)
+            if verbose:
+                print(f"Applicando l'effetto #{i + 1}: {type(effect).__name__}...")
+            for observer in observers:
+                observer.on_effect_start(i, item, current_signal, samplerate)
+            processed_block = effect.apply_effect(current_signal, samplerate, channel_mode, out=chain_buffers[i % 2])
+            for observer in observers:
+                observer.on_effect_end(i, item, processed_block, samplerate)
 
             current_signal = processed_block
+    finally:
+        # Anche se un effetto fallisce, gli osservatori chiudono la misura (ad es. fermano tracemalloc)
+        for observer in observers:
+            observer.on_chain_end(effect_chain, samplerate)
+
+    return current_signal
+
+
+def process_audio_chain(input_file_path, audio_data, samplerate, effect_chain,
+                        observers: list[ChainObserver] | None = None, render_cache: RenderCache | None = None):
+    """
+    Applica una sequenza di effetti all'audio di input.
+    Gli eventuali observers vengono chiamati attorno a ogni effetto (vedi render_chain).
+    Con una render_cache la catena riparte dal prefisso più lungo già calcolato (vedi render_chain_cached).
+
+    """
+    original_signal = audio_data
+
+    try:
+        if render_cache is not None:
+            current_signal = render_chain_cached(audio_data, samplerate, effect_chain, render_cache, observers=observers)
+        else:
+            current_signal = render_chain(audio_data, samplerate, effect_chain, observers=observers)
     except Exception as e:
         print(f"Errore durante il processing della catena di effetti: {e}")
         return None
 
-    # equal power pan con squareroot
-    try:
-        current_signal = apply_equal_power_pan(current_signal)
-    except ValueError as e:
-        print(f"Errore di Panning: {e}. Il Panning è stato saltato.")
+    # normalizzazione ed equal power pan con squareroot in un solo passaggio (in place sul buffer della catena)
+    is_stereo = current_signal.ndim == 2 and current_signal.shape[1] == 2
+    if not is_stereo:
+        print("Errore di Panning: Il Panning richiede un segnale stereo (ndim=2, 2 canali). Il Panning è stato saltato.")
+    current_signal = apply_output_stage(current_signal, get_pan_choice() if is_stereo else None, out=current_signal)
 
     # crea output
     get_output_file(input_file_path, original_signal, current_signal, samplerate)
 
     return original_signal, current_signal
 
+
+def process_audio_chain_streaming(input_file_path, effect_chain, pan: float | None = None,
+                                  block_size: int = STREAMING_BLOCK_SIZE, output_dir: Path | None = None,
+                                  fuse: bool = True, observers: list[ChainObserver] | None = None,
+                                  limiter: bool = False, queue_size: int = PIPELINE_QUEUE_SIZE):
+    """
+    Applica una sequenza di effetti a un file audio leggendolo e scrivendolo a blocchi.
+
+    Ogni blocco letto dal file attraversa la catena tramite process_block (gli effetti conservano code di
+    convoluzione e linee di ritardo tra i blocchi) e viene scritto nel file di output appena elaborato:
+    la memoria occupata dipende dalla dimensione del blocco e dallo stato degli effetti, non dalla durata del file.
+    Poiché il picco globale non è noto durante lo streaming, il segnale non viene normalizzato:
+    l'output viene scritto in formato float (a 32 o 64 bit, secondo la precisione di elaborazione)
+    per non troncare i campioni oltre il fondo scala; se il picco scritto supera il fondo scala viene stampato un avviso.
+    In alternativa un limitatore con look-ahead (vedi LookAheadLimiter) mantiene l'uscita sotto il fondo scala;
+    il suo ritardo viene compensato, così che l'output resti allineato all'input e della stessa durata.
+    Lettura, elaborazione e scrittura sono stadi di una pipeline (vedi BlockPipeline): i blocchi vengono letti e scritti
+    in thread in background mentre la catena elabora quello corrente; al termine vengono riportati il throughput
+    e il tempo in cui ogni stadio è rimasto fermo in attesa degli altri.
+
+    Parametri in input:
+    - input_file_path: Il percorso del file di input.
+    - effect_chain: la catena di effetti costruita da build_chain_effect.
+    - pan: Valore di panning tra -1.0 e 1.0. Se None viene chiesto all'utente.
+    - block_size: il numero di campioni letti per blocco.
+    - output_dir: (opzionale) la cartella di output; di default la cartella 'output' del progetto.
+    - fuse: se True gli effetti LTI consecutivi vengono fusi in un'unica convoluzione (vedi compile_chain).
+    - observers: (opzionale) strumenti di misura chiamati attorno a ogni process_block di ogni effetto
+                 (vedi ChainObserver, ChainProfiler).
+    - limiter: se True l'uscita passa per il limitatore con look-ahead, insieme ai guadagni del pan.
+    - queue_size: il numero massimo di blocchi in attesa tra due stadi della pipeline.
+
+    Parametri in output:
+    - output_path: il percorso del file di output, oppure None in caso di errore.
+    """
+    import soundfile as sf
+
+    if pan is None:
+        pan = get_pan_choice()
+    gain_l, gain_r = get_equal_power_gains(pan)
+    observers = observers or []
+
+    for item in effect_chain:
+        item['effect'].reset()
+
+    output_path = get_output_path(input_file_path, output_dir)
+    output_peak = 0.0  # Picco dei campioni scritti, per avvisare se supera il fondo scala
+
+    try:
+        with sf.SoundFile(input_file_path) as input_file:
+            samplerate = input_file.samplerate
+            output_channels = max(input_file.channels, 2)
+            if fuse:
+                effect_chain = compile_chain(effect_chain, samplerate, output_channels)
+            channel_gains = np.array([gain_l, gain_r], dtype=get_precision()) if output_channels == 2 else None
+            output_limiter = LookAheadLimiter(samplerate) if limiter else None
+            # Campioni iniziali da scartare per compensare il ritardo del limitatore
+            skip = output_limiter.latency_samples() if output_limiter is not None else 0
+            for observer in observers:
+                observer.on_chain_start(effect_chain, samplerate)
+
+            def process(block: np.ndarray) -> np.ndarray:
+                nonlocal skip
+                # I file mono vengono elaborati come stereo replicando il canale
+                if block.shape[1] == 1:
+                    block = np.repeat(block, 2, axis=1)
+
+                for j, item in enumerate(effect_chain):
+                    for observer in observers:
+                        observer.on_effect_start(j, item, block, samplerate)
+                    block = item['effect'].process_block(block, samplerate, item['channel_mode'])
+                    for observer in observers:
+                        observer.on_effect_end(j, item, block, samplerate)
+
+                if output_limiter is not None:
+                    block = output_limiter.process_block(block, channel_gains)
+                    dropped = min(skip, block.shape[0])
+                    block, skip = block[dropped:], skip - dropped
+                elif channel_gains is not None:
+                    block *= channel_gains
+                return block
+
+            def finish() -> np.ndarray | None:
+                return output_limiter.flush(channel_gains)[skip:] if output_limiter is not None else None
+
+            try:
+                with sf.SoundFile(output_path, 'w', samplerate=samplerate, channels=output_channels,
+                                  subtype=OUTPUT_SUBTYPES[get_precision()]) as output_file:
+                    def write(block: np.ndarray):
+                        nonlocal output_peak
+                        output_file.write(block)
+                        if block.size:
+                            output_peak = max(output_peak, block.max(), -block.min())
+                        print(f"\rBlocchi scritti: {pipeline.stats['write'].blocks + 1}", end="")
+
+                    # Lettura, catena e scrittura in tre stadi sovrapposti (vedi BlockPipeline)
+                    pipeline = BlockPipeline(queue_size)
+                    report = pipeline.run(input_file.blocks(blocksize=block_size, dtype=get_precision(),
+                                                            always_2d=True),
+                                          process, write, finish, samplerate)
+            finally:
+                for observer in observers:
+                    observer.on_chain_end(effect_chain, samplerate)
+        print()
+        print(format_pipeline_report(report))
+    except Exception as e:
+        print(f"\nErrore durante il processing a blocchi della catena di effetti: {e}")
+        return None
+
+    print(f"File processato salvato in '{output_path}'.")
+    if output_peak > 1.0:
+        print(f"Attenzione: il picco dell'uscita è {output_peak:.2f} ({20 * np.log10(output_peak):+.1f} dBFS), "
+              f"oltre il fondo scala. Il file float non è troncato, ma va normalizzato prima della riproduzione "
+              f"o della conversione in un formato intero; il limitatore (--limiter) mantiene l'uscita sotto il fondo scala.")
+    return output_path
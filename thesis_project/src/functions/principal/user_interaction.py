@@ -257,6 +257,31 @@ def get_channel_mode_choice() -> str:
             print("Scelta non valida. Riprova.")
 
 
+def get_processing_mode_choice() -> str:
+    """
+        Richiede all'utente la modalità di elaborazione del file audio.
+
+        Parametri in output:
+        - str: 'memory' per l'elaborazione dell'intero file in memoria, 'streaming' per l'elaborazione a blocchi,
+               'live' per l'elaborazione in tempo reale dell'ingresso della scheda audio.
+    """
+    print("\nScegli la modalità di elaborazione:")
+    print("1. Intero file in memoria (con riproduzione e grafici)")
+    print("2. Streaming a blocchi (per file molto lunghi, senza riproduzione né grafici)")
+    print("3. Live (ingresso e uscita della scheda audio in tempo reale)")
+
+    while True:
+        choice = input("Inserisci il numero della tua scelta: ")
+        if choice == '1':
+            return 'memory'
+        elif choice == '2':
+            return 'streaming'
+        elif choice == '3':
+            return 'live'
+        else:
+            print("Scelta non valida. Inserisci 1, 2 o 3.")
+
+
 def get_pan_choice() -> float:
     """
         Richiede all'utente di inserire il valore di Panning (bilanciamento stereo).
@@ -0,0 +1,171 @@
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from thesis_project.src.effects.precision import OUTPUT_SUBTYPES, get_precision
+
+# Funzione chiamata dal backend per ogni blocco: riceve il blocco di input e il buffer di output da riempire
+BlockCallback = Callable[[np.ndarray, np.ndarray], None]
+
+
+class AudioBackend(ABC):
+    """
+    Interfaccia di I/O audio della modalità live: un flusso duplex a blocchi di dimensione fissa.
+    Il backend chiama la callback per ogni blocco con l'input (block_size, channels) e il buffer di output
+    della stessa forma, che la callback deve riempire prima di restituire il controllo.
+    """
+
+    def __init__(self, samplerate: int, channels: int = 2):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.device_xruns = 0  # Overflow/underflow segnalati dal dispositivo (oltre a quelli misurati dalla callback)
+
+    @abstractmethod
+    def run(self, callback: BlockCallback, block_size: int):
+        """
+        Avvia il flusso e chiama callback per ogni blocco, finché il flusso non termina
+        (fine del file, durata richiesta o interruzione dell'utente).
+
+        Parametri in input:
+        - callback: la funzione di elaborazione dei blocchi.
+        - block_size: il numero di campioni per blocco.
+        """
+        pass
+
+    def device_latency_samples(self) -> int:
+        """ Latenza di ingresso + uscita del dispositivo in campioni, oltre al buffering dei blocchi (default nulla). """
+        return 0
+
+
+class SoundDeviceBackend(AudioBackend):
+    """
+    Flusso duplex sulla scheda audio tramite sounddevice: ingresso e uscita del dispositivo scelto.
+    """
+
+    def __init__(self, samplerate: int = 48000, channels: int = 2, device=None, duration: float | None = None):
+        """
+        Parametri in input:
+        - samplerate: la frequenza di campionamento del flusso.
+        - channels: il numero di canali di ingresso e di uscita.
+        - device: (opzionale) il dispositivo sounddevice; se None viene usato quello di default.
+        - duration: (opzionale) durata del flusso in secondi; se None il flusso si interrompe premendo INVIO.
+        """
+        super().__init__(samplerate, channels)
+        self.device = device
+        self.duration = duration
+        self._latency = (0.0, 0.0)
+
+    def run(self, callback: BlockCallback, block_size: int):
+        # Importato qui: i backend file e null devono funzionare anche senza PortAudio (ad es. su un server)
+        import sounddevice as sd
+
+        def stream_callback(indata, outdata, frames, time_info, status):
+            if status.input_overflow or status.output_underflow:
+                self.device_xruns += 1
+            callback(indata, outdata)
+
+        with sd.Stream(samplerate=self.samplerate, blocksize=block_size, device=self.device,
+                       channels=self.channels, dtype='float32', callback=stream_callback) as stream:
+            self._latency = stream.latency
+            if self.duration is None:
+                input("Elaborazione live in corso (Premi INVIO per interrompere)...")
+            else:
+                sd.sleep(int(self.duration * 1000))
+
+    def device_latency_samples(self) -> int:
+        return round(sum(self._latency) * self.samplerate)
+
+
+class FileBackend(AudioBackend):
+    """
+    Flusso simulato da file: i blocchi vengono letti dal file di input e i blocchi elaborati scritti nel file di output.
+    Permette di verificare senza scheda audio il rispetto delle scadenze della modalità live.
+    I file mono vengono elaborati come stereo replicando il canale; l'ultimo blocco viene completato con silenzio.
+    """
+
+    def __init__(self, input_path: Path, output_path: Path, realtime: bool = False):
+        """
+        Parametri in input:
+        - input_path: il file audio di input.
+        - output_path: il file di output (in formato float, come nella modalità streaming).
+        - realtime: se True i blocchi vengono consegnati al ritmo del tempo reale, come farebbe un dispositivo;
+                    altrimenti il più velocemente possibile.
+        """
+        import soundfile as sf
+
+        info = sf.info(str(input_path))
+        super().__init__(info.samplerate, max(info.channels, 2))
+        self.input_path = input_path
+        self.output_path = output_path
+        self.realtime = realtime
+
+    def run(self, callback: BlockCallback, block_size: int):
+        import soundfile as sf
+
+        input_block = np.zeros((block_size, self.channels), dtype=get_precision())
+        output_block = np.zeros_like(input_block)
+        clock = _BlockClock(block_size / self.samplerate) if self.realtime else None
+
+        with sf.SoundFile(self.input_path) as input_file, \
+                sf.SoundFile(self.output_path, 'w', samplerate=self.samplerate, channels=self.channels,
+                             subtype=OUTPUT_SUBTYPES[get_precision()]) as output_file:
+            while True:
+                frames = input_file.read(block_size, dtype=get_precision(), always_2d=True)
+                if frames.shape[0] == 0:
+                    break
+                input_block[:frames.shape[0]] = frames  # broadcasting: un file mono riempie entrambi i canali
+                input_block[frames.shape[0]:] = 0.0
+
+                if clock is not None:
+                    clock.wait()
+                callback(input_block, output_block)
+                output_file.write(output_block[:frames.shape[0]])
+
+
+class NullBackend(AudioBackend):
+    """
+    Flusso senza dispositivo: l'input è rumore bianco e l'output viene scartato.
+    Serve a misurare il carico e gli xrun della catena in modalità live su una macchina senza audio.
+    """
+
+    def __init__(self, samplerate: int = 48000, channels: int = 2, duration: float = 10.0, realtime: bool = False):
+        """
+        Parametri in input:
+        - samplerate: la frequenza di campionamento simulata.
+        - channels: il numero di canali.
+        - duration: la durata del flusso in secondi.
+        - realtime: se True i blocchi vengono consegnati al ritmo del tempo reale.
+        """
+        super().__init__(samplerate, channels)
+        self.duration = duration
+        self.realtime = realtime
+
+    def run(self, callback: BlockCallback, block_size: int):
+        rng = np.random.default_rng(0)
+        input_block = rng.uniform(-0.5, 0.5, (block_size, self.channels)).astype(get_precision())
+        output_block = np.zeros_like(input_block)
+        clock = _BlockClock(block_size / self.samplerate) if self.realtime else None
+
+        for _ in range(int(np.ceil(self.duration * self.samplerate / block_size))):
+            if clock is not None:
+                clock.wait()
+            callback(input_block, output_block)
+
+
+class _BlockClock:
+    """ Scandisce i blocchi al ritmo del tempo reale, come l'orologio di un dispositivo audio. """
+
+    def __init__(self, period: float):
+        self.period = period
+        self.next_deadline = None
+
+    def wait(self):
+        now = time.perf_counter()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        elif now < self.next_deadline:
+            time.sleep(self.next_deadline - now)
+        self.next_deadline += self.period
@@ -0,0 +1,181 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from thesis_project.src.effects.precision import get_dtype
+
+# Campioni decodificati per volta quando il file non può essere mappato direttamente nel tipo di elaborazione
+DECODE_CHUNK_FRAMES = 1 << 18
+
+# Formati dei campioni WAV leggibili tramite memory map: (codice di formato, bit per campione) -> tipo NumPy
+_WAV_FORMAT_PCM = 1
+_WAV_FORMAT_FLOAT = 3
+_WAV_FORMAT_EXTENSIBLE = 0xFFFE
+# Formati di soundfile con contenitore RIFF/WAVE ('WAVEX' = WAVE_FORMAT_EXTENSIBLE, ad esempio multicanale)
+_WAV_CONTAINERS = ('WAV', 'WAVEX')
+_MAPPABLE_SAMPLE_TYPES = {
+    (_WAV_FORMAT_PCM, 16): np.dtype('<i2'),
+    (_WAV_FORMAT_PCM, 32): np.dtype('<i4'),
+    (_WAV_FORMAT_FLOAT, 32): np.dtype('<f4'),
+    (_WAV_FORMAT_FLOAT, 64): np.dtype('<f8'),
+}
+
+
+class AudioFile:
+    """
+    File audio aperto in sola lettura, senza decodificarlo all'apertura.
+    I file WAV non compressi (PCM a 16/32 bit, float a 32/64 bit) vengono mappati in memoria (np.memmap):
+    l'apertura è immediata e la memoria cresce solo con le pagine del file effettivamente lette.
+    Se i campioni sono già nel tipo di elaborazione, to_array restituisce direttamente la mappa, senza copia;
+    gli altri formati vengono decodificati a blocchi (dalla mappa o tramite soundfile) solo quando richiesti.
+    """
+
+    def __init__(self, path: Path, dtype: type | None = None):
+        """
+        Parametri in input:
+        - path: il percorso del file audio.
+        - dtype: (opzionale) il tipo dei campioni decodificati; di default la precisione di elaborazione corrente.
+        """
+        import soundfile as sf
+
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype or get_dtype())
+        info = sf.info(str(self.path))
+        self.samplerate = info.samplerate
+        self.channels = info.channels
+        self.frames = info.frames
+        self._samples = _map_wav_samples(self.path, self.channels, self.frames) if info.format in _WAV_CONTAINERS else None
+
+    @property
+    def mapped(self) -> bool:
+        """ True se il file è letto tramite memory map. """
+        return self._samples is not None
+
+    def read(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """
+            Decodifica i campioni [start, stop) nel tipo di elaborazione.
+
+            Parametri in input:
+            - start, stop: l'intervallo di campioni da leggere (stop None per leggere fino alla fine).
+
+            Parametri in output:
+            - audio_signal: i campioni letti, 1D per i file mono e (num_samples, canali) altrimenti.
+        """
+        stop = self.frames if stop is None else min(stop, self.frames)
+        start = min(start, stop)
+        out = np.empty((stop - start, self.channels), dtype=self.dtype)
+        self._decode_into(start, out)
+        return out[:, 0] if self.channels == 1 else out
+
+    def to_array(self) -> np.ndarray:
+        """
+            Restituisce l'intero segnale nel tipo di elaborazione, in sola lettura.
+            Se il file è mappato e i campioni sono già nel tipo richiesto restituisce la mappa stessa (senza copia),
+            altrimenti decodifica il file a blocchi in un unico array, senza array temporanei della dimensione del file.
+
+            Parametri in output:
+            - audio_signal: il segnale, 1D per i file mono e (num_samples, canali) altrimenti.
+        """
+        if self.mapped and self._samples.dtype == self.dtype:
+            audio_signal = self._samples
+        else:
+            audio_signal = np.empty((self.frames, self.channels), dtype=self.dtype)
+            for start in range(0, self.frames, DECODE_CHUNK_FRAMES):
+                self._decode_into(start, audio_signal[start:start + DECODE_CHUNK_FRAMES])
+            audio_signal.flags.writeable = False
+
+        return audio_signal[:, 0] if self.channels == 1 else audio_signal
+
+    def _decode_into(self, start: int, out: np.ndarray):
+        """ Decodifica out.shape[0] campioni a partire da start direttamente nel buffer out. """
+        import soundfile as sf
+
+        if not self.mapped:
+            with sf.SoundFile(self.path) as audio_file:
+                audio_file.seek(start)
+                audio_file.read(out.shape[0], dtype=self.dtype.name, always_2d=True, out=out)
+            return
+
+        samples = self._samples[start:start + out.shape[0]]
+        if samples.dtype.kind == 'i':
+            # Stessa scala di libsndfile: il fondo scala negativo dell'intero corrisponde a -1.0
+            np.multiply(samples, 1.0 / 2 ** (8 * samples.dtype.itemsize - 1), out=out, casting='unsafe')
+        else:
+            out[:] = samples
+
+
+def _map_wav_samples(path: Path, channels: int, frames: int) -> np.memmap | None:
+    """
+        Individua il chunk 'data' di un file WAV (RIFF) e lo mappa in memoria come array (frames, channels).
+
+        Parametri in input:
+        - path: il percorso del file WAV.
+        - channels, frames: numero di canali e di campioni riportati da soundfile.
+
+        Parametri in output:
+        - samples: la mappa in sola lettura dei campioni, oppure None se il formato non è mappabile
+                   (PCM a 8 o 24 bit, RF64, file non standard): in questo caso il file viene decodificato da soundfile.
+    """
+    sample_type = None
+    with open(path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            return None
+
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                audio_format, fmt_channels, _, _, _, bits_per_sample = struct.unpack('<HHIIHH', fmt[:16])
+                if audio_format == _WAV_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                    # Il formato effettivo è nei primi due byte del GUID del sottoformato
+                    audio_format = struct.unpack('<H', fmt[24:26])[0]
+                if fmt_channels != channels:
+                    return None
+                sample_type = _MAPPABLE_SAMPLE_TYPES.get((audio_format, bits_per_sample))
+                if chunk_size % 2:
+                    f.seek(1, 1)
+            elif chunk_id == b'data':
+                if sample_type is None or chunk_size < frames * channels * sample_type.itemsize:
+                    return None
+                return np.memmap(path, dtype=sample_type, mode='r', offset=f.tell(), shape=(frames, channels))
+            else:
+                # I chunk RIFF sono allineati a 2 byte
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+
+def load_audio(path: Path, dtype: type | None = None) -> tuple[np.ndarray, int]:
+    """
+        Carica un file audio nel tipo di elaborazione, tramite memory map quando possibile (vedi AudioFile).
+        Il segnale restituito è in sola lettura.
+
+        Parametri in input:
+        - path: il percorso del file audio.
+        - dtype: (opzionale) il tipo dei campioni; di default la precisione di elaborazione corrente.
+
+        Parametri in output:
+        - audio_signal, samplerate: il segnale (1D per i file mono) e la sua frequenza di campionamento.
+    """
+    audio_file = AudioFile(path, dtype)
+    return audio_file.to_array(), audio_file.samplerate
+
+
+def as_stereo(audio_signal: np.ndarray) -> np.ndarray:
+    """
+        Restituisce un segnale mono come stereo tramite una vista in broadcasting (lo stesso canale letto due volte),
+        senza duplicarlo in memoria. I segnali già multicanale vengono restituiti così come sono.
+
+        Parametri in input:
+        - audio_signal: il segnale (1D per un segnale mono).
+
+        Parametri in output:
+        - stereo_signal: vista (num_samples, 2) in sola lettura del segnale mono, oppure il segnale stesso.
+    """
+    if audio_signal.ndim != 1:
+        return audio_signal
+    return np.broadcast_to(audio_signal[:, np.newaxis], (audio_signal.shape[0], 2))
@@ -0,0 +1,344 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import scipy
+
+from thesis_project.src.built_in.presets import EFFECT_REGISTRY
+from thesis_project.src.effects.parallel import get_num_threads, set_num_threads
+from thesis_project.src.effects.precision import PRECISIONS, get_precision, set_precision, to_processing_dtype
+from thesis_project.src.functions.principal.effect_factory import make_effect
+from thesis_project.src.functions.principal.signal_processing import apply_output_stage, render_chain
+from thesis_project.src.functions.utility.file_handler import script_dir
+from thesis_project.src.functions.utility.memory_report import measure_peak_memory, render_for_output
+
+# Combinazioni misurate da ciascun profilo: durate del segnale (s), frequenze di campionamento,
+# numero di ripetizioni del tempo (viene riportato il minimo) per i segnali fino a un minuto
+BENCHMARK_PROFILES = {
+    "quick": {"durations": [1.0, 10.0], "samplerates": [48000], "repeats": 3},
+    "standard": {"durations": [1.0, 10.0, 60.0], "samplerates": [44100, 48000, 96000], "repeats": 3},
+    "full": {"durations": [1.0, 10.0, 60.0, 600.0, 3600.0], "samplerates": [44100, 48000, 96000], "repeats": 3},
+}
+DEFAULT_PROFILE = "quick"
+
+# Rapporto massimo ammesso rispetto alla baseline prima di segnalare una regressione
+DEFAULT_THRESHOLDS = {"elapsed": 1.20, "peak_bytes": 1.10}
+# Tempi della baseline sotto questa soglia (s) sono dominati dal rumore di misura e non vengono confrontati
+MIN_COMPARED_ELAPSED = 0.01
+
+BENCHMARK_DIR = script_dir / "benchmarks"
+FULL_CHAIN_NAME = "catena_completa"
+# Catena completa misurata: un preset rappresentativo per ogni effetto, nell'ordine tipico di utilizzo
+FULL_CHAIN = [("cabinet", "g12t75_4x12"), ("delay", "slapback"), ("ping_pong", "standard"), ("reverb", "sala_concerto")]
+
+# Modulo misurato da measure_startup e moduli pesanti che il suo import non deve caricare
+# (vengono importati al primo grafico, alla prima riproduzione, alla prima convoluzione o lettura di un file)
+STARTUP_MODULE = "thesis_project.src.main"
+DEFERRED_MODULES = ["matplotlib.pyplot", "sounddevice", "scipy.signal", "scipy.fft", "scipy.ndimage", "soundfile"]
+STARTUP_CASE_KEY = "avvio"
+
+
+def benchmark_cases(profile: str = DEFAULT_PROFILE, effects: list[str] | None = None) -> list[dict]:
+    """
+        Elenca i casi di un profilo: ogni preset registrato (e la catena completa FULL_CHAIN)
+        per ogni durata, frequenza di campionamento, segnale mono/stereo e modalità canale.
+        I segnali mono vengono misurati solo in modalità 'both' e mai con il ping pong, che richiede un segnale stereo.
+
+        Parametri in input:
+        - profile: il nome del profilo (vedi BENCHMARK_PROFILES).
+        - effects: (opzionale) gli effetti da misurare; se None vengono misurati tutti gli effetti registrati.
+
+        Parametri in output:
+        - cases: lista di casi, ciascuno con chain (lista di (effetto, preset)), layout, channel_mode, samplerate e duration.
+    """
+    if profile not in BENCHMARK_PROFILES:
+        raise ValueError(f"Profilo '{profile}' non valido. Scegli tra {', '.join(BENCHMARK_PROFILES)}.")
+    settings = BENCHMARK_PROFILES[profile]
+
+    chains = []
+    for effect_name, effect_details in EFFECT_REGISTRY.items():
+        if effects is None or effect_name in effects:
+            chains.extend([(effect_name, preset_name)] for preset_name in effect_details["presets"])
+    if effects is None or FULL_CHAIN_NAME in effects:
+        chains.append(FULL_CHAIN)
+
+    cases = []
+    # Durata e frequenza di campionamento all'esterno: lo stesso segnale di prova viene riusato da tutti i preset
+    for duration in settings["durations"]:
+        for samplerate in settings["samplerates"]:
+            for layout, channel_modes in (("mono", ["both"]), ("stereo", ["both", "left", "right"])):
+                for chain in chains:
+                    if layout == "mono" and any(effect_name == "ping_pong" for effect_name, _ in chain):
+                        continue
+                    cases.extend({"chain": chain, "layout": layout, "channel_mode": channel_mode,
+                                  "samplerate": samplerate, "duration": duration} for channel_mode in channel_modes)
+    return cases
+
+
+def case_key(case: dict) -> str:
+    """ Identificatore di un caso, usato per confrontare i risultati con la baseline. """
+    chain_name = FULL_CHAIN_NAME if len(case["chain"]) > 1 else "/".join(case["chain"][0])
+    return f"{chain_name}|{case['layout']}|{case['channel_mode']}|{case['samplerate']}|{case['duration']:g}"
+
+
+def synthetic_signal(duration: float, samplerate: int, layout: str, seed: int = 0) -> np.ndarray:
+    """
+        Genera un segnale di prova (rumore bianco a -6 dBFS di picco) nella precisione di elaborazione corrente.
+
+        Parametri in input:
+        - duration: durata in secondi.
+        - samplerate: la frequenza di campionamento.
+        - layout: 'mono' (array 1D) oppure 'stereo' (array (N, 2)).
+        - seed: seme del generatore, per segnali riproducibili.
+
+        Parametri in output:
+        - audio_signal: il segnale di prova.
+    """
+    shape = (int(duration * samplerate),) if layout == "mono" else (int(duration * samplerate), 2)
+    return to_processing_dtype(np.random.default_rng(seed).uniform(-0.5, 0.5, shape))
+
+
+def run_case(case: dict, audio_signal: np.ndarray, repeats: int) -> dict:
+    """
+        Misura un caso: tempo di elaborazione (minimo su più ripetizioni), fattore real-time e picco di memoria.
+        Gli effetti vengono creati una volta e scaldati su un segmento breve, così che il caricamento
+        e il calcolo degli spettri delle IR (in cache) non entrino nella misura. Il picco di memoria viene
+        misurato in un'esecuzione separata, perché tracemalloc rallenta le allocazioni.
+
+        Parametri in input:
+        - case: il caso da misurare (vedi benchmark_cases).
+        - audio_signal: il segnale di prova.
+        - repeats: numero di esecuzioni cronometrate.
+
+        Parametri in output:
+        - result: il caso con elapsed (s), rtf e peak_bytes.
+    """
+    samplerate = case["samplerate"]
+    effect_chain = [{'effect': make_effect(effect_name, EFFECT_REGISTRY[effect_name]["presets"][preset_name]),
+                     'channel_mode': case["channel_mode"]}
+                    for effect_name, preset_name in case["chain"]]
+    render = render_for_output if case["layout"] == "stereo" else _render_mono
+
+    render(audio_signal[:samplerate], samplerate, effect_chain)
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        render(audio_signal, samplerate, effect_chain)
+        timings.append(time.perf_counter() - start)
+    _, peak_bytes = measure_peak_memory(render, audio_signal, samplerate, effect_chain)
+
+    elapsed = min(timings)
+    return {"key": case_key(case), **case, "elapsed": elapsed, "rtf": elapsed / case["duration"],
+            "peak_bytes": peak_bytes}
+
+
+def _render_mono(audio_signal: np.ndarray, samplerate: int, effect_chain: list[dict]) -> np.ndarray:
+    """ Elaborazione di un segnale mono: catena di effetti e normalizzazione (il pan richiede un segnale stereo). """
+    processed_signal = render_chain(audio_signal, samplerate, effect_chain, verbose=False)
+    return apply_output_stage(processed_signal, out=processed_signal)
+
+
+def run_benchmarks(profile: str = DEFAULT_PROFILE, effects: list[str] | None = None) -> dict:
+    """
+        Esegue tutti i casi di un profilo e stampa una riga per caso.
+        I casi non eseguibili (ad es. un file IR mancante) vengono segnalati e saltati.
+
+        Parametri in input:
+        - profile: il nome del profilo (vedi BENCHMARK_PROFILES).
+        - effects: (opzionale) gli effetti da misurare (nomi di EFFECT_REGISTRY o 'catena_completa').
+
+        Parametri in output:
+        - results: dizionario con i metadati della misura (versioni, piattaforma, precisione) e i risultati per caso.
+    """
+    settings = BENCHMARK_PROFILES[profile]
+    cases = benchmark_cases(profile, effects)
+    results = {"metadata": _environment_metadata(profile), "results": []}
+
+    print(f"Profilo '{profile}': {len(cases)} casi (precisione {get_precision()})")
+    signal_key, audio_signal = None, None
+    for case in cases:
+        if signal_key != (case["duration"], case["samplerate"], case["layout"]):
+            signal_key = (case["duration"], case["samplerate"], case["layout"])
+            audio_signal = None  # Libera il segnale precedente prima di generare il successivo
+            audio_signal = synthetic_signal(*signal_key)
+
+        repeats = settings["repeats"] if case["duration"] <= 60 else 1
+        try:
+            result = run_case(case, audio_signal, repeats)
+        except (IOError, FileNotFoundError) as e:
+            print(f"{case_key(case):55s} non disponibile ({e})")
+            continue
+
+        results["results"].append(result)
+        print(f"{result['key']:55s} {result['elapsed']:9.4f} s  RTF {result['rtf']:.4f}  "
+              f"{result['peak_bytes'] / 2 ** 20:8.1f} MB")
+
+    return results
+
+
+def measure_startup(module: str = STARTUP_MODULE, repeats: int = 5) -> dict:
+    """
+        Misura il tempo di avvio a freddo: ogni ripetizione è un nuovo interprete che importa il modulo
+        (viene riportato il minimo). Nello stesso interprete vengono poi importati i moduli di DEFERRED_MODULES
+        installati ma non ancora caricati: il loro tempo è quello che l'avvio eviterebbe rinviandoli al primo uso.
+
+        Parametri in input:
+        - module: il modulo di cui misurare l'import.
+        - repeats: numero di interpreti avviati.
+
+        Parametri in output:
+        - result: key, elapsed (s, import del modulo), deferred_elapsed (s, import dei moduli rinviati)
+                  e loaded (moduli pesanti caricati dall'import).
+    """
+    code = (f"import importlib, importlib.util, sys, time\n"
+            f"start = time.perf_counter()\n"
+            f"import {module}\n"
+            f"elapsed = time.perf_counter() - start\n"
+            f"loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]\n"
+            f"start = time.perf_counter()\n"
+            f"for name in {DEFERRED_MODULES!r}:\n"
+            f"    if name not in sys.modules and importlib.util.find_spec(name.split('.')[0]) is not None:\n"
+            f"        importlib.import_module(name)\n"
+            f"print(elapsed, time.perf_counter() - start, ','.join(loaded))\n")
+
+    runs = []
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, "-c", code], cwd=script_dir.parent, capture_output=True,
+                                   text=True, check=True)
+        elapsed, deferred_elapsed, *loaded = completed.stdout.split()
+        runs.append((float(elapsed), float(deferred_elapsed), loaded[0].split(",") if loaded else []))
+
+    elapsed, deferred_elapsed, loaded = min(runs)
+    return {"key": STARTUP_CASE_KEY, "module": module, "elapsed": elapsed, "deferred_elapsed": deferred_elapsed,
+            "loaded": loaded}
+
+
+def _environment_metadata(profile: str) -> dict:
+    """ Informazioni sull'ambiente di misura, salvate insieme ai risultati. """
+    return {"profile": profile, "date": datetime.now().isoformat(timespec="seconds"),
+            "precision": get_precision(), "threads": get_num_threads(), "python": sys.version.split()[0], "numpy": np.__version__,
+            "scipy": scipy.__version__, "platform": platform.platform(), "processor": platform.processor()}
+
+
+def save_results(results: dict, output_path: Path) -> Path:
+    """ Salva i risultati in formato JSON, creando la cartella se necessario. """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return output_path
+
+
+def load_results(results_path: Path) -> dict:
+    """ Carica i risultati salvati da save_results. """
+    with open(results_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(results: dict, baseline: dict, thresholds: dict | None = None) -> list[dict]:
+    """
+        Confronta i risultati con una baseline salvata, caso per caso, e stampa le regressioni.
+        Per ogni metrica (elapsed, peak_bytes) viene segnalata una regressione se il rapporto
+        tra il valore attuale e quello della baseline supera la soglia. I casi presenti in uno solo dei due
+        insiemi vengono ignorati, così come i tempi della baseline sotto MIN_COMPARED_ELAPSED.
+        Se entrambi contengono il tempo di avvio (--startup) viene confrontato con la soglia dei tempi.
+
+        Parametri in input:
+        - results: i risultati attuali (vedi run_benchmarks).
+        - baseline: i risultati di riferimento.
+        - thresholds: (opzionale) rapporto massimo ammesso per metrica; default DEFAULT_THRESHOLDS.
+
+        Parametri in output:
+        - regressions: una voce per metrica peggiorata oltre la soglia, con caso, metrica, valori e rapporto.
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    baseline_by_key = {result["key"]: result for result in baseline["results"]}
+
+    if results["metadata"].get("precision") != baseline["metadata"].get("precision"):
+        print("ATTENZIONE: la baseline è stata misurata con una precisione diversa.")
+
+    regressions = []
+    compared = 0
+    for result in results["results"]:
+        reference = baseline_by_key.get(result["key"])
+        if reference is None:
+            continue
+        compared += 1
+        for metric, threshold in thresholds.items():
+            if metric == "elapsed" and reference[metric] < MIN_COMPARED_ELAPSED:
+                continue
+            ratio = result[metric] / reference[metric] if reference[metric] > 0 else float("inf")
+            if ratio > threshold:
+                regressions.append({"key": result["key"], "metric": metric, "baseline": reference[metric],
+                                    "current": result[metric], "ratio": ratio})
+
+    # Tempo di avvio (vedi measure_startup), se misurato in entrambi
+    if "startup" in results and "startup" in baseline:
+        compared += 1
+        current, reference = results["startup"]["elapsed"], baseline["startup"]["elapsed"]
+        ratio = current / reference if reference > 0 else float("inf")
+        if reference >= MIN_COMPARED_ELAPSED and ratio > thresholds["elapsed"]:
+            regressions.append({"key": STARTUP_CASE_KEY, "metric": "elapsed", "baseline": reference,
+                                "current": current, "ratio": ratio})
+
+    print(f"Confronto con la baseline: {compared} casi, {len(regressions)} regressioni")
+    for regression in regressions:
+        print(f"  {regression['key']:55s} {regression['metric']:10s} "
+              f"{regression['baseline']:.4g} -> {regression['current']:.4g} ({regression['ratio']:.2f}x)")
+
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degli effetti e della catena completa: tempo, fattore real-time e picco di memoria.")
+    parser.add_argument("--profile", choices=list(BENCHMARK_PROFILES), default=DEFAULT_PROFILE,
+                        help="combinazioni di durate e frequenze di campionamento da misurare")
+    parser.add_argument("--effects", nargs="+", choices=[*EFFECT_REGISTRY, FULL_CHAIN_NAME],
+                        help="effetti da misurare (default tutti, più la catena completa)")
+    parser.add_argument("--precision", choices=sorted(PRECISIONS), help="precisione di elaborazione")
+    parser.add_argument("--threads", type=int, help="thread del pool condiviso degli effetti (default uno per core)")
+    parser.add_argument("--startup", action="store_true",
+                        help="misura anche il tempo di avvio a freddo del programma (import di main in un nuovo processo)")
+    parser.add_argument("--output", type=Path, help="file JSON dei risultati (default benchmarks/benchmark_<data>.json)")
+    parser.add_argument("--baseline", type=Path, help="file JSON di riferimento con cui confrontare i risultati")
+    parser.add_argument("--update-baseline", action="store_true", help="salva i risultati come nuova baseline")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_THRESHOLDS["elapsed"],
+                        help="rapporto massimo ammesso sul tempo di elaborazione")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_THRESHOLDS["peak_bytes"],
+                        help="rapporto massimo ammesso sul picco di memoria")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    if arguments.precision is not None:
+        set_precision(arguments.precision)
+    if arguments.threads is not None:
+        set_num_threads(arguments.threads)
+
+    benchmark_results = run_benchmarks(arguments.profile, arguments.effects)
+    if arguments.startup:
+        startup = benchmark_results["startup"] = measure_startup()
+        print(f"{'avvio (' + startup['module'] + ')':55s} {startup['elapsed']:9.4f} s  "
+              f"moduli rinviati al primo uso {startup['deferred_elapsed']:.4f} s, "
+              f"caricati all'avvio: {', '.join(startup['loaded']) or 'nessuno'}")
+    output_path = arguments.output or BENCHMARK_DIR / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    print(f"Risultati salvati in {save_results(benchmark_results, output_path)}")
+
+    baseline_path = arguments.baseline or BENCHMARK_DIR / "baseline.json"
+    if arguments.update_baseline:
+        print(f"Baseline aggiornata: {save_results(benchmark_results, baseline_path)}")
+    elif baseline_path.exists():
+        found = compare_results(benchmark_results, load_results(baseline_path),
+                                {"elapsed": arguments.time_threshold, "peak_bytes": arguments.memory_threshold})
+        sys.exit(1 if found else 0)
+    else:
+        print(f"Nessuna baseline in {baseline_path}: usa --update-baseline per crearla.")
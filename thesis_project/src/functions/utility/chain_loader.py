@@ -0,0 +1,109 @@
+import json
+import tomllib
+from pathlib import Path
+from typing import Any
+
+from thesis_project.src.built_in.presets import EFFECT_REGISTRY
+from thesis_project.src.functions.principal.effect_factory import make_effect
+
+CHANNEL_MODES = ('both', 'left', 'right')
+
+
+def load_chain_description(chain_file_path: Path) -> dict[str, Any]:
+    """
+        Legge la descrizione dichiarativa di una catena di effetti da un file JSON o TOML.
+
+        Struttura attesa (JSON; in TOML la lista "effects" diventa [[effects]]):
+        {
+            "effects": [
+                {"effect": "cabinet", "preset": "g12t75_4x12", "channel_mode": "both"},
+                {"effect": "delay", "params": {"delay_time": 0.25, "feedback": 0.4, "mix": 0.3}, "channel_mode": "left"}
+            ],
+            "pan": 0.0,
+            "precision": "float64",
+            "inputs": ["data/*.wav"],
+            "output_dir": "output/batch"
+        }
+
+        Parametri in input:
+        - chain_file_path: percorso del file (.json o .toml).
+
+        Parametri in output:
+        - description: il dizionario che descrive la catena.
+    """
+    chain_file_path = Path(chain_file_path)
+
+    if chain_file_path.suffix.lower() == '.toml':
+        with open(chain_file_path, 'rb') as chain_file:
+            description = tomllib.load(chain_file)
+    elif chain_file_path.suffix.lower() == '.json':
+        with open(chain_file_path, 'r', encoding='utf-8') as chain_file:
+            description = json.load(chain_file)
+    else:
+        raise ValueError(f"Formato del file di catena non supportato: '{chain_file_path.suffix}'. Usa .json o .toml.")
+
+    if not description.get("effects"):
+        raise ValueError("La descrizione della catena non contiene alcun effetto ('effects').")
+
+    return description
+
+
+def resolve_effect_parameters(entry: dict[str, Any]) -> dict[str, Any]:
+    """
+        Restituisce i parametri di un effetto della catena, a partire dal preset e/o dai parametri custom.
+        I parametri custom, se presenti insieme a un preset, ne sovrascrivono i valori.
+
+        Parametri in input:
+        - entry: la voce della catena ({"effect": ..., "preset": ..., "params": {...}}).
+
+        Parametri in output:
+        - parameters: il dizionario di parametri con cui costruire l'effetto.
+    """
+    effect_name = entry.get("effect")
+    if effect_name not in EFFECT_REGISTRY:
+        raise ValueError(f"Effetto '{effect_name}' non riconosciuto. Effetti disponibili: {', '.join(EFFECT_REGISTRY)}.")
+
+    parameters = {}
+    preset = entry.get("preset")
+    if preset is not None:
+        presets = EFFECT_REGISTRY[effect_name]["presets"]
+        if preset not in presets:
+            raise ValueError(f"Preset '{preset}' non trovato per l'effetto '{effect_name}'. "
+                             f"Preset disponibili: {', '.join(presets)}.")
+        parameters.update(presets[preset])
+
+    parameters.update(entry.get("params", {}))
+
+    if not parameters:
+        raise ValueError(f"Nessun preset né parametro specificato per l'effetto '{effect_name}'.")
+
+    return parameters
+
+
+def build_chain_from_description(description: dict[str, Any]) -> tuple[list[dict[str, Any]], list[str]]:
+    """
+        Costruisce la catena di effetti (come build_chain_effect, ma senza input dell'utente).
+
+        Parametri in input:
+        - description: il dizionario letto da load_chain_description.
+
+        Parametri in output:
+        - effect_chain, effect_display_names: la catena di effetti e i nomi da visualizzare.
+    """
+    effect_chain = []
+    effect_display_names = []
+
+    for entry in description["effects"]:
+        channel_mode = entry.get("channel_mode", "both")
+        if channel_mode not in CHANNEL_MODES:
+            raise ValueError(f"Modalità canale '{channel_mode}' non valida. Scegli tra 'both', 'left', o 'right'.")
+
+        effect_name = entry["effect"]
+        effect_chain.append({
+            'effect': make_effect(effect_name, resolve_effect_parameters(entry)),
+            'preset': entry.get("preset", "custom"),
+            'channel_mode': channel_mode
+        })
+        effect_display_names.append(EFFECT_REGISTRY[effect_name].get("name", effect_name))
+
+    return effect_chain, effect_display_names
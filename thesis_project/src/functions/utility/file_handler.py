@@ -2,11 +2,10 @@ from pathlib import Path
 from typing import Union, Any
 
 import numpy as np
-import soundfile as sf
-import sounddevice as sd
 import threading
 
 from thesis_project.src.functions.principal.user_interaction import get_input_file_choice, get_playback_choice
+from thesis_project.src.functions.utility.audio_loader import as_stereo, load_audio
 
 script_dir = Path(__file__).resolve().parent.parent.parent.parent
 
@@ -15,6 +14,7 @@ def _stop_playback():
     """
         Funzione interna per fermare la riproduzione audio.
     """
+    import sounddevice as sd
     sd.stop()
 
 def _wait_for_input_and_set_event(stop_event: threading.Event):
@@ -41,6 +41,9 @@ def play_audio_from_choice(choice: str, input_signal: np.ndarray, processed_sign
         - processed_signal: Il segnale audio processato.
         - samplerate: La frequenza di campionamento.
     """
+    # Importato qui: PortAudio viene caricato solo se l'utente sceglie di riprodurre l'audio
+    import sounddevice as sd
+
     if choice == 'input':
         print("Riproduzione audio di input (Premi INVIO per interrompere)...")
         stop_event = threading.Event()
@@ -96,7 +99,7 @@ def play_audio_from_choice(choice: str, input_signal: np.ndarray, processed_sign
 
 def get_stereo_input(file_input) -> Any:
     """
-        Verifica se il file caricato è stereo. Se è mono, lo converte in stereo.
+        Verifica se il file caricato è stereo. Se è mono, lo converte in stereo (vista in sola lettura, vedi as_stereo).
 
         Parametri in input:
         - file_input: file caricato.
@@ -107,7 +110,8 @@ def get_stereo_input(file_input) -> Any:
     if file_input.ndim == 1:
         print("Il file caricato è MONO.")
         print("Il file verrà convertito in STEREO replicando il canale.")
-        file_input = np.stack((file_input, file_input), axis=1)
+        # Vista in broadcasting sullo stesso canale: nessuna copia del segnale
+        file_input = as_stereo(file_input)
         # print(f"Il file ora è stereo, la nuova forma è: {file_input.shape}")
     else:
         print("Il file caricato è STEREO.")
@@ -115,6 +119,18 @@ def get_stereo_input(file_input) -> Any:
     return file_input
 
 
+def select_audio_file_path() -> Path | None:
+    """
+        Permette all'utente di selezionare un file audio dalla cartella 'data', senza caricarlo in memoria.
+
+        Parametri in output:
+        - selected_file_path: il percorso del file selezionato, oppure None
+    """
+    data_path = script_dir / "data"
+    audio_files = sorted(list(data_path.glob("*.wav")))
+    return get_input_file_choice(data_path, audio_files)
+
+
 def get_audio_file() -> tuple[Path, np.ndarray, int] | None:
     """
         Permette all'utente di selezionare un file audio dalla cartella 'data' e lo carica in memoria.
@@ -122,15 +138,15 @@ def get_audio_file() -> tuple[Path, np.ndarray, int] | None:
         Parametri in output:
         - selected_file_path, audio_input, samplerate: il percorso del file selezionato, il file audio e la sua frequenza di campionamento
     """
-    data_path = script_dir / "data"
-    audio_files = sorted(list(data_path.glob("*.wav")))
-    selected_file_path = get_input_file_choice(data_path, audio_files)
+    selected_file_path = select_audio_file_path()
 
     #X TEST!!!
     # selected_file_path = data_path / 'guitar_solo.wav'
 
     try:
-        file_input, samplerate = sf.read(selected_file_path)
+        # Il file viene letto direttamente nella precisione di elaborazione della catena,
+        # tramite memory map quando il formato lo permette (vedi AudioFile)
+        file_input, samplerate = load_audio(selected_file_path)
     except FileNotFoundError:
         print(f"Errore: il file '{selected_file_path}' non è stato trovato.")
         return None
@@ -150,23 +166,20 @@ def get_audio_file() -> tuple[Path, np.ndarray, int] | None:
     return selected_file_path, audio_input, samplerate
 
 
-def get_output_file(input_file_path, input_audio, processed_audio, samplerate):
+def get_output_path(input_file_path: Path, output_dir: Path | None = None) -> Path:
     """
-        Salva il segnale audio processato in un file all'interno della cartella output.
-        Permette all'utente di riprodurre e confrontare l'audio originale con quello processato finché non decide di continuare
+        Genera il percorso del file di output nella cartella output, in modo sicuro per evitare sovrascritture.
 
         Parametri in input:
         - input_file_path: Il percorso del file di input originale.
-        - input_audio: L'array NumPy del segnale audio di input.
-        - effect: L'oggetto effetto che è stato applicato al segnale.
-        - selected_preset: Il nome del preset utilizzato.
-        - processed_audio: L'array NumPy del segnale audio processato.
-        - samplerate: La frequenza di campionamento del segnale audio.
+        - output_dir: (opzionale) la cartella di output; di default la cartella 'output' del progetto.
+
+        Parametri in output:
+        - output_path: il percorso (non ancora esistente) del file di output.
     """
-    output_dir = script_dir / 'output'
+    output_dir = Path(output_dir) if output_dir is not None else script_dir / 'output'
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Genera il nome del file di output in modo sicuro per evitare sovrascritture
     file_stem = f"{input_file_path.stem}_output_chain"
     output_path = output_dir / f"{file_stem}.wav"
 
@@ -175,7 +188,72 @@ def get_output_file(input_file_path, input_audio, processed_audio, samplerate):
         output_path = output_dir / f"{file_stem}_{counter}.wav"
         counter += 1
 
-    sf.write(output_path, processed_audio, samplerate)
+    return output_path
+
+
+class BackgroundWriter(threading.Thread):
+    """
+    Thread che scrive un segnale audio su file. Un errore di scrittura (disco pieno, percorso non valido) non va perso
+    nel thread: viene conservato e sollevato di nuovo da join, nel thread che attende la fine della scrittura.
+    """
+
+    def __init__(self, output_path: Path, audio_signal: np.ndarray, samplerate: int):
+        super().__init__()
+        self.output_path = output_path
+        self.audio_signal = audio_signal
+        self.samplerate = samplerate
+        self.error = None
+
+    def run(self):
+        import soundfile as sf
+
+        try:
+            sf.write(self.output_path, self.audio_signal, self.samplerate)
+        except Exception as e:
+            self.error = e
+
+    def join(self, timeout: float | None = None):
+        super().join(timeout)
+        if self.error is not None:
+            raise self.error
+
+
+def write_audio_in_background(output_path: Path, audio_signal: np.ndarray, samplerate: int) -> BackgroundWriter:
+    """
+        Scrive un segnale audio su file in un thread separato (la scrittura di soundfile rilascia il GIL),
+        così che l'encoding si sovrapponga al lavoro del thread principale. Il segnale non deve essere modificato
+        finché la scrittura non è terminata.
+
+        Parametri in input:
+        - output_path: il percorso del file da scrivere.
+        - audio_signal: il segnale da scrivere.
+        - samplerate: la frequenza di campionamento del segnale.
+
+        Parametri in output:
+        - writer: il thread di scrittura (join attende la fine della scrittura e solleva l'eventuale errore).
+    """
+    writer = BackgroundWriter(output_path, audio_signal, samplerate)
+    writer.start()
+    return writer
+
+
+def get_output_file(input_file_path, input_audio, processed_audio, samplerate):
+    """
+        Salva il segnale audio processato in un file all'interno della cartella output.
+        Permette all'utente di riprodurre e confrontare l'audio originale con quello processato finché non decide di continuare
+
+        Parametri in input:
+        - input_file_path: Il percorso del file di input originale.
+        - input_audio: L'array NumPy del segnale audio di input.
+        - effect: L'oggetto effetto che è stato applicato al segnale.
+        - selected_preset: Il nome del preset utilizzato.
+        - processed_audio: L'array NumPy del segnale audio processato.
+        - samplerate: La frequenza di campionamento del segnale audio.
+    """
+    output_path = get_output_path(input_file_path)
+
+    # L'encoding e la scrittura del file procedono in background mentre l'utente sceglie la riproduzione
+    writer = write_audio_in_background(output_path, processed_audio, samplerate)
 
     # Chiede all'utente le opzioni di riproduzione
     while True:
@@ -184,4 +262,10 @@ def get_output_file(input_file_path, input_audio, processed_audio, samplerate):
         if choice == 'none':
             break
 
+    try:
+        writer.join()
+    except Exception as e:
+        print(f"Errore durante il salvataggio del file processato in '{output_path}': {e}")
+        return
+
     print(f"File processato salvato in '{output_path}'.")
@@ -0,0 +1,176 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+
+class ChainObserver:
+    """
+    Interfaccia degli strumenti di misura della catena di effetti.
+    render_chain e process_audio_chain_streaming chiamano i metodi di ogni osservatore attorno a ciascuna
+    applicazione di un effetto (apply_effect, oppure process_block per ogni blocco in modalità streaming).
+    Le sottoclassi ridefiniscono solo i metodi che interessano: quelli di base non fanno nulla.
+    """
+
+    def on_chain_start(self, effect_chain: list[dict], samplerate: int):
+        """ Chiamato prima del primo effetto, con la catena già compilata (vedi compile_chain). """
+
+    def on_effect_start(self, index: int, item: dict, audio_signal: np.ndarray, samplerate: int):
+        """ Chiamato subito prima di applicare l'effetto item (la voce della catena di posizione index). """
+
+    def on_effect_end(self, index: int, item: dict, processed_signal: np.ndarray, samplerate: int):
+        """ Chiamato subito dopo l'applicazione dell'effetto, con il segnale prodotto. """
+
+    def on_chain_end(self, effect_chain: list[dict], samplerate: int):
+        """
+        Chiamato dopo l'ultimo effetto (o l'ultimo blocco in modalità streaming), anche quando un effetto
+        solleva un'eccezione: le risorse acquisite in on_chain_start vengono sempre rilasciate.
+        """
+
+
+def effect_label(item: dict) -> str:
+    """ Nome di una voce della catena per i report: classe dell'effetto e preset. """
+    return f"{type(item['effect']).__name__}({item.get('preset', 'custom')})"
+
+
+class ChainProfiler(ChainObserver):
+    """
+    Osservatore che misura per ogni applicazione di un effetto il tempo reale (wall), il tempo di CPU,
+    il picco di memoria allocata, i campioni elaborati e il fattore real-time (tempo reale / durata dell'audio).
+    Le misure possono essere riassunte in una tabella per effetto o esportate come trace Chrome/Perfetto.
+    """
+
+    def __init__(self, track_memory: bool = True):
+        """
+        Parametri in input:
+        - track_memory: se True misura il picco di memoria allocata da ogni effetto con tracemalloc
+                        (che rallenta le allocazioni: i tempi misurati risultano leggermente più alti).
+        """
+        self.track_memory = track_memory
+        self.measurements = []  # Una voce per applicazione di un effetto (o per blocco in streaming)
+        self.chain_runs = []  # Una voce per esecuzione della catena: inizio e fine (s)
+        self._origin_ns = time.perf_counter_ns()
+        self._started_tracing = False
+        self._effect_start = None
+        self._chain_start_ns = None
+
+    def on_chain_start(self, effect_chain: list[dict], samplerate: int):
+        self._chain_start_ns = time.perf_counter_ns()
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def on_effect_start(self, index: int, item: dict, audio_signal: np.ndarray, samplerate: int):
+        memory_start = 0
+        if self.track_memory:
+            # Il picco viene misurato rispetto alla memoria già allocata all'inizio dell'effetto
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        self._effect_start = (time.perf_counter_ns(), time.process_time_ns(), memory_start)
+
+    def on_effect_end(self, index: int, item: dict, processed_signal: np.ndarray, samplerate: int):
+        wall_end, cpu_end = time.perf_counter_ns(), time.process_time_ns()
+        wall_start, cpu_start, memory_start = self._effect_start
+        peak_bytes = tracemalloc.get_traced_memory()[1] - memory_start if self.track_memory else None
+
+        wall_time = (wall_end - wall_start) / 1e9
+        num_samples = processed_signal.shape[0]
+        self.measurements.append({
+            "index": index,
+            "effect": effect_label(item),
+            "channel_mode": item['channel_mode'],
+            "start": (wall_start - self._origin_ns) / 1e9,
+            "wall_time": wall_time,
+            "cpu_time": (cpu_end - cpu_start) / 1e9,
+            "peak_bytes": peak_bytes,
+            "samples": num_samples,
+            "duration": num_samples / samplerate,
+            "rtf": wall_time * samplerate / num_samples if num_samples else None
+        })
+
+    def on_chain_end(self, effect_chain: list[dict], samplerate: int):
+        self.chain_runs.append({"start": (self._chain_start_ns - self._origin_ns) / 1e9,
+                                "end": (time.perf_counter_ns() - self._origin_ns) / 1e9})
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def summary(self) -> list[dict]:
+        """
+            Aggrega le misure per effetto (posizione nella catena e nome): in modalità streaming o su più file
+            le applicazioni dello stesso effetto vengono sommate.
+
+            Parametri in output:
+            - rows: una voce per effetto con chiamate, tempi totali, picco massimo di memoria, campioni e durata
+                    dell'audio elaborato, fattore real-time complessivo e quota del tempo totale della catena.
+        """
+        rows = {}
+        for measurement in self.measurements:
+            key = (measurement["index"], measurement["effect"])
+            row = rows.setdefault(key, {"index": measurement["index"], "effect": measurement["effect"], "calls": 0,
+                                        "wall_time": 0.0, "cpu_time": 0.0, "peak_bytes": None, "samples": 0,
+                                        "duration": 0.0})
+            row["calls"] += 1
+            row["wall_time"] += measurement["wall_time"]
+            row["cpu_time"] += measurement["cpu_time"]
+            row["samples"] += measurement["samples"]
+            row["duration"] += measurement["duration"]
+            if measurement["peak_bytes"] is not None:
+                row["peak_bytes"] = max(row["peak_bytes"] or 0, measurement["peak_bytes"])
+
+        total_time = sum(row["wall_time"] for row in rows.values())
+        for row in rows.values():
+            row["rtf"] = row["wall_time"] / row["duration"] if row["duration"] else None
+            row["share"] = row["wall_time"] / total_time if total_time else 0.0
+
+        return sorted(rows.values(), key=lambda row: row["index"])
+
+    def format_summary(self) -> str:
+        """ Restituisce la tabella riassuntiva per effetto (vedi summary), pronta per la stampa. """
+        lines = [f"{'#':>2}  {'Effetto':40s} {'Chiamate':>8} {'Wall (s)':>9} {'CPU (s)':>9} {'Picco MB':>9} "
+                 f"{'RTF':>8} {'Quota':>6}"]
+        for row in self.summary():
+            peak = f"{row['peak_bytes'] / 2 ** 20:9.1f}" if row["peak_bytes"] is not None else f"{'-':>9}"
+            rtf = f"{row['rtf']:8.4f}" if row["rtf"] is not None else f"{'-':>8}"
+            lines.append(f"{row['index'] + 1:>2}  {row['effect'][:40]:40s} {row['calls']:>8} {row['wall_time']:9.4f} "
+                         f"{row['cpu_time']:9.4f} {peak} {rtf} {row['share']:6.1%}")
+        return "\n".join(lines)
+
+    def print_summary(self):
+        print(self.format_summary())
+
+    def export_chrome_trace(self, trace_path: Path) -> Path:
+        """
+            Esporta le misure nel formato Trace Event di Chrome, apribile con chrome://tracing o ui.perfetto.dev:
+            ogni esecuzione della catena e ogni applicazione di un effetto diventano un intervallo sulla timeline,
+            con tempo di CPU, memoria, campioni e fattore real-time tra gli argomenti.
+
+            Parametri in input:
+            - trace_path: il file JSON da scrivere.
+
+            Parametri in output:
+            - trace_path: il percorso del file scritto.
+        """
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Catena di effetti"}}]
+        for i, run in enumerate(self.chain_runs):
+            events.append({"name": f"Catena #{i + 1}", "cat": "chain", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": run["start"] * 1e6, "dur": (run["end"] - run["start"]) * 1e6})
+        for measurement in self.measurements:
+            events.append({"name": measurement["effect"], "cat": "effect", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": measurement["start"] * 1e6, "dur": measurement["wall_time"] * 1e6,
+                           "args": {key: measurement[key] for key in
+                                    ("index", "channel_mode", "cpu_time", "peak_bytes", "samples", "duration", "rtf")}})
+            if measurement["peak_bytes"] is not None:
+                # Contatore della memoria: il picco dell'effetto per la sua durata, poi di nuovo a zero
+                end = measurement["start"] + measurement["wall_time"]
+                events.append({"name": "Picco di memoria", "ph": "C", "pid": 1, "ts": measurement["start"] * 1e6,
+                               "args": {"MB": measurement["peak_bytes"] / 2 ** 20}})
+                events.append({"name": "Picco di memoria", "ph": "C", "pid": 1, "ts": end * 1e6, "args": {"MB": 0}})
+
+        trace_path = Path(trace_path)
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return trace_path
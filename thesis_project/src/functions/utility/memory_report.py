@@ -0,0 +1,94 @@
+import tracemalloc
+from typing import Any, Callable
+
+import numpy as np
+
+from thesis_project.src.built_in.presets import EFFECT_REGISTRY
+from thesis_project.src.effects.precision import to_processing_dtype
+from thesis_project.src.functions.principal.effect_factory import make_effect
+from thesis_project.src.functions.principal.signal_processing import apply_output_stage, render_chain
+
+
+def measure_peak_memory(function: Callable[..., Any], *args, **kwargs) -> tuple[Any, int]:
+    """
+        Esegue la funzione misurando il picco di memoria allocata durante l'esecuzione (tramite tracemalloc).
+        Gli array già esistenti prima della chiamata (ad es. il segnale di input) non vengono conteggiati.
+
+        Parametri in input:
+        - function: la funzione da eseguire, seguita dai suoi argomenti.
+
+        Parametri in output:
+        - result, peak_bytes: il risultato della funzione e il picco di memoria allocata (in byte).
+    """
+    tracemalloc.start()
+    try:
+        result = function(*args, **kwargs)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, peak_bytes
+
+
+def render_for_output(audio_signal: np.ndarray, samplerate: int, effect_chain: list[dict]) -> np.ndarray:
+    """ Elaborazione completa di un file in memoria, come in process_audio_chain: catena di effetti e stadio di uscita. """
+    processed_signal = render_chain(audio_signal, samplerate, effect_chain, verbose=False)
+    return apply_output_stage(processed_signal, 0.0, out=processed_signal)
+
+
+def report_preset_memory(duration: float = 60.0, samplerate: int = 48000) -> list[dict]:
+    """
+        Misura il picco di memoria dell'elaborazione in memoria di un segnale stereo per ogni preset registrato
+        e per una catena con il primo preset disponibile di ogni effetto, stampando una tabella riassuntiva.
+        Il picco è riportato anche in multipli della dimensione del segnale di input.
+
+        Parametri in input:
+        - duration: durata (in secondi) del segnale di prova.
+        - samplerate: la frequenza di campionamento del segnale di prova.
+
+        Parametri in output:
+        - report: una voce per preset con il nome, il picco in byte e il rapporto rispetto al segnale di input.
+    """
+    audio_signal = to_processing_dtype(np.random.default_rng(0).uniform(-0.5, 0.5, (int(duration * samplerate), 2)))
+
+    chains = {}
+    for effect_name, effect_details in EFFECT_REGISTRY.items():
+        for preset_name, parameters in effect_details["presets"].items():
+            chains[f"{effect_name}/{preset_name}"] = [(effect_name, parameters)]
+
+    report = []
+    first_available = {}  # Primo preset utilizzabile di ogni effetto, per la catena completa
+    print(f"Segnale di prova: {duration:.0f} s stereo a {samplerate} Hz ({audio_signal.nbytes / 2 ** 20:.1f} MB)")
+    for chain_name, entries in chains.items():
+        entry = _measure_chain(chain_name, entries, audio_signal, samplerate)
+        if entry is not None:
+            report.append(entry)
+            first_available.setdefault(entries[0][0], entries[0])
+
+    entry = _measure_chain("catena completa", list(first_available.values()), audio_signal, samplerate)
+    if entry is not None:
+        report.append(entry)
+
+    return report
+
+
+def _measure_chain(chain_name: str, entries: list[tuple[str, dict]], audio_signal: np.ndarray,
+                   samplerate: int) -> dict | None:
+    """ Misura e stampa il picco di memoria di una catena, descritta come lista di (effetto, parametri). """
+    try:
+        effect_chain = [{'effect': make_effect(effect_name, parameters), 'channel_mode': 'both'}
+                        for effect_name, parameters in entries]
+        # Prima esecuzione su un segmento breve: IR e spettri in cache non vengono conteggiati nel picco
+        render_for_output(audio_signal[:samplerate], samplerate, effect_chain)
+        _, peak_bytes = measure_peak_memory(render_for_output, audio_signal, samplerate, effect_chain)
+    except (IOError, FileNotFoundError) as e:
+        print(f"{chain_name:32s} non disponibile ({e})")
+        return None
+
+    ratio = peak_bytes / audio_signal.nbytes
+    print(f"{chain_name:32s} {peak_bytes / 2 ** 20:8.1f} MB  ({ratio:.2f}x il segnale di input)")
+    return {"chain": chain_name, "peak_bytes": peak_bytes, "ratio": ratio}
+
+
+if __name__ == "__main__":
+    report_preset_memory()
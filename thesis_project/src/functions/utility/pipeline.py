@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable
+
+import numpy as np
+
+# Blocchi in attesa tra due stadi della pipeline: oltre questo numero lo stadio a monte si ferma (backpressure)
+PIPELINE_QUEUE_SIZE = 4
+
+# Intervallo (s) con cui uno stadio fermo su una coda controlla se un altro stadio è terminato con un errore
+_POLL_INTERVAL = 0.1
+
+# Fine del flusso di blocchi tra due stadi
+_END = object()
+
+
+class StageStats:
+    """
+    Tempi di uno stadio della pipeline: tempo di lavoro e tempo fermo in attesa del blocco in ingresso
+    (stadio a monte più lento) o di spazio nella coda in uscita (stadio a valle più lento).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.blocks = 0
+        self.busy = 0.0
+        self.stalled_input = 0.0
+        self.stalled_output = 0.0
+
+    def as_dict(self) -> dict:
+        return {"blocks": self.blocks, "busy": self.busy, "stalled_input": self.stalled_input,
+                "stalled_output": self.stalled_output}
+
+
+class BlockPipeline:
+    """
+    Pipeline a tre stadi per l'elaborazione a blocchi: lettura, elaborazione ed encoding/scrittura.
+    Lettura e scrittura girano in due thread in background, l'elaborazione nel thread chiamante; gli stadi sono
+    collegati da code limitate, così l'I/O su disco si sovrappone al calcolo e la memoria resta limitata a pochi blocchi
+    (uno stadio più veloce si ferma quando la coda verso lo stadio successivo è piena).
+    Le letture e le scritture di soundfile e i kernel NumPy/SciPy rilasciano il GIL.
+    """
+
+    def __init__(self, queue_size: int = PIPELINE_QUEUE_SIZE):
+        """
+        Parametri in input:
+        - queue_size: il numero massimo di blocchi in attesa tra due stadi.
+        """
+        self.queue_size = queue_size
+        self.stats = {}
+        self._failed = threading.Event()
+        self._errors = []
+        self._written = 0
+
+    def run(self, source: Iterable[np.ndarray], process: Callable[[np.ndarray], np.ndarray],
+            sink: Callable[[np.ndarray], None], finish: Callable[[], np.ndarray | None] | None = None,
+            samplerate: int | None = None) -> dict:
+        """
+            Esegue la pipeline fino all'esaurimento dei blocchi della sorgente.
+
+            Parametri in input:
+            - source: i blocchi da elaborare (ad es. SoundFile.blocks), letti nel thread di lettura.
+            - process: la funzione applicata a ogni blocco, nel thread chiamante.
+            - sink: la funzione che scrive ogni blocco elaborato, nel thread di scrittura.
+            - finish: (opzionale) chiamata dopo l'ultimo blocco, restituisce un eventuale blocco finale
+                      (ad es. la coda di un limitatore) da scrivere.
+            - samplerate: (opzionale) la frequenza di campionamento, per riportare il throughput in tempo reale.
+
+            Parametri in output:
+            - report: dizionario con tempo totale, campioni scritti, throughput e tempi di ogni stadio (vedi report).
+        """
+        self.stats = {name: StageStats(name) for name in ("read", "process", "write")}
+        self._failed.clear()
+        self._errors = []
+        self._written = 0
+        read_queue = queue.Queue(self.queue_size)
+        write_queue = queue.Queue(self.queue_size)
+
+        start = time.perf_counter()
+        reader = threading.Thread(target=self._guard, args=(self._read, source, read_queue), daemon=True)
+        writer = threading.Thread(target=self._guard, args=(self._write, write_queue, sink), daemon=True)
+        reader.start()
+        writer.start()
+        try:
+            self._process(read_queue, write_queue, process, finish)
+        except BaseException:
+            self._failed.set()
+            raise
+        finally:
+            reader.join()
+            writer.join()
+        if self._errors:
+            raise self._errors[0]
+
+        return self.report(time.perf_counter() - start, samplerate)
+
+    def report(self, elapsed: float, samplerate: int | None = None) -> dict:
+        """
+            Parametri in input:
+            - elapsed: il tempo totale dell'esecuzione (s).
+            - samplerate: (opzionale) la frequenza di campionamento dei blocchi.
+
+            Parametri in output:
+            - report: tempo totale, campioni scritti, campioni al secondo, rapporto rispetto al tempo reale
+                      (se samplerate è noto) e tempi di lavoro e di attesa di ogni stadio.
+        """
+        report = {"elapsed": elapsed, "samples": self._written,
+                  "samples_per_second": self._written / elapsed if elapsed > 0 else 0.0,
+                  "stages": {name: stats.as_dict() for name, stats in self.stats.items()}}
+        if samplerate:
+            report["realtime_factor"] = report["samples_per_second"] / samplerate
+        return report
+
+    def _guard(self, stage: Callable, *args):
+        """ Esegue uno stadio in background registrando l'eventuale errore e fermando gli altri stadi. """
+        try:
+            stage(*args)
+        except BaseException as e:
+            self._errors.append(e)
+            self._failed.set()
+
+    def _put(self, target: queue.Queue, item, stats: StageStats) -> bool:
+        start = time.perf_counter()
+        while not self._failed.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                stats.stalled_output += time.perf_counter() - start
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, source: queue.Queue, stats: StageStats):
+        start = time.perf_counter()
+        while not self._failed.is_set():
+            try:
+                item = source.get(timeout=_POLL_INTERVAL)
+                stats.stalled_input += time.perf_counter() - start
+                return item
+            except queue.Empty:
+                pass
+        return _END
+
+    def _read(self, source: Iterable[np.ndarray], read_queue: queue.Queue):
+        stats = self.stats["read"]
+        blocks = iter(source)
+        while True:
+            start = time.perf_counter()
+            block = next(blocks, _END)
+            stats.busy += time.perf_counter() - start
+            if block is _END:
+                break
+            stats.blocks += 1
+            if not self._put(read_queue, block, stats):
+                return
+        self._put(read_queue, _END, stats)
+
+    def _process(self, read_queue: queue.Queue, write_queue: queue.Queue,
+                 process: Callable[[np.ndarray], np.ndarray], finish: Callable[[], np.ndarray | None] | None):
+        stats = self.stats["process"]
+        while True:
+            block = self._get(read_queue, stats)
+            if block is _END:
+                break
+            start = time.perf_counter()
+            block = process(block)
+            stats.busy += time.perf_counter() - start
+            stats.blocks += 1
+            if not self._put(write_queue, block, stats):
+                return
+
+        if self._failed.is_set():
+            return
+        if finish is not None:
+            start = time.perf_counter()
+            block = finish()
+            stats.busy += time.perf_counter() - start
+            if block is not None and len(block) and not self._put(write_queue, block, stats):
+                return
+        self._put(write_queue, _END, stats)
+
+    def _write(self, write_queue: queue.Queue, sink: Callable[[np.ndarray], None]):
+        stats = self.stats["write"]
+        while True:
+            block = self._get(write_queue, stats)
+            if block is _END:
+                break
+            start = time.perf_counter()
+            sink(block)
+            stats.busy += time.perf_counter() - start
+            stats.blocks += 1
+            self._written += len(block)
+
+
+def format_pipeline_report(report: dict) -> str:
+    """
+        Formatta il report della pipeline: throughput complessivo e, per ogni stadio, tempo di lavoro e tempo fermo
+        in attesa dello stadio a monte (ingresso) o a valle (uscita).
+
+        Parametri in input:
+        - report: il report restituito da BlockPipeline.run.
+
+        Parametri in output:
+        - text: il report come tabella di testo.
+    """
+    throughput = f"{report['samples_per_second']:,.0f} campioni/s"
+    if "realtime_factor" in report:
+        throughput += f", {report['realtime_factor']:.1f}x tempo reale"
+    lines = [f"Pipeline: {report['samples']} campioni in {report['elapsed']:.3f} s ({throughput})",
+             f"{'Stadio':<10}{'Blocchi':>9}{'Lavoro (s)':>12}{'Attesa in (s)':>15}{'Attesa out (s)':>16}"]
+    for name, stage in report["stages"].items():
+        lines.append(f"{name:<10}{stage['blocks']:>9}{stage['busy']:>12.3f}{stage['stalled_input']:>15.3f}"
+                     f"{stage['stalled_output']:>16.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from thesis_project.src.effects import FusedConvolutionEffect
+from thesis_project.src.effects.precision import get_precision, to_processing_dtype
+from thesis_project.src.functions.principal.chain_compiler import compile_chain, effect_signature
+from thesis_project.src.functions.utility.file_handler import script_dir
+from thesis_project.src.functions.utility.instrumentation import ChainObserver
+
+RENDER_CACHE_DIR = script_dir / "cache" / "render"
+# Spazio massimo occupato su disco dai risultati in cache: oltre, vengono rimossi i meno usati di recente
+DEFAULT_RENDER_CACHE_BYTES = 2 * 1024 ** 3
+# Campioni letti per volta durante il calcolo dell'hash del segnale
+_HASH_CHUNK_FRAMES = 1 << 18
+
+
+def _fused_span(item: dict) -> int:
+    """ Numero di voci della catena originale coperte da una voce della catena compilata. """
+    effect = item['effect']
+    return len(effect.effect_names) if isinstance(effect, FusedConvolutionEffect) else 1
+
+
+class RenderCache:
+    """
+    Cache su disco dei risultati intermedi della catena, indirizzata dal contenuto: la chiave dopo l'effetto i
+    è l'hash della chiave precedente e della descrizione canonica dell'effetto (vedi effect_signature), a partire
+    dall'hash del segnale di input, della frequenza di campionamento e della precisione. Catene con lo stesso prefisso
+    condividono quindi i risultati intermedi del prefisso.
+    I risultati sono file .npy letti tramite memory map; quando lo spazio occupato supera max_bytes vengono rimossi
+    quelli usati meno di recente.
+    """
+
+    def __init__(self, cache_dir: Path = RENDER_CACHE_DIR, max_bytes: int = DEFAULT_RENDER_CACHE_BYTES):
+        """
+        Parametri in input:
+        - cache_dir: la cartella dei risultati in cache.
+        - max_bytes: lo spazio massimo occupato su disco (in byte).
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def input_key(self, audio_signal: np.ndarray, samplerate: int) -> str:
+        """ Hash del segnale di input (contenuto, forma e tipo), della frequenza di campionamento e della precisione. """
+        digest = hashlib.sha256(json.dumps([audio_signal.shape, audio_signal.dtype.str, samplerate,
+                                            get_precision()]).encode())
+        for start in range(0, audio_signal.shape[0], _HASH_CHUNK_FRAMES):
+            digest.update(np.ascontiguousarray(audio_signal[start:start + _HASH_CHUNK_FRAMES]).data)
+        return digest.hexdigest()
+
+    def stage_keys(self, input_key: str, effect_chain: list[dict]) -> list[str]:
+        """ Chiavi dei risultati dopo ciascun effetto della catena: la i-esima dipende dai primi i + 1 effetti. """
+        keys = []
+        key = input_key
+        for item in effect_chain:
+            signature = json.dumps(effect_signature(item), sort_keys=True, default=str)
+            key = hashlib.sha256((key + signature).encode()).hexdigest()
+            keys.append(key)
+        return keys
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
+
+    def load(self, key: str) -> np.ndarray | None:
+        """ Restituisce il risultato in cache (memory map in sola lettura), oppure None. """
+        path = self._path(key)
+        try:
+            audio_signal = np.load(path, mmap_mode='r')
+            os.utime(path)  # Data di accesso per la rimozione dei meno usati di recente
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return audio_signal
+
+    def store(self, key: str, audio_signal: np.ndarray):
+        """
+            Salva un risultato (scrittura atomica: un file incompleto non viene mai letto) e applica il limite.
+            Un risultato più grande di max_bytes non viene salvato: verrebbe rimosso subito dopo la scrittura.
+        """
+        if audio_signal.nbytes > self.max_bytes:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.cache_dir / f"{key}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as f:
+            np.save(f, audio_signal)
+        os.replace(temporary_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """ Rimuove i risultati usati meno di recente finché lo spazio occupato non rientra in max_bytes. """
+        if not self.cache_dir.exists():
+            return
+        entries = sorted(((path.stat().st_mtime_ns, path.stat().st_size, path) for path in self.cache_dir.glob("*.npy")))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """ Rimuove tutti i risultati in cache. """
+        for path in self.cache_dir.glob("*.npy"):
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """ Restituisce hit, miss, numero di risultati e spazio occupato. """
+        paths = list(self.cache_dir.glob("*.npy")) if self.cache_dir.exists() else []
+        return {"hits": self.hits, "misses": self.misses, "entries": len(paths),
+                "bytes": sum(path.stat().st_size for path in paths)}
+
+
+class _StageWriter(ChainObserver):
+    """ Salva in cache il risultato di ogni voce della catena compilata, con la chiave del prefisso che copre. """
+
+    def __init__(self, cache: RenderCache, keys: list[str], first: int):
+        self.cache = cache
+        self.keys = keys
+        self.position = first  # Numero di voci della catena originale già applicate
+
+    def on_effect_end(self, index: int, item: dict, processed_signal: np.ndarray, samplerate: int):
+        self.position += _fused_span(item)
+        self.cache.store(self.keys[self.position - 1], processed_signal)
+
+
+def render_chain_cached(audio_data: np.ndarray, samplerate: int, effect_chain: list[dict],
+                        cache: RenderCache | None = None, verbose: bool = True, fuse: bool = True,
+                        observers: list[ChainObserver] | None = None) -> np.ndarray:
+    """
+        Come render_chain, ma riparte dal prefisso più lungo della catena il cui risultato è già in cache
+        e salva il risultato dopo ogni effetto calcolato. Rieseguire la stessa catena sullo stesso input
+        restituisce direttamente il risultato in cache.
+
+        Parametri in input:
+        - audio_data: il segnale di input.
+        - samplerate: la frequenza di campionamento.
+        - effect_chain: la catena di effetti costruita da build_chain_effect.
+        - cache: (opzionale) la cache da usare; di default quella nella cartella 'cache/render' del progetto.
+        - verbose: se True stampa il prefisso riutilizzato e gli effetti in corso di applicazione.
+        - fuse: se True gli effetti LTI consecutivi ancora da calcolare vengono fusi (vedi compile_chain);
+                i risultati intermedi vengono salvati solo al termine di ogni convoluzione fusa.
+        - observers: (opzionale) strumenti di misura chiamati attorno a ogni effetto calcolato.
+
+        Parametri in output:
+        - current_signal: il segnale con tutti gli effetti applicati (non normalizzato, scrivibile).
+    """
+    from thesis_project.src.functions.principal.signal_processing import render_chain
+
+    cache = cache or RenderCache()
+    keys = cache.stage_keys(cache.input_key(audio_data, samplerate), effect_chain)
+
+    # Prefisso più lungo già calcolato
+    first, current_signal = 0, None
+    for i in range(len(keys), 0, -1):
+        current_signal = cache.load(keys[i - 1])
+        if current_signal is not None:
+            first = i
+            break
+
+    if first == len(effect_chain) and current_signal is not None:
+        cache.hits += 1
+        if verbose:
+            print("Risultato della catena trovato in cache.")
+        return np.array(current_signal)
+
+    if first > 0:
+        cache.hits += 1
+        if verbose:
+            print(f"Riutilizzo dalla cache il risultato dei primi {first} effetti su {len(effect_chain)}.")
+    else:
+        cache.misses += 1
+        current_signal = to_processing_dtype(audio_data)
+
+    remaining = effect_chain[first:]
+    if fuse:
+        remaining = compile_chain(remaining, samplerate, 1 if current_signal.ndim == 1 else current_signal.shape[1])
+    processed_signal = render_chain(current_signal, samplerate, remaining, verbose=verbose, fuse=False,
+                                    observers=[*(observers or []), _StageWriter(cache, keys, first)])
+    return processed_signal
@@ -0,0 +1,94 @@
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+from thesis_project.src.effects.fused_convolution import FUSED_RESPONSE_CACHE
+from thesis_project.src.effects.ir_cache import CABINET_IR_CACHE, IRCache
+from thesis_project.src.effects.reverb import REVERB_IR_CACHE
+
+# Cache di IR e spettri pubblicate dal processo principale ai processi di elaborazione
+SHARED_CACHES = {"cabinet": CABINET_IR_CACHE, "reverb": REVERB_IR_CACHE, "fused": FUSED_RESPONSE_CACHE}
+
+
+class SharedIRStore:
+    """
+    Copia le voci delle cache delle IR (IR dei cabinet decodificate e ricampionate, IR sintetiche dei riverberi,
+    risposte degli effetti LTI fusi e i loro spettri) in blocchi di memoria condivisa, una sola volta nel processo
+    principale.
+    I processi di elaborazione le collegano alle proprie cache con attach_shared_irs, senza ricaricare né ricampionare
+    le IR: gli array sono viste in sola lettura sulla stessa memoria fisica.
+    """
+
+    def __init__(self):
+        self._blocks = []
+        self.entries = []  # (nome della cache, chiave, descrizione del valore), da passare ai processi
+
+    def publish(self, caches: dict[str, IRCache] | None = None) -> list[tuple]:
+        """
+            Pubblica in memoria condivisa tutte le voci delle cache.
+
+            Parametri in input:
+            - caches: (opzionale) le cache da pubblicare, per nome; di default SHARED_CACHES.
+
+            Parametri in output:
+            - entries: le descrizioni delle voci pubblicate (picklabili), da passare ad attach_shared_irs.
+        """
+        for cache_name, cache in (caches or SHARED_CACHES).items():
+            for key, value in cache.items():
+                self.entries.append((cache_name, key, self._share(value)))
+        return self.entries
+
+    @property
+    def nbytes(self) -> int:
+        """ Memoria condivisa occupata dalle voci pubblicate (in byte). """
+        return sum(block.size for block in self._blocks)
+
+    def close(self):
+        """ Rilascia e rimuove i blocchi di memoria condivisa (da chiamare dopo la fine dei processi). """
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+        self.entries.clear()
+
+    def _share(self, value: Any) -> Any:
+        """ Sostituisce gli array del valore (anche dentro tuple) con la descrizione del blocco condiviso. """
+        if isinstance(value, np.ndarray):
+            block = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+            np.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)[...] = value
+            self._blocks.append(block)
+            return ("array", block.name, value.shape, value.dtype.str)
+        if isinstance(value, tuple):
+            return ("tuple", [self._share(item) for item in value])
+        return ("value", value)
+
+
+def attach_shared_irs(entries: list[tuple], caches: dict[str, IRCache] | None = None) -> list:
+    """
+        Inserisce nelle cache del processo corrente le voci pubblicate da SharedIRStore.publish.
+
+        Parametri in input:
+        - entries: le descrizioni delle voci pubblicate.
+        - caches: (opzionale) le cache da popolare, per nome; di default SHARED_CACHES.
+
+        Parametri in output:
+        - blocks: i blocchi di memoria condivisa collegati, da mantenere aperti finché le cache li usano.
+    """
+    caches = caches or SHARED_CACHES
+    blocks = []
+
+    def attach(description):
+        kind = description[0]
+        if kind == "array":
+            _, name, shape, dtype = description
+            block = shared_memory.SharedMemory(name=name)
+            blocks.append(block)
+            return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        if kind == "tuple":
+            return tuple(attach(item) for item in description[1])
+        return description[1]
+
+    for cache_name, key, description in entries:
+        caches[cache_name].put(key, attach(description))
+    return blocks
@@ -1,10 +1,33 @@
+import argparse
+from pathlib import Path
+
+from thesis_project.src.effects.parallel import set_num_threads
+from thesis_project.src.effects.precision import PRECISIONS, set_precision
+from thesis_project.src.functions.principal.batch_processing import resolve_input_files, run_batch
 from thesis_project.src.functions.principal.effect_factory import build_chain_effect
-from thesis_project.src.functions.principal.signal_processing import process_audio_chain
-from thesis_project.src.functions.principal.user_interaction import get_plot_choice
-from thesis_project.src.functions.utility.file_handler import get_audio_file
+from thesis_project.src.functions.principal.live_processing import LIVE_BLOCK_SIZE, run_live
+from thesis_project.src.functions.principal.render_farm import run_render_farm
+from thesis_project.src.functions.principal.signal_processing import process_audio_chain, process_audio_chain_streaming
+from thesis_project.src.functions.principal.user_interaction import (get_pan_choice, get_plot_choice,
+                                                                    get_processing_mode_choice)
+from thesis_project.src.functions.utility.audio_backends import (AudioBackend, FileBackend, NullBackend,
+                                                                 SoundDeviceBackend)
+from thesis_project.src.functions.utility.chain_loader import build_chain_from_description, load_chain_description
+from thesis_project.src.functions.utility.file_handler import get_audio_file, get_output_path, select_audio_file_path
+from thesis_project.src.functions.utility.instrumentation import ChainProfiler
+from thesis_project.src.functions.utility.render_cache import RenderCache
+
 
+def main(observers=None, limiter: bool = False, render_cache: RenderCache | None = None):
 
-def main():
+    # scegli la modalità di elaborazione
+    processing_mode = get_processing_mode_choice()
+    if processing_mode == 'streaming':
+        main_streaming(observers, limiter)
+        return
+    if processing_mode == 'live':
+        main_live(SoundDeviceBackend(), observers=observers, limiter=limiter)
+        return
 
     # prendi file input
     input_file_path, audio_input, samplerate = get_audio_file()
@@ -18,7 +41,7 @@ def main():
         effect_chain, effect_display_names = chain_result
 
     # processa il file audio
-    result = process_audio_chain(input_file_path, audio_input, samplerate, effect_chain)
+    result = process_audio_chain(input_file_path, audio_input, samplerate, effect_chain, observers, render_cache)
     if result is None:
         return
 
@@ -26,5 +49,142 @@ def main():
     original_signal, processed_signal = result
     get_plot_choice(original_signal, processed_signal, effect_display_names)
 
+
+def main_streaming(observers=None, limiter: bool = False):
+
+    # prendi il percorso del file input (verrà letto a blocchi)
+    input_file_path = select_audio_file_path()
+    if input_file_path is None:
+        return
+
+    # costruisci la catena di effetti
+    chain_result = build_chain_effect()
+    if chain_result is None:
+        print("Nessuna catena di effetti da elaborare. Uscita.")
+        return
+    effect_chain, _ = chain_result
+
+    # processa il file audio a blocchi
+    process_audio_chain_streaming(input_file_path, effect_chain, observers=observers, limiter=limiter)
+
+
+def main_live(backend: AudioBackend, block_size: int = LIVE_BLOCK_SIZE, chain_file_path: Path | None = None,
+              observers=None, limiter: bool = False):
+
+    # costruisci la catena di effetti (dal file di catena, se indicato)
+    if chain_file_path is not None:
+        description = load_chain_description(chain_file_path)
+        effect_chain, _ = build_chain_from_description(description)
+        pan = float(description.get("pan", 0.0))
+        limiter = limiter or description.get("limiter", False)
+    else:
+        chain_result = build_chain_effect()
+        if chain_result is None:
+            print("Nessuna catena di effetti da elaborare. Uscita.")
+            return
+        effect_chain, _ = chain_result
+        pan = get_pan_choice()
+
+    # esegui la catena sul flusso del backend
+    run_live(effect_chain, backend, block_size, pan, observers=observers, limiter=limiter)
+
+
+def make_live_backend(arguments) -> AudioBackend:
+    """ Costruisce il backend di I/O della modalità live richiesto dagli argomenti da riga di comando. """
+    if arguments.backend == "file":
+        if not arguments.input:
+            raise SystemExit("Il backend 'file' richiede --input con il file da elaborare.")
+        input_files = resolve_input_files(arguments.input)
+        if not input_files:
+            raise SystemExit("Nessun file di input corrisponde ai pattern indicati.")
+        return FileBackend(input_files[0], get_output_path(input_files[0], arguments.output_dir), arguments.realtime)
+    if arguments.backend == "null":
+        return NullBackend(arguments.samplerate, duration=arguments.duration or 10.0, realtime=arguments.realtime)
+    return SoundDeviceBackend(arguments.samplerate, duration=arguments.duration)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Catena di effetti audio. Senza argomenti avvia la modalità interattiva; "
+                    "con --chain elabora i file senza prompt, riproduzione né grafici.")
+    parser.add_argument("--chain", type=Path, help="file JSON/TOML con la descrizione della catena di effetti")
+    parser.add_argument("--input", nargs="+", help="pattern glob dei file di input (sovrascrivono quelli del file di catena)")
+    parser.add_argument("--output-dir", type=Path, help="cartella di output (sovrascrive quella del file di catena)")
+    parser.add_argument("--streaming", action="store_true", help="elabora i file a blocchi")
+    parser.add_argument("--split", type=int,
+                        help="con --chain divide ogni file in N segmenti elaborati in parallelo su N processi")
+    parser.add_argument("--workers", type=int,
+                        help="con --chain elabora i file su N processi, dal più lungo, con le IR in memoria condivisa")
+    parser.add_argument("--precision", choices=sorted(PRECISIONS),
+                        help="precisione di elaborazione (default float64; float32 dimezza la memoria occupata)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="in modalità interattiva non riusare né salvare i risultati intermedi della catena "
+                             "nella cartella 'cache/render'")
+    parser.add_argument("--cache", action="store_true",
+                        help="con --chain riusa e salva i risultati intermedi della catena nella cartella 'cache/render' "
+                             "(utile per rielaborare gli stessi file con catene che condividono i primi effetti)")
+    parser.add_argument("--threads", type=int,
+                        help="thread usati dagli effetti per elaborare canali e blocchi in parallelo (default uno per core)")
+    parser.add_argument("--profile", action="store_true",
+                        help="misura tempo, CPU e memoria di ogni effetto e stampa una tabella riassuntiva")
+    parser.add_argument("--trace", type=Path,
+                        help="esporta le misure di --profile come trace Chrome/Perfetto nel file indicato")
+    parser.add_argument("--limiter", action="store_true",
+                        help="nell'elaborazione a blocchi e live limita l'uscita sotto il fondo scala (look-ahead 5 ms)")
+    parser.add_argument("--live", action="store_true",
+                        help="elaborazione in tempo reale a blocchi (catena da --chain, o costruita interattivamente)")
+    parser.add_argument("--backend", choices=["sounddevice", "file", "null"], default="sounddevice",
+                        help="I/O della modalità live: scheda audio, file (--input) o nessun dispositivo")
+    parser.add_argument("--block-size", type=int, default=LIVE_BLOCK_SIZE, help="campioni per blocco in modalità live")
+    parser.add_argument("--samplerate", type=int, default=48000,
+                        help="frequenza di campionamento dei backend sounddevice e null")
+    parser.add_argument("--duration", type=float, help="durata (s) del flusso live; senza, INVIO lo interrompe")
+    parser.add_argument("--realtime", action="store_true",
+                        help="con i backend file e null consegna i blocchi al ritmo del tempo reale")
+    arguments = parser.parse_args()
+
+    # Combinazioni in cui un'opzione verrebbe ignorata senza avviso
+    if arguments.workers is not None:
+        if arguments.profile or arguments.trace is not None:
+            parser.error("--profile e --trace non sono supportati con --workers (i file sono elaborati in altri processi)")
+        if arguments.split is not None:
+            parser.error("--split e --workers sono alternativi: scegli se dividere i file o distribuirli tra i processi")
+        if arguments.cache:
+            parser.error("--cache non è supportata con --workers")
+    if arguments.split is not None and arguments.streaming:
+        parser.error("--split è supportato solo nell'elaborazione in memoria, non con --streaming")
+    return arguments
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    arguments = parse_arguments()
+    profiler = ChainProfiler() if arguments.profile or arguments.trace is not None else None
+    chain_observers = [profiler] if profiler is not None else None
+    # La cache dei risultati è attiva di default solo in modalità interattiva, dove si rielabora lo stesso file:
+    # in un batch ogni file viene elaborato una volta e salvarne i risultati intermedi sarebbe solo scrittura su disco
+    if arguments.chain is not None:
+        render_cache = RenderCache() if arguments.cache else None
+    else:
+        render_cache = None if arguments.no_cache else RenderCache()
+    if arguments.threads is not None:
+        set_num_threads(arguments.threads)
+
+    if arguments.live:
+        if arguments.precision is not None:
+            set_precision(arguments.precision)
+        main_live(make_live_backend(arguments), arguments.block_size, arguments.chain, chain_observers,
+                  arguments.limiter)
+    elif arguments.chain is not None and arguments.workers is not None:
+        run_render_farm(arguments.chain, arguments.input, arguments.output_dir, arguments.streaming,
+                        arguments.precision, arguments.limiter or None, arguments.workers)
+    elif arguments.chain is not None:
+        run_batch(arguments.chain, arguments.input, arguments.output_dir, arguments.streaming, arguments.precision,
+                  chain_observers, arguments.limiter or None, arguments.split, render_cache)
+    else:
+        if arguments.precision is not None:
+            set_precision(arguments.precision)
+        main(chain_observers, arguments.limiter, render_cache)
+
+    if profiler is not None:
+        profiler.print_summary()
+        if arguments.trace is not None:
+            print(f"Trace salvato in '{profiler.export_chrome_trace(arguments.trace)}'.")
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# I moduli vengono importati come thesis_project.src...: la radice del repository deve essere nel path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from thesis_project.src.effects.ir_catalog import IR_CATALOG  # noqa: E402
+from thesis_project.src.effects.precision import DEFAULT_PRECISION, set_precision  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def default_precision():
+    """ Ogni test parte dalla precisione di default e la ripristina al termine. """
+    set_precision(DEFAULT_PRECISION)
+    yield
+    set_precision(DEFAULT_PRECISION)
+
+
+@pytest.fixture(autouse=True)
+def ir_catalog_dir(tmp_path_factory, monkeypatch):
+    """ L'indice delle IR viene scritto in una cartella temporanea, non nella cache del progetto. """
+    monkeypatch.setattr(IR_CATALOG, 'index_dir', tmp_path_factory.mktemp('ir_index'))
+    monkeypatch.setattr(IR_CATALOG, '_entries', None)
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    """ Generatore con seme fisso: i segnali di test sono riproducibili. """
+    return np.random.default_rng(0)
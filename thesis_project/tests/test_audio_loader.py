@@ -0,0 +1,77 @@
+import struct
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from thesis_project.src.functions.utility.audio_loader import AudioFile, as_stereo, load_audio
+
+SAMPLERATE = 48000
+# (formato, sottoformato, mappabile): PCM a 24 bit viene decodificato da soundfile
+FORMATS = [('WAV', 'PCM_16', True), ('WAV', 'PCM_24', False), ('WAV', 'PCM_32', True), ('WAV', 'FLOAT', True),
+           ('WAV', 'DOUBLE', True), ('WAVEX', 'PCM_16', True), ('WAVEX', 'PCM_32', True), ('WAVEX', 'FLOAT', True),
+           ('WAVEX', 'DOUBLE', True), ('FLAC', 'PCM_16', False)]
+
+
+@pytest.mark.parametrize("file_format, subtype, mappable", FORMATS)
+@pytest.mark.parametrize("channels", [1, 2, 6])
+@pytest.mark.parametrize("dtype", ['float32', 'float64'])
+def test_loader_matches_soundfile(rng, tmp_path, file_format, subtype, mappable, channels, dtype):
+    path = tmp_path / f'input.{"flac" if file_format == "FLAC" else "wav"}'
+    sf.write(path, rng.uniform(-1.0, 1.0, (5000, channels)), SAMPLERATE, format=file_format, subtype=subtype)
+    expected, samplerate = sf.read(path, dtype=dtype)
+
+    audio_file = AudioFile(path, dtype)
+
+    assert audio_file.mapped == mappable
+    assert audio_file.samplerate == samplerate
+    audio_signal = audio_file.to_array()
+    assert audio_signal.dtype == np.dtype(dtype) and audio_signal.shape == expected.shape
+    np.testing.assert_array_equal(audio_signal, expected)
+    np.testing.assert_array_equal(audio_file.read(123, 4567), expected[123:4567])
+    np.testing.assert_array_equal(audio_file.read(4000, 9000), expected[4000:])
+
+
+def test_full_scale_integers_match_soundfile(tmp_path):
+    path = tmp_path / 'extremes.wav'
+    sf.write(path, np.array([[-32768], [32767], [0], [-1]], dtype=np.int16), SAMPLERATE, subtype='PCM_16')
+
+    np.testing.assert_array_equal(load_audio(path)[0], sf.read(path)[0])
+
+
+def test_extra_chunks_before_data(rng, tmp_path):
+    path = tmp_path / 'chunks.wav'
+    sf.write(path, rng.uniform(-1.0, 1.0, (3000, 2)), SAMPLERATE, subtype='FLOAT')
+
+    # Chunk sconosciuto di lunghezza dispari (con byte di allineamento) tra 'fmt ' e 'data'
+    content = path.read_bytes()
+    data_offset = content.index(b'data')
+    junk = b'JUNK' + struct.pack('<I', 3) + b'abc' + b'\0'
+    content = content[:data_offset] + junk + content[data_offset:]
+    path.write_bytes(content[:4] + struct.pack('<I', len(content) - 8) + content[8:])
+
+    audio_file = AudioFile(path)
+    assert audio_file.mapped
+    np.testing.assert_array_equal(audio_file.to_array(), sf.read(path)[0])
+
+
+def test_mapped_file_is_not_copied(rng, tmp_path):
+    path = tmp_path / 'double.wav'
+    sf.write(path, rng.uniform(-1.0, 1.0, (3000, 2)), SAMPLERATE, subtype='DOUBLE')
+
+    audio_signal, _ = load_audio(path, np.float64)
+
+    assert isinstance(audio_signal, np.memmap)
+    assert not audio_signal.flags.writeable
+
+
+def test_mono_as_stereo_view(rng, tmp_path):
+    path = tmp_path / 'mono.wav'
+    sf.write(path, rng.uniform(-1.0, 1.0, 3000), SAMPLERATE, subtype='FLOAT')
+
+    audio_signal, _ = load_audio(path)
+    stereo_signal = as_stereo(audio_signal)
+
+    assert audio_signal.ndim == 1 and stereo_signal.shape == (3000, 2)
+    assert np.shares_memory(stereo_signal, audio_signal)
+    np.testing.assert_array_equal(stereo_signal[:, 1], sf.read(path)[0])
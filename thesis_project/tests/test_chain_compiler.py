@@ -0,0 +1,72 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from thesis_project.src.effects import CabinetEffect, DelayEffect, FusedConvolutionEffect, ReverbEffect
+from thesis_project.src.functions.principal.chain_compiler import compile_chain, verify_compiled_chain
+from thesis_project.src.functions.principal.signal_processing import render_chain
+
+SAMPLERATE = 44100
+CHANNEL_MODES = ['both', 'left', 'right']
+
+
+def make_chain(*modes: str) -> list[dict]:
+    effects = [CabinetEffect('G12T75-4x12.wav', 0.8), ReverbEffect(0.4, 300, 3, 0.35, seed=7),
+               CabinetEffect('V30-4x12.wav', 0.6)]
+    return [{'effect': effect, 'channel_mode': mode} for effect, mode in zip(effects, modes)]
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("cabinet_mode, reverb_mode", list(itertools.product(CHANNEL_MODES, repeat=2)))
+def test_fused_chain_matches_unfused(rng, channels, cabinet_mode, reverb_mode):
+    audio_signal = rng.uniform(-0.5, 0.5, (20000, channels) if channels == 2 else 20000)
+    effect_chain = make_chain(cabinet_mode, reverb_mode)
+
+    compiled_chain = compile_chain(effect_chain, SAMPLERATE, channels)
+    assert len(compiled_chain) == 1
+    assert isinstance(compiled_chain[0]['effect'], FusedConvolutionEffect)
+
+    fused = render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False, fuse=True)
+    unfused = render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False, fuse=False)
+    assert fused.shape == unfused.shape == audio_signal.shape
+    np.testing.assert_allclose(fused, unfused, atol=1e-9)
+    assert verify_compiled_chain(audio_signal, SAMPLERATE, effect_chain) < 1e-9
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_non_lti_effect_splits_the_fusion(rng, channels):
+    audio_signal = rng.uniform(-0.5, 0.5, (20000, channels) if channels == 2 else 20000)
+    effect_chain = make_chain('left', 'both', 'right')
+    effect_chain.insert(2, {'effect': DelayEffect(0.01, 0.5, 0.4), 'channel_mode': 'both'})
+
+    compiled_chain = compile_chain(effect_chain, SAMPLERATE, channels)
+    assert [type(item['effect']) for item in compiled_chain] == [FusedConvolutionEffect, DelayEffect, CabinetEffect]
+
+    np.testing.assert_allclose(render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False, fuse=True),
+                               render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False, fuse=False),
+                               atol=1e-9)
+
+
+def test_fused_chain_streaming(rng):
+    audio_signal = rng.uniform(-0.5, 0.5, (15000, 2))
+    effect_chain = make_chain('left', 'both', 'right')
+    expected = render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False, fuse=False)
+
+    fused_effect = compile_chain(effect_chain, SAMPLERATE)[0]['effect']
+    fused_effect.reset()
+    streamed = np.concatenate([fused_effect.process_block(audio_signal[start:start + 1024], SAMPLERATE)
+                               for start in range(0, len(audio_signal), 1024)])
+
+    np.testing.assert_allclose(streamed, expected, atol=1e-9)
+
+
+def test_verify_compiled_chain_reports_mismatch(rng, monkeypatch):
+    audio_signal = rng.uniform(-0.5, 0.5, (5000, 2))
+    effect_chain = make_chain('both', 'both')
+    # Una risposta fusa alterata deve essere rilevata
+    monkeypatch.setattr(FusedConvolutionEffect, 'apply_effect',
+                        lambda self, signal, samplerate, channel_mode='both', out=None: signal * 0.5)
+
+    with pytest.raises(ValueError):
+        verify_compiled_chain(audio_signal, SAMPLERATE, effect_chain)
@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy.fft import rfft
+from scipy.signal import fftconvolve
+
+from thesis_project.src.effects import CabinetEffect
+from thesis_project.src.effects.convolution import PartitionedConvolver, convolve_channels, fft_size_for
+
+
+def reference_convolution(audio_signal: np.ndarray, ir: np.ndarray) -> np.ndarray:
+    """
+    Convoluzione lineare di ogni canale con l'IR, troncata alla lunghezza del segnale.
+    Con una matrice di IR (M, C_out, C_in) ogni uscita somma le convoluzioni di tutti gli ingressi.
+    """
+    if ir.ndim == 3:
+        return np.stack([sum(fftconvolve(audio_signal[:, source], ir[:, target, source])[:len(audio_signal)]
+                             for source in range(ir.shape[2]))
+                         for target in range(ir.shape[1])], axis=1)
+    if ir.ndim == 1:
+        ir = np.repeat(ir[:, np.newaxis], audio_signal.shape[1], axis=1)
+    return np.stack([fftconvolve(audio_signal[:, channel], ir[:, channel])[:len(audio_signal)]
+                     for channel in range(audio_signal.shape[1])], axis=1)
+
+
+def process_in_blocks(effect, audio_signal: np.ndarray, samplerate: int, channel_mode: str,
+                      block_length: int = 1024) -> np.ndarray:
+    effect.reset()
+    return np.concatenate([effect.process_block(audio_signal[start:start + block_length], samplerate, channel_mode)
+                           for start in range(0, len(audio_signal), block_length)])
+
+
+def stream(convolver: PartitionedConvolver, audio_signal: np.ndarray, block_length: int) -> np.ndarray:
+    return np.concatenate([convolver.process_block(audio_signal[start:start + block_length])
+                           for start in range(0, len(audio_signal), block_length)])
+
+
+@pytest.mark.parametrize("ir_length", [1, 100, 128, 3000, 20000])
+@pytest.mark.parametrize("block_length", [64, 128, 500])
+def test_partitioned_convolver_matches_fftconvolve(rng, ir_length, block_length):
+    audio_signal = rng.uniform(-0.5, 0.5, (30000, 2))
+    ir = rng.uniform(-1.0, 1.0, ir_length) * np.exp(-np.arange(ir_length) / 2000)
+    convolver = PartitionedConvolver(ir, block_size=128, max_partition_size=2048)
+
+    processed = stream(convolver, audio_signal, block_length)
+
+    np.testing.assert_allclose(processed, reference_convolution(audio_signal, ir), atol=1e-9)
+
+
+@pytest.mark.parametrize("partitions_per_size", [2, 3])
+def test_partitioned_convolver_per_channel_ir(rng, partitions_per_size):
+    audio_signal = rng.uniform(-0.5, 0.5, (15000, 2))
+    ir = rng.uniform(-1.0, 1.0, (5000, 2))
+    convolver = PartitionedConvolver(ir, block_size=64, partitions_per_size=partitions_per_size)
+
+    processed = stream(convolver, audio_signal, 300)
+
+    np.testing.assert_allclose(processed, reference_convolution(audio_signal, ir), atol=1e-9)
+
+
+def test_partitioned_convolver_reset(rng):
+    audio_signal = rng.uniform(-0.5, 0.5, (4000, 2))
+    convolver = PartitionedConvolver(rng.uniform(-1.0, 1.0, 1000))
+    first = stream(convolver, audio_signal, 256)
+    convolver.reset()
+    np.testing.assert_array_equal(stream(convolver, audio_signal, 256), first)
+
+
+def test_partitioned_convolver_float32(rng):
+    audio_signal = rng.uniform(-0.5, 0.5, (10000, 2))
+    ir = rng.uniform(-1.0, 1.0, 2000) * np.exp(-np.arange(2000) / 300)
+    convolver = PartitionedConvolver(ir, dtype=np.float32)
+
+    processed = stream(convolver, audio_signal.astype(np.float32), 512)
+
+    assert processed.dtype == np.float32
+    np.testing.assert_allclose(processed, reference_convolution(audio_signal, ir), atol=1e-4)
+
+
+def test_partitioned_convolver_rejects_single_partition_per_size():
+    with pytest.raises(ValueError):
+        PartitionedConvolver(np.ones(100), partitions_per_size=1)
+
+
+
+@pytest.mark.parametrize("num_samples", [1, 500, 4096, 50000])
+@pytest.mark.parametrize("ir_length", [1, 700, 9000])
+def test_overlap_add_matches_fftconvolve(rng, num_samples, ir_length):
+    audio_signal = rng.uniform(-0.5, 0.5, (num_samples, 2))
+    ir = rng.uniform(-1.0, 1.0, ir_length)
+    n_fft = fft_size_for(ir_length)
+
+    processed = convolve_channels(audio_signal, rfft(ir, n=n_fft), n_fft, ir_length)
+
+    np.testing.assert_allclose(processed, reference_convolution(audio_signal, ir), atol=1e-9)
+
+
+@pytest.mark.parametrize("ir_shape", [(3000, 2), (3000, 2, 2)])
+def test_overlap_add_multichannel_ir(rng, ir_shape):
+    audio_signal = rng.uniform(-0.5, 0.5, (40000, 2))
+    ir = rng.uniform(-1.0, 1.0, ir_shape)
+    n_fft = fft_size_for(len(ir))
+
+    processed = convolve_channels(audio_signal, rfft(ir, n=n_fft, axis=0), n_fft, len(ir))
+
+    np.testing.assert_allclose(processed, reference_convolution(audio_signal, ir), atol=1e-9)
+
+
+def test_partitioned_convolver_true_stereo(rng):
+    audio_signal = rng.uniform(-0.5, 0.5, (12000, 2))
+    ir = rng.uniform(-1.0, 1.0, (4000, 2, 2))
+
+    processed = stream(PartitionedConvolver(ir, block_size=256), audio_signal, 256)
+
+    np.testing.assert_allclose(processed, reference_convolution(audio_signal, ir), atol=1e-9)
+
+
+@pytest.mark.parametrize("ir_channels", [1, 2, 4])
+@pytest.mark.parametrize("channel_mode", ['both', 'left', 'right'])
+def test_cabinet_ir_layouts(rng, tmp_path, ir_channels, channel_mode):
+    samplerate = 48000
+    ir_path = tmp_path / f'ir_{ir_channels}.wav'
+    sf.write(ir_path, rng.uniform(-0.5, 0.5, (2000, ir_channels)) * np.exp(-np.arange(2000) / 400)[:, np.newaxis],
+             samplerate, subtype='DOUBLE')
+    audio_signal = rng.uniform(-0.5, 0.5, (20000, 2))
+    effect = CabinetEffect(str(ir_path), mix=0.7)
+
+    processed = effect.apply_effect(audio_signal, samplerate, channel_mode)
+
+    # File a 4 canali nell'ordine L->L, L->R, R->L, R->R: matrice (M, uscita, ingresso)
+    ir = effect._get_ir(samplerate)
+    assert ir.shape == {1: (2000,), 2: (2000, 2), 4: (2000, 2, 2)}[ir_channels]
+    expected = audio_signal.copy()
+    channels = effect._selected_channels(channel_mode)
+    convolved = reference_convolution(audio_signal, ir)
+    expected[:, channels] = 0.3 * audio_signal[:, channels] + 0.7 * convolved[:, channels]
+    np.testing.assert_allclose(processed, expected, atol=1e-9)
+    np.testing.assert_allclose(process_in_blocks(effect, audio_signal, samplerate, channel_mode), expected, atol=1e-9)
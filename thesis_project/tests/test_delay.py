@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from thesis_project.src.effects import DelayEffect, PingPongDelayEffect
+
+SAMPLERATE = 8000
+
+
+def reference_delay(signal: np.ndarray, delay_samples: int, feedback: float, mix: float) -> np.ndarray:
+    """ Ciclo per campione della versione originale di DelayEffect._process_mono (senza normalizzazione). """
+    delayed_signal = np.zeros(len(signal))
+    for i in range(delay_samples, len(signal)):
+        delayed_signal[i] = signal[i - delay_samples] + feedback * delayed_signal[i - delay_samples]
+    return (1 - mix) * signal + mix * delayed_signal
+
+
+def reference_truncated_delay(signal: np.ndarray, delay_samples: int, feedback: float, mix: float,
+                              repeats: int) -> np.ndarray:
+    """ Serie di feedback troncata ai primi `repeats` termini: sum_k feedback^k * x[n - (k + 1) * D]. """
+    delayed_signal = np.zeros(len(signal))
+    for i in range(len(signal)):
+        for k in range(repeats):
+            source = i - (k + 1) * delay_samples
+            if source >= 0:
+                delayed_signal[i] += feedback ** k * signal[source]
+    return (1 - mix) * signal + mix * delayed_signal
+
+
+def reference_ping_pong(signal: np.ndarray, delay_samples_l: int, delay_samples_r: int, feedback: float,
+                        mix: float) -> np.ndarray:
+    """ Ciclo per campione della versione originale di PingPongDelayEffect.apply_effect (senza normalizzazione). """
+    num_samples = signal.shape[0]
+    delay_buffer_l = np.zeros(num_samples)
+    delay_buffer_r = np.zeros(num_samples)
+    signal_l = signal[:, 0]
+    signal_r = signal[:, 1]
+
+    for i in range(max(delay_samples_l, delay_samples_r), num_samples):
+        if i >= delay_samples_r:
+            delay_buffer_l[i] = signal_l[i - delay_samples_l] + feedback * delay_buffer_r[i - delay_samples_r]
+        else:
+            delay_buffer_l[i] = signal_l[i - delay_samples_l]
+        if i >= delay_samples_l:
+            delay_buffer_r[i] = signal_r[i - delay_samples_r] + feedback * delay_buffer_l[i - delay_samples_l]
+        else:
+            delay_buffer_r[i] = signal_r[i - delay_samples_r]
+
+    processed_signal = np.empty_like(signal)
+    processed_signal[:, 0] = (1 - mix) * signal_l + mix * delay_buffer_l
+    processed_signal[:, 1] = (1 - mix) * signal_r + mix * delay_buffer_r
+    return processed_signal
+
+
+@pytest.mark.parametrize("delay_time, feedback", [(0.05, 0.6), (0.0125, 0.9), (0.3, 0.5), (0.01, 0.0), (0.0, 0.7)])
+def test_delay_matches_per_sample_loop(rng, delay_time, feedback):
+    signal = rng.uniform(-0.5, 0.5, (4000, 2))
+    effect = DelayEffect(delay_time, feedback, 0.4)
+    delay_samples = int(delay_time * SAMPLERATE)
+
+    processed = effect.apply_effect(signal, SAMPLERATE)
+
+    for channel in range(2):
+        expected = reference_delay(signal[:, channel], delay_samples, feedback, 0.4)
+        np.testing.assert_allclose(processed[:, channel], expected, atol=1e-12)
+
+
+def test_delay_mono_and_channel_modes(rng):
+    signal = rng.uniform(-0.5, 0.5, (3000, 2))
+    effect = DelayEffect(0.02, 0.7, 0.5)
+    delay_samples = int(0.02 * SAMPLERATE)
+
+    np.testing.assert_allclose(effect.apply_effect(signal[:, 0].copy(), SAMPLERATE),
+                               reference_delay(signal[:, 0], delay_samples, 0.7, 0.5), atol=1e-12)
+
+    left = effect.apply_effect(signal, SAMPLERATE, 'left')
+    np.testing.assert_allclose(left[:, 0], reference_delay(signal[:, 0], delay_samples, 0.7, 0.5), atol=1e-12)
+    np.testing.assert_array_equal(left[:, 1], signal[:, 1])
+
+    right = effect.apply_effect(signal, SAMPLERATE, 'right')
+    np.testing.assert_array_equal(right[:, 0], signal[:, 0])
+    np.testing.assert_allclose(right[:, 1], reference_delay(signal[:, 1], delay_samples, 0.7, 0.5), atol=1e-12)
+
+    with pytest.raises(ValueError):
+        effect.apply_effect(signal, SAMPLERATE, 'center')
+
+
+def test_delay_does_not_modify_input(rng):
+    signal = rng.uniform(-0.5, 0.5, (2000, 2))
+    original = signal.copy()
+    DelayEffect(0.01, 0.5, 0.5).apply_effect(signal, SAMPLERATE)
+    np.testing.assert_array_equal(signal, original)
+
+
+def test_truncated_feedback_series(rng):
+    signal = rng.uniform(-0.5, 0.5, (2500, 2))
+    effect = DelayEffect(0.01, 0.5, 0.6, feedback_threshold=0.01)
+    delay_samples = int(0.01 * SAMPLERATE)
+
+    processed = effect.apply_effect(signal, SAMPLERATE)
+
+    # 0.5^k >= 0.01 per k = 0 .. 6
+    for channel in range(2):
+        expected = reference_truncated_delay(signal[:, channel], delay_samples, 0.5, 0.6, repeats=7)
+        np.testing.assert_allclose(processed[:, channel], expected, atol=1e-12)
+
+
+@pytest.mark.parametrize("delay_time_l, delay_time_r, feedback",
+                         [(0.03, 0.02, 0.7), (0.01, 0.045, 0.5), (0.025, 0.025, 0.9), (0.02, 0.0, 0.6), (0.0, 0.015, 0.6)])
+def test_ping_pong_matches_per_sample_loop(rng, delay_time_l, delay_time_r, feedback):
+    signal = rng.uniform(-0.5, 0.5, (4000, 2))
+    effect = PingPongDelayEffect(delay_time_l, delay_time_r, feedback, 0.5)
+
+    processed = effect.apply_effect(signal, SAMPLERATE)
+
+    expected = reference_ping_pong(signal, int(delay_time_l * SAMPLERATE), int(delay_time_r * SAMPLERATE), feedback, 0.5)
+    np.testing.assert_allclose(processed, expected, atol=1e-12)
+
+
+def test_ping_pong_requires_stereo(rng):
+    with pytest.raises(ValueError):
+        PingPongDelayEffect(0.01, 0.02, 0.5, 0.5).apply_effect(rng.uniform(-0.5, 0.5, 1000), SAMPLERATE)
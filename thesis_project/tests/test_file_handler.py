@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from thesis_project.src.functions.utility import file_handler
+from thesis_project.src.functions.utility.file_handler import get_output_file, write_audio_in_background
+
+SAMPLERATE = 44100
+
+
+def test_background_write(rng, tmp_path):
+    audio_signal = rng.uniform(-0.5, 0.5, (5000, 2))
+
+    write_audio_in_background(tmp_path / 'output.wav', audio_signal, SAMPLERATE).join()
+
+    written, samplerate = sf.read(tmp_path / 'output.wav')
+    assert samplerate == SAMPLERATE and written.shape == audio_signal.shape
+
+
+def test_background_write_error_raised_on_join(rng, tmp_path):
+    writer = write_audio_in_background(tmp_path / 'missing' / 'output.wav', rng.uniform(-0.5, 0.5, (100, 2)),
+                                       SAMPLERATE)
+
+    with pytest.raises(RuntimeError):
+        writer.join()
+
+
+@pytest.fixture
+def no_playback(monkeypatch):
+    """ Nessuna riproduzione: l'utente sceglie subito di continuare. """
+    monkeypatch.setattr(file_handler, 'get_playback_choice', lambda context: 'none')
+    monkeypatch.setattr(file_handler, 'play_audio_from_choice', lambda *args: None)
+
+
+def test_output_file_reports_write_error(rng, tmp_path, monkeypatch, capsys, no_playback):
+    monkeypatch.setattr(file_handler, 'get_output_path', lambda input_file_path: tmp_path / 'missing' / 'output.wav')
+    audio_signal = rng.uniform(-0.5, 0.5, (100, 2))
+
+    get_output_file(tmp_path / 'input.wav', audio_signal, audio_signal, SAMPLERATE)
+
+    output = capsys.readouterr().out
+    assert "Errore durante il salvataggio" in output
+    assert "File processato salvato" not in output
+
+
+def test_output_file_saved(rng, tmp_path, monkeypatch, capsys, no_playback):
+    monkeypatch.setattr(file_handler, 'get_output_path', lambda input_file_path: tmp_path / 'output.wav')
+    audio_signal = rng.uniform(-0.5, 0.5, (100, 2))
+
+    get_output_file(tmp_path / 'input.wav', audio_signal, audio_signal, SAMPLERATE)
+
+    assert "File processato salvato" in capsys.readouterr().out
+    np.testing.assert_allclose(sf.read(tmp_path / 'output.wav')[0], audio_signal, atol=1e-4)
@@ -0,0 +1,65 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from thesis_project.src.effects import AudioEffect, DelayEffect
+from thesis_project.src.functions.principal.signal_processing import process_audio_chain_streaming, render_chain
+from thesis_project.src.functions.utility.instrumentation import ChainProfiler
+
+SAMPLERATE = 8000
+
+
+class FailingEffect(AudioEffect):
+    """ Effetto che fallisce sempre, per verificare la chiusura degli osservatori. """
+
+    def apply_effect(self, audio_signal, samplerate, channel_mode='both', out=None):
+        raise RuntimeError("effetto non riuscito")
+
+    def process_block(self, audio_block, samplerate, channel_mode='both'):
+        raise RuntimeError("effetto non riuscito")
+
+
+def make_chain(*effects) -> list[dict]:
+    return [{'effect': effect, 'channel_mode': 'both'} for effect in effects]
+
+
+def test_profiler_measures_each_effect(rng):
+    profiler = ChainProfiler()
+    audio_signal = rng.uniform(-0.5, 0.5, (4000, 2))
+    effect_chain = make_chain(DelayEffect(0.01, 0.5, 0.5), DelayEffect(0.02, 0.3, 0.5))
+    # I moduli importati al primo uso non devono essere tracciati da tracemalloc
+    render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False)
+
+    render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False, observers=[profiler])
+
+    assert [measurement["index"] for measurement in profiler.measurements] == [0, 1]
+    assert all(measurement["samples"] == 4000 and measurement["peak_bytes"] > 0
+               for measurement in profiler.measurements)
+    assert len(profiler.chain_runs) == 1
+    assert not tracemalloc.is_tracing()
+
+
+def test_chain_end_after_failing_effect(rng):
+    profiler = ChainProfiler()
+
+    with pytest.raises(RuntimeError):
+        render_chain(rng.uniform(-0.5, 0.5, (4000, 2)), SAMPLERATE,
+                     make_chain(DelayEffect(0.01, 0.5, 0.5), FailingEffect()), verbose=False, observers=[profiler])
+
+    assert len(profiler.chain_runs) == 1
+    assert not tracemalloc.is_tracing()
+
+
+def test_chain_end_after_failing_streaming_effect(rng, tmp_path):
+    profiler = ChainProfiler()
+    input_path = tmp_path / 'input.wav'
+    sf.write(input_path, rng.uniform(-0.5, 0.5, (4000, 2)), SAMPLERATE)
+
+    output_path = process_audio_chain_streaming(input_path, make_chain(FailingEffect()), pan=0.0, block_size=1000,
+                                                output_dir=tmp_path, observers=[profiler])
+
+    assert output_path is None
+    assert len(profiler.chain_runs) == 1
+    assert not tracemalloc.is_tracing()
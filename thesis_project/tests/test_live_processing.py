@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import soundfile as sf
+
+from thesis_project.src.effects import AudioEffect, CabinetEffect, DelayEffect
+from thesis_project.src.functions.principal.live_processing import LiveProcessor, run_live
+from thesis_project.src.functions.principal.signal_processing import get_equal_power_gains, render_chain
+from thesis_project.src.functions.utility.audio_backends import FileBackend, NullBackend
+
+SAMPLERATE = 48000
+BLOCK_SIZE = 256
+
+
+class SlowStartEffect(AudioEffect):
+    """ Effetto identità che impiega più della durata di un blocco solo alla prima chiamata dopo `armed = True`. """
+
+    def __init__(self):
+        self.armed = False
+
+    def apply_effect(self, audio_signal, samplerate, channel_mode='both', out=None):
+        return audio_signal.copy()
+
+    def process_block(self, audio_block, samplerate, channel_mode='both'):
+        if self.armed:
+            self.armed = False
+            time.sleep(3 * BLOCK_SIZE / samplerate)
+        return audio_block.copy()
+
+
+def run_blocks(processor: LiveProcessor, count: int):
+    for _ in range(count):
+        processor.process(np.zeros((BLOCK_SIZE, 2)), np.zeros((BLOCK_SIZE, 2)))
+
+
+def test_warmup_block_excluded_from_load_and_xruns():
+    effect = SlowStartEffect()
+    processor = LiveProcessor([{'effect': effect, 'channel_mode': 'both'}], SAMPLERATE, BLOCK_SIZE)
+    effect.armed = True  # Dopo _prime: il primo blocco del flusso è lento
+
+    run_blocks(processor, 4)
+
+    report = processor.report(NullBackend(SAMPLERATE))
+    assert report["blocks"] == 4 and report["warmup_blocks"] == 1
+    assert report["xruns"] == 0 and report["max_load"] < 1.0
+    assert report["warmup_load"] > 1.0
+
+
+def test_slow_block_after_warmup_is_an_xrun():
+    effect = SlowStartEffect()
+    processor = LiveProcessor([{'effect': effect, 'channel_mode': 'both'}], SAMPLERATE, BLOCK_SIZE, warmup_blocks=0)
+    effect.armed = True
+
+    run_blocks(processor, 4)
+
+    report = processor.report(NullBackend(SAMPLERATE))
+    assert report["xruns"] == 1 and report["max_load"] > 1.0
+
+
+def test_file_backend_matches_in_memory_chain(rng, tmp_path):
+    audio_signal = rng.uniform(-0.5, 0.5, (10 * BLOCK_SIZE + 100, 2))
+    input_path = tmp_path / 'input.wav'
+    sf.write(input_path, audio_signal, SAMPLERATE, subtype='DOUBLE')
+    effect_chain = [{'effect': CabinetEffect('G12T75-4x12.wav', 0.8), 'channel_mode': 'both'},
+                    {'effect': DelayEffect(0.004, 0.5, 0.4), 'channel_mode': 'left'}]
+
+    report = run_live(effect_chain, FileBackend(input_path, tmp_path / 'output.wav'), BLOCK_SIZE, pan=-0.2)
+
+    expected = render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False) * get_equal_power_gains(-0.2)
+    np.testing.assert_allclose(sf.read(tmp_path / 'output.wav')[0], expected, atol=1e-9)
+    assert report["blocks"] == 11
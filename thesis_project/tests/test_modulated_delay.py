@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from thesis_project.src.effects import ModulatedDelayEffect
+
+SAMPLERATE = 8000
+BLOCK_SIZE = 257
+PARAMETERS = [
+    {"delay_time": 0.02, "depth": 0.003, "rate": 0.8},
+    {"delay_time": 0.003, "depth": 0.002, "rate": 2.5, "feedback": 0.6},
+    {"delay_time": 0.005, "depth": 0.002, "rate": 5.0, "interpolation": "allpass", "stereo_phase": 0.0},
+    {"delay_time": 0.004, "depth": 0.003, "rate": 3.0, "interpolation": "allpass", "feedback": -0.7},
+    {"delay_time": 0.0005, "depth": 0.0005, "rate": 3.0, "feedback": 0.5},
+]
+
+
+def reference_modulated_delay(audio_signal: np.ndarray, samplerate: int, effect: ModulatedDelayEffect,
+                              channels: list[int]) -> np.ndarray:
+    """
+        Ritardo modulato campione per campione (solo segnale wet), con LFO sinusoidale, interpolazione lineare
+        o allpass e feedback sul buffer di ritardo.
+    """
+    base_delay = effect.delay_time * samplerate
+    depth = abs(effect.depth) * samplerate
+    allpass = effect.interpolation == "allpass"
+    offset = 0.5 if allpass else 0.0
+    min_delay = offset + (1.0 if effect.feedback else 0.0)
+
+    delay_line = np.zeros(audio_signal.shape)
+    wet_signal = np.zeros(audio_signal.shape)
+    previous = np.zeros(audio_signal.shape[1])
+    for n in range(len(audio_signal)):
+        for c, channel in enumerate(channels):
+            phase = 2 * np.pi * effect.rate * n / samplerate + np.deg2rad(effect.stereo_phase) * channel
+            delay = max(base_delay + depth * np.sin(phase), min_delay)
+            k = int(np.floor(delay - offset))
+            fraction = delay - k
+
+            near = audio_signal[n, c] if k == 0 else (delay_line[n - k, c] if n >= k else 0.0)
+            far = delay_line[n - k - 1, c] if n >= k + 1 else 0.0
+            if allpass:
+                eta = (1 - fraction) / (1 + fraction)
+                previous[c] = eta * near + far - eta * previous[c]
+                wet_signal[n, c] = previous[c]
+            else:
+                wet_signal[n, c] = near + fraction * (far - near)
+        delay_line[n] = audio_signal[n] + effect.feedback * wet_signal[n]
+    return wet_signal
+
+
+@pytest.mark.parametrize("parameters", PARAMETERS)
+def test_matches_reference(rng, parameters):
+    audio_signal = rng.uniform(-0.5, 0.5, (3000, 2))
+    effect = ModulatedDelayEffect(mix=1.0, **parameters)
+
+    expected = reference_modulated_delay(audio_signal, SAMPLERATE, effect, [0, 1])
+
+    np.testing.assert_allclose(effect.apply_effect(audio_signal, SAMPLERATE), expected, atol=1e-10)
+
+
+@pytest.mark.parametrize("parameters", PARAMETERS)
+def test_blocks_match_whole_signal(rng, parameters):
+    audio_signal = rng.uniform(-0.5, 0.5, (3000, 2))
+    effect = ModulatedDelayEffect(mix=0.7, **parameters)
+    expected = effect.apply_effect(audio_signal, SAMPLERATE)
+
+    effect.reset()
+    blocks = [effect.process_block(audio_signal[start:start + BLOCK_SIZE], SAMPLERATE)
+              for start in range(0, len(audio_signal), BLOCK_SIZE)]
+
+    np.testing.assert_allclose(np.concatenate(blocks), expected, atol=1e-10)
+
+
+def test_mono_matches_left_channel(rng):
+    audio_signal = rng.uniform(-0.5, 0.5, (3000, 2))
+    effect = ModulatedDelayEffect(0.003, 0.002, 1.0, 0.5, 0.5)
+
+    mono = effect.apply_effect(audio_signal[:, 0].copy(), SAMPLERATE)
+
+    assert mono.shape == (3000,)
+    np.testing.assert_allclose(mono, effect.apply_effect(audio_signal, SAMPLERATE)[:, 0], atol=1e-12)
+
+
+@pytest.mark.parametrize("channel_mode, processed, untouched", [('left', 0, 1), ('right', 1, 0)])
+def test_single_channel_modes(rng, channel_mode, processed, untouched):
+    audio_signal = rng.uniform(-0.5, 0.5, (3000, 2))
+    effect = ModulatedDelayEffect(0.003, 0.002, 1.0, 0.5, 0.5)
+
+    output = effect.apply_effect(audio_signal, SAMPLERATE, channel_mode)
+
+    wet_signal = reference_modulated_delay(audio_signal, SAMPLERATE, effect, [0, 1])[:, processed]
+    np.testing.assert_allclose(output[:, processed], 0.5 * audio_signal[:, processed] + 0.5 * wet_signal,
+                               atol=1e-10)
+    np.testing.assert_array_equal(output[:, untouched], audio_signal[:, untouched])
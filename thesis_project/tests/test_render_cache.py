@@ -0,0 +1,74 @@
+import numpy as np
+
+from thesis_project.src.built_in.presets import EFFECT_REGISTRY
+from thesis_project.src.effects import ReverbEffect
+from thesis_project.src.functions.principal.effect_factory import make_effect
+from thesis_project.src.functions.principal.signal_processing import render_chain
+from thesis_project.src.functions.utility.instrumentation import ChainProfiler
+from thesis_project.src.functions.utility.render_cache import RenderCache, render_chain_cached
+
+SAMPLERATE = 44100
+
+
+def build_chain(entries: list[tuple]) -> list[dict]:
+    """ Costruisce istanze nuove dai preset, come la modalità interattiva a ogni esecuzione. """
+    return [{'effect': make_effect(name, EFFECT_REGISTRY[name]["presets"][preset]), 'channel_mode': mode,
+             'preset': preset}
+            for name, preset, mode in entries]
+
+
+CHAIN = [('cabinet', 'g12t75_4x12', 'both'), ('reverb', 'piccola_stanza', 'both'), ('delay', 'slapback', 'left')]
+
+
+def test_default_reverb_seed_is_deterministic():
+    parameters = EFFECT_REGISTRY["reverb"]["presets"]["piccola_stanza"]
+
+    assert ReverbEffect(**parameters).seed == ReverbEffect(**parameters).seed
+    # Il mix non modifica l'IR, gli altri parametri sì
+    assert ReverbEffect(**{**parameters, "mix": 0.9}).seed == ReverbEffect(**parameters).seed
+    assert ReverbEffect(**{**parameters, "t60": 0.4}).seed != ReverbEffect(**parameters).seed
+    assert ReverbEffect(**parameters, seed=3).seed == 3
+
+
+def test_rerun_with_changed_last_effect_reuses_prefix(rng, tmp_path):
+    audio_signal = rng.uniform(-0.5, 0.5, (SAMPLERATE, 2))
+    cache = RenderCache(tmp_path)
+
+    render_chain_cached(audio_signal, SAMPLERATE, build_chain(CHAIN), cache, verbose=False)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # Nuova esecuzione con istanze nuove: cambia solo l'ultimo effetto
+    effect_chain = build_chain(CHAIN[:-1] + [('delay', 'long_delay', 'left')])
+    profiler = ChainProfiler(track_memory=False)
+    processed = render_chain_cached(audio_signal, SAMPLERATE, effect_chain, cache, verbose=False,
+                                    observers=[profiler])
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [measurement["effect"] for measurement in profiler.measurements] == ["DelayEffect(long_delay)"]
+    np.testing.assert_allclose(processed, render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False),
+                               atol=1e-12)
+
+
+def test_identical_rerun_returns_cached_result(rng, tmp_path):
+    audio_signal = rng.uniform(-0.5, 0.5, (SAMPLERATE, 2))
+    cache = RenderCache(tmp_path)
+    first = render_chain_cached(audio_signal, SAMPLERATE, build_chain(CHAIN), cache, verbose=False)
+
+    profiler = ChainProfiler(track_memory=False)
+    second = render_chain_cached(audio_signal, SAMPLERATE, build_chain(CHAIN), cache, verbose=False,
+                                 observers=[profiler])
+
+    assert cache.hits == 1 and not profiler.measurements
+    np.testing.assert_array_equal(second, first)
+
+
+def test_changed_input_misses(rng, tmp_path):
+    audio_signal = rng.uniform(-0.5, 0.5, (SAMPLERATE, 2))
+    cache = RenderCache(tmp_path)
+    render_chain_cached(audio_signal, SAMPLERATE, build_chain(CHAIN), cache, verbose=False)
+
+    changed_signal = audio_signal.copy()
+    changed_signal[1000, 0] += 0.1
+    render_chain_cached(changed_signal, SAMPLERATE, build_chain(CHAIN), cache, verbose=False)
+
+    assert (cache.hits, cache.misses) == (0, 2)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from thesis_project.src.effects import CabinetEffect, DelayEffect, PingPongDelayEffect, ReverbEffect
+from thesis_project.src.effects.precision import set_precision
+from thesis_project.src.functions.principal.segment_processing import chain_memory_samples, render_chain_segmented
+from thesis_project.src.functions.principal.signal_processing import render_chain
+
+SAMPLERATE = 8000
+
+
+def make_chains() -> dict:
+    return {
+        'convolutions': [(CabinetEffect('G12T75-4x12.wav', 0.8), 'both'),
+                         (ReverbEffect(0.5, 300, 3, 0.4, seed=1), 'right')],
+        'delay': [(DelayEffect(0.05, 0.6, 0.4), 'left')],
+        'delay_truncated': [(DelayEffect(0.05, 0.6, 0.4, feedback_threshold=1e-3), 'both')],
+        'ping_pong': [(PingPongDelayEffect(0.03, 0.02, 0.7, 0.5), 'both')],
+        'full': [(CabinetEffect('G12T75-4x12.wav', 1.0), 'both'), (DelayEffect(0.05, 0.6, 0.4), 'left'),
+                 (PingPongDelayEffect(0.03, 0.02, 0.7, 0.5), 'both'),
+                 (ReverbEffect(0.5, 300, 3, 0.4, seed=1), 'right')],
+    }
+
+
+def as_chain(effects: list[tuple]) -> list[dict]:
+    return [{'effect': effect, 'channel_mode': mode} for effect, mode in effects]
+
+
+@pytest.mark.parametrize("name", list(make_chains()))
+def test_segmented_matches_render_chain(rng, name):
+    audio_signal = rng.uniform(-0.5, 0.5, (SAMPLERATE * 12, 2))
+    effect_chain = as_chain(make_chains()[name])
+
+    expected = render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False)
+    segmented = render_chain_segmented(audio_signal, SAMPLERATE, effect_chain, workers=3)
+
+    # Delay con feedback completo: ripetizioni trascurate sotto DEFAULT_SEGMENT_TOLERANCE rispetto al picco
+    np.testing.assert_allclose(segmented, expected, atol=1e-6 * np.max(np.abs(expected)))
+
+
+def test_segmented_mono_float32(rng):
+    set_precision('float32')
+    audio_signal = rng.uniform(-0.5, 0.5, SAMPLERATE * 3)
+    effect_chain = as_chain(make_chains()['convolutions'])
+
+    expected = render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False)
+    segmented = render_chain_segmented(audio_signal, SAMPLERATE, effect_chain, workers=2)
+
+    assert segmented.dtype == np.float32 and segmented.shape == audio_signal.shape
+    np.testing.assert_allclose(segmented, expected, atol=1e-5)
+
+
+def test_chain_memory(rng):
+    cabinet = CabinetEffect('G12T75-4x12.wav')
+    assert chain_memory_samples(as_chain([(cabinet, 'both')]), SAMPLERATE) == len(cabinet._get_ir(SAMPLERATE)) - 1
+    # 0.6^k >= 1e-3 per k = 0 .. 13: 14 ripetizioni di 400 campioni
+    assert chain_memory_samples(as_chain([(DelayEffect(0.05, 0.6, 0.4, feedback_threshold=1e-3), 'both')]),
+                                SAMPLERATE) == 14 * 400
+    assert chain_memory_samples(as_chain([(DelayEffect(0.05, 1.0, 0.4), 'both')]), SAMPLERATE) is None
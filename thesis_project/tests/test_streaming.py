@@ -0,0 +1,105 @@
+import itertools
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from thesis_project.src.effects import CabinetEffect, DelayEffect, PingPongDelayEffect, ReverbEffect
+from thesis_project.src.functions.principal.signal_processing import (apply_output_stage, get_equal_power_gains,
+                                                                      process_audio_chain_streaming, render_chain)
+
+SAMPLERATE = 44100
+# Blocchi di lunghezza variabile, non multipli delle partizioni delle convoluzioni né dei ritardi
+BLOCK_SIZES = (1, 37, 128, 1000, 4096, 333)
+
+
+def make_effects() -> dict:
+    return {
+        'delay': DelayEffect(0.013, 0.6, 0.4),
+        'delay_truncated': DelayEffect(0.013, 0.6, 0.4, feedback_threshold=1e-3),
+        'ping_pong': PingPongDelayEffect(0.011, 0.007, 0.7, 0.5),
+        'cabinet': CabinetEffect('G12T75-4x12.wav', 0.8),
+        'reverb': ReverbEffect(0.3, 200, 3, 0.4, seed=1),
+    }
+
+
+def process_in_blocks(effect, audio_signal: np.ndarray, channel_mode: str) -> np.ndarray:
+    effect.reset()
+    blocks = []
+    position = 0
+    sizes = itertools.cycle(BLOCK_SIZES)
+    while position < len(audio_signal):
+        size = next(sizes)
+        blocks.append(effect.process_block(audio_signal[position:position + size], SAMPLERATE, channel_mode))
+        position += size
+    return np.concatenate(blocks)
+
+
+@pytest.mark.parametrize("name", list(make_effects()))
+@pytest.mark.parametrize("channel_mode", ['both', 'left', 'right'])
+def test_process_block_matches_apply_effect(rng, name, channel_mode):
+    if name == 'ping_pong' and channel_mode != 'both':
+        pytest.skip("Il Ping Pong Delay elabora sempre entrambi i canali.")
+    audio_signal = rng.uniform(-0.5, 0.5, (12000, 2))
+    effect = make_effects()[name]
+
+    expected = effect.apply_effect(audio_signal, SAMPLERATE, channel_mode)
+    streamed = process_in_blocks(effect, audio_signal, channel_mode)
+
+    np.testing.assert_allclose(streamed, expected, atol=1e-9)
+
+
+def test_reset_restarts_the_stream(rng):
+    audio_signal = rng.uniform(-0.5, 0.5, (5000, 2))
+    effect = DelayEffect(0.01, 0.7, 0.5)
+    first = process_in_blocks(effect, audio_signal, 'both')
+    second = process_in_blocks(effect, audio_signal, 'both')
+    np.testing.assert_array_equal(first, second)
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_streaming_file_matches_in_memory_chain(rng, tmp_path, channels):
+    audio_signal = rng.uniform(-0.5, 0.5, (30000, channels))
+    input_path = tmp_path / 'input.wav'
+    sf.write(input_path, audio_signal, SAMPLERATE, subtype='DOUBLE')
+    effect_chain = [{'effect': effect, 'channel_mode': mode}
+                    for effect, mode in zip(make_effects().values(), ['left', 'both', 'both', 'both', 'right'])]
+
+    output_path = process_audio_chain_streaming(input_path, effect_chain, pan=0.3, block_size=4000,
+                                                output_dir=tmp_path / 'output')
+
+    stereo_signal = np.repeat(audio_signal, 2, axis=1) if channels == 1 else audio_signal
+    expected = render_chain(stereo_signal, SAMPLERATE, effect_chain, verbose=False) * get_equal_power_gains(0.3)
+    streamed, samplerate = sf.read(output_path)
+    assert samplerate == SAMPLERATE
+    np.testing.assert_allclose(streamed, expected, atol=1e-9)
+
+
+def test_output_stage_matches_per_effect_normalization(rng):
+    audio_signal = rng.uniform(-0.5, 0.5, (6000, 2))
+    effect_chain = [{'effect': effect, 'channel_mode': 'both'} for effect in make_effects().values()]
+
+    # Versione originale: ogni effetto normalizzava il proprio risultato al picco
+    expected = audio_signal
+    for item in effect_chain:
+        expected = item['effect'].apply_effect(expected, SAMPLERATE, item['channel_mode'])
+        expected = expected / np.max(np.abs(expected))
+    expected = expected * get_equal_power_gains(0.5)
+
+    processed = apply_output_stage(render_chain(audio_signal, SAMPLERATE, effect_chain, verbose=False), 0.5)
+    np.testing.assert_allclose(processed, expected, atol=1e-12)
+
+
+def test_streaming_warns_above_full_scale(rng, tmp_path, capsys):
+    input_path = tmp_path / 'input.wav'
+    sf.write(input_path, rng.uniform(-0.9, 0.9, (8000, 2)), SAMPLERATE, subtype='DOUBLE')
+    effect_chain = [{'effect': DelayEffect(0.005, 0.9, 1.0), 'channel_mode': 'both'}]
+
+    process_audio_chain_streaming(input_path, effect_chain, pan=0.0, output_dir=tmp_path)
+    assert "oltre il fondo scala" in capsys.readouterr().out
+
+    output_path = process_audio_chain_streaming(input_path, effect_chain, pan=0.0, output_dir=tmp_path, limiter=True)
+    assert "oltre il fondo scala" not in capsys.readouterr().out
+    limited, _ = sf.read(output_path)
+    assert limited.shape == (8000, 2)
+    assert np.max(np.abs(limited)) <= 10 ** (-1.0 / 20) + 1e-9